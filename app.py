@@ -1,20 +1,36 @@
 import streamlit as st
 import sys
 import os
+import re
+import time
+import functools
+import threading
 
 # Add backend to path so we can import core
 sys.path.append(os.path.join(os.path.dirname(__file__), "backend"))
 
 try:
     from core import GSResearchDownloader
+    from worker_pool import BrowserWorkerPool
+    from run_journal import RunJournal
+    from search_index import SearchIndex
+    from priority_scheduler import PriorityScheduler, RunBudget
     from watchlist_manager import WatchlistManager
     from auth import AuthManager
+    from log_sink import SessionLog
+    from batch_runner import BatchRunner
 except ImportError:
     # Fallback if running from backend dir or other structure issues
     sys.path.append(os.path.abspath("backend"))
     from core import GSResearchDownloader
+    from worker_pool import BrowserWorkerPool
+    from run_journal import RunJournal
+    from search_index import SearchIndex
+    from priority_scheduler import PriorityScheduler, RunBudget
     from watchlist_manager import WatchlistManager
     from auth import AuthManager
+    from log_sink import SessionLog
+    from batch_runner import BatchRunner
 
 st.set_page_config(page_title="GS Research Bot", layout="wide")
 
@@ -65,7 +81,7 @@ st.sidebar.write(f"User: **{st.session_state.user}**")
 if st.session_state.auth_manager.use_supabase:
     st.sidebar.success("☁️ Cloud Storage (Supabase)")
 else:
-    st.sidebar.warning("📂 Local Storage (JSON/SQLite)")
+    st.sidebar.warning("📂 Local Storage (SQLite)")
 
 if st.sidebar.button("Logout"):
     st.session_state.user = None
@@ -80,92 +96,302 @@ st.title("GS Research Automation")
 st.markdown("Use this tool to automate downloading models and reports from GS Publishing.")
 
 # --- Session State Management ---
-if "logs" not in st.session_state:
-    st.session_state.logs = []
-    
-if "watchlist_manager" not in st.session_state:
-    # Initialize with current logged-in user to load their specific file
-    st.session_state.watchlist_manager = WatchlistManager(username=st.session_state.user)
-
 # Load User Settings
 if "custom_download_path" not in st.session_state:
     saved_path = st.session_state.auth_manager.get_download_path(st.session_state.user)
     st.session_state.custom_download_path = saved_path if saved_path else "downloads"
 
-def stream_log(msg):
-    """Callback function to handle logs from the downloader."""
-    st.session_state.logs.append(msg)
-    # This writes to the current location in the Streamlit app
-    st.code(f"{msg}", language="text")
-
-if "downloader" not in st.session_state:
-    # Initialize the downloader with our callback and custom path
-    st.session_state.downloader = GSResearchDownloader(
-        download_dir=st.session_state.custom_download_path,
-        log_callback=stream_log
-    )
+if "watchlist_manager" not in st.session_state:
+    # Initialize with current logged-in user to load their specific file
+    st.session_state.watchlist_manager = WatchlistManager(username=st.session_state.user,
+                                                          download_dir=st.session_state.custom_download_path)
+
+@st.cache_resource
+def get_batch_runner(user, download_path):
+    """One background runner (and session log) per user, shared by reruns and browser tabs."""
+    # Recent messages in memory, older ones in a rotating file
+    logs = SessionLog(maxlen=2000, spill_path=os.path.join(download_path, "logs", f"session_{user}.log"))
+    return BatchRunner(log=logs)
+
+runner = get_batch_runner(st.session_state.user, st.session_state.custom_download_path)
+
+# --- Batches (run on the BatchRunner thread, so no st.* calls in here) ---
+
+def run_research(batch, downloader, journal, search_index, run_id, companies, min_pages, primary_only,
+                 prioritize=False, max_minutes=0, max_mb=0, num_workers=1):
+    log = downloader.log
+    downloader.metrics.reset() # per-run timing report
+
+    def research_task(worker, company):
+        # Progress is journaled, so a crash or cancel can resume from here
+        journal.set_company_status(run_id, company, "running")
+        try:
+            worker.search_company(company)
+            worker.download_reports(company, min_pages=min_pages, primary_only=primary_only,
+                                    should_stop=batch.should_stop, checkpoint=journal.checkpoint(run_id, company))
+            journal.set_company_status(run_id, company, "interrupted" if batch.should_stop() else "done")
+        except Exception as e:
+            journal.set_company_status(run_id, company, "failed", str(e))
+            raise
+
+    if prioritize:
+        for company in companies:
+            journal.set_company_status(run_id, company, "running")
+        run = PriorityScheduler(downloader).run(
+            companies, min_pages=min_pages, primary_only=primary_only,
+            budget=RunBudget.from_limits(max_minutes or None, max_mb or None),
+            should_stop=batch.should_stop,
+            checkpoint_for=lambda company: journal.checkpoint(run_id, company)
+        )
+        for company in companies:
+            entry = run["companies"].get(company)
+            # Companies with reports left over stay pending for "Resume Last Run"
+            journal.set_company_status(run_id, company, "done" if entry and entry["complete"] else "interrupted")
+        batch.progress(len(companies))
+    elif num_workers > 1 and len(companies) > 1:
+        done_companies = []
+        pool = BrowserWorkerPool(downloader, num_workers=min(num_workers, len(companies)), log_callback=log)
+        try:
+            pool.start(companies, research_task, on_company_done=done_companies.append)
+            while pool.is_running():
+                if batch.should_stop():
+                    pool.stop()
+                batch.progress(len(done_companies))
+                time.sleep(0.5)
+        finally:
+            pool.close()
+        batch.progress(len(done_companies))
+    else:
+        for i, company in enumerate(companies):
+            if batch.should_stop():
+                break
+            log(f"=== Processing: {company} ===")
+            try:
+                research_task(downloader, company)
+            except Exception as e:
+                log(f"Error processing {company}: {e}")
+            batch.progress(i + 1)
+        log(downloader.waits.report())
+    log(downloader.metrics.report())
+
+    log("Indexing new reports for search...")
+    search_index.update(downloader.download_dir, manifest=downloader.manifest, log=log)
+
+    pending = journal.pending_companies(run_id)
+    journal.finish_run(run_id, "interrupted" if pending else "done")
+    if pending:
+        batch.finish("warning", f"{len(pending)} companies did not finish: {', '.join(pending)}. Use 'Resume Last Run' to retry them.")
+    else:
+        batch.finish("success", "✅ Batch processing complete!")
+
+def run_models(batch, downloader, companies):
+    for i, company in enumerate(companies):
+        if batch.should_stop():
+            batch.finish("warning", f"Cancelled after {i}/{len(companies)} companies.")
+            return
+        downloader.log(f"=== Processing Model for: {company} ===")
+        downloader.search_company(company)
+        # Pass models_only=True
+        downloader.download_reports(company, min_pages=1, primary_only=True, models_only=True)
+        batch.progress(i + 1)
+    batch.finish("success", "✅ Batch model download complete!")
+
+def run_watchlist_check(batch, downloader, wm, budget):
+    run = downloader.check_watchlist_updates(wm, budget=budget, should_stop=batch.should_stop)
+    if run["stopped"]:
+        batch.finish("warning", f"Stopped early ({run['stopped']}): {run['left']} reports left for the next check.")
+    else:
+        batch.finish("success", "✅ Watchlist update check complete!")
+
+def run_index_update(batch, search_index, downloads_root, manifest):
+    runner.log("Extracting text from new PDFs...")
+    result = search_index.update(downloads_root, manifest=manifest, log=runner.log)
+    batch.finish("success", f"Indexed {result['indexed']} reports ({result['unchanged']} unchanged, {result['removed']} removed).")
+
+def submit_batch(name, fn, total=0):
+    runner.submit(name, fn, total=total)
+    # Rerun so the batch panel starts refreshing
+    st.rerun()
+
+def batch_label(companies):
+    return ", ".join(companies[:5]) + (f" (+{len(companies) - 5} more)" if len(companies) > 5 else "")
+
+@st.cache_resource
+def get_browser_slot(user):
+    """Holds the user's one downloader across reruns, refreshes and browser tabs (its Chrome profile can only be open once)."""
+    return {"downloader": None, "lock": threading.Lock()}
+
+def launch_downloader(relaunch=False):
+    """
+    Returns (the user's downloader or None, launch error or None). Chrome is started if the
+    user has no downloader yet, or, with relaunch=True, if the existing one was closed.
+    """
+    slot = get_browser_slot(st.session_state.user)
+    with slot["lock"]:
+        current = slot["downloader"]
+        if current is None or (relaunch and current.driver is None):
+            try:
+                slot["downloader"] = GSResearchDownloader(
+                    download_dir=st.session_state.custom_download_path,
+                    log_callback=runner.log,
+                    profile=st.session_state.user,
+                    crawl_profile="lean" if st.session_state.get("lean_crawl") else "full"
+                )
+            except Exception as e:
+                return current, e
+        return slot["downloader"], None
+
+downloader, launch_error = launch_downloader()
+if launch_error:
+    st.error(f"🚨 Could not start the browser: {launch_error}")
+
+def browser_ready():
+    return downloader is not None and downloader.driver is not None
+
+os.makedirs(st.session_state.custom_download_path, exist_ok=True)
+
+if "run_journal" not in st.session_state:
+    st.session_state.run_journal = RunJournal(os.path.join(st.session_state.custom_download_path, "runs.db"))
+
+journal = st.session_state.run_journal
 
-downloader = st.session_state.downloader
+if "search_index" not in st.session_state:
+    st.session_state.search_index = SearchIndex(os.path.join(st.session_state.custom_download_path, "search.db"))
+
+search_index = st.session_state.search_index
 
 # --- Sidebar Controls ---
 st.sidebar.header("1. Initialization")
-if st.sidebar.button("Launch Browser"):
-    try:
-        if downloader.driver is None:
-            # Re-init if closed
-            st.session_state.downloader = GSResearchDownloader(
-                download_dir=st.session_state.custom_download_path,
-                log_callback=stream_log
-            )
-            downloader = st.session_state.downloader
-            
-        msg = downloader.login_init()
-        st.sidebar.success("Browser Launched!")
-        st.sidebar.info(msg)
-    except Exception as e:
-        st.sidebar.error(f"Error: {e}")
+st.sidebar.checkbox("Lean crawling", key="lean_crawl",
+                    help="Skip images, fonts, stylesheets and trackers and don't wait for full page loads. "
+                         "Takes effect the next time the browser is launched.")
+if st.sidebar.button("Launch Browser", disabled=runner.busy()):
+    # Re-init if closed
+    downloader, launch_error = launch_downloader(relaunch=True)
+    if launch_error:
+        st.sidebar.error(f"Error: {launch_error}")
+    else:
+        try:
+            msg = downloader.login_init()
+            st.sidebar.success("Browser Launched!")
+            st.sidebar.info(msg)
+        except Exception as e:
+            st.sidebar.error(f"Error: {e}")
 
 st.sidebar.markdown("---")
 st.sidebar.header("3. Cleanup")
-if st.sidebar.button("Close Browser"):
-    downloader.close()
+if st.sidebar.button("Close Browser", disabled=runner.busy(), help="Disabled while a batch is running or queued."):
+    if downloader:
+        downloader.close()
     st.sidebar.success("Browser closed.")
 
+# --- Batch Queue ---
+if "batches_busy" not in st.session_state:
+    st.session_state.batches_busy = False
+
+@st.fragment(run_every=1.0 if runner.busy() else None)
+def batch_panel():
+    """Progress, cancel and queue of the background batches, refreshed every second while busy."""
+    busy = runner.busy()
+    if st.session_state.batches_busy and not busy:
+        # The last batch just finished: refresh the whole page (resume info, index stats)
+        st.session_state.batches_busy = False
+        st.rerun()
+    st.session_state.batches_busy = busy
+
+    current = runner.running()
+    if current:
+        col1, col2 = st.columns([5, 1])
+        with col1:
+            progress = f"{current.done}/{current.total} · " if current.total else ""
+            st.progress(min(1.0, current.done / current.total) if current.total else 0.0,
+                        text=f"▶️ {current.name} — {progress}{current.elapsed() / 60:.1f} min"
+                             + (" · stopping after the current report..." if current.should_stop() else ""))
+        with col2:
+            if st.button("Cancel", key=f"cancel_{current.id}", disabled=current.should_stop()):
+                runner.cancel(current.id)
+    for batch in runner.queued():
+        col1, col2 = st.columns([5, 1])
+        with col1:
+            st.write(f"⏳ Queued: {batch.name}")
+        with col2:
+            if st.button("Remove", key=f"cancel_{batch.id}"):
+                runner.cancel(batch.id)
+                st.rerun(scope="fragment")
+    for batch in reversed(runner.finished()[-3:]):
+        if batch.result:
+            getattr(st, batch.result["level"])(f"{batch.name}: {batch.result['message']}")
+        else:
+            st.caption(f"{batch.name}: {batch.status}")
+    if busy:
+        st.code("\n".join(runner.logs.tail(200)) or "Waiting for logs...", language="text")
+
+batch_panel()
+
 # --- Tabs ---
-tab1, tab2, tab3 = st.tabs(["Research Execution", "Watchlist & Account", "Batch Models"])
+tab1, tab2, tab3, tab4 = st.tabs(["Research Execution", "Watchlist & Account", "Batch Models", "Search Reports"])
 
 with tab1:
     st.header("Research Execution")
     
     tickers = st.text_input("Enter Company Tickers (comma-separated):", "Apple, Tesla")
     
-    col1, col2 = st.columns(2)
+    col1, col2, col3 = st.columns(3)
     with col1:
         min_pages = st.number_input("Minimum Pages per Report:", min_value=1, value=1, step=1)
     with col2:
         primary_only = st.checkbox("Download 'Primary' Reports Only", value=True)
+    with col3:
+        num_workers = st.number_input("Parallel Browsers:", min_value=1, max_value=8, value=1, step=1)
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        prioritize = st.checkbox("Initiations & Rating Changes first", value=False,
+                                 help="List every company first, then download across the batch by report type, date and length (one browser).")
+    with col2:
+        max_minutes = st.number_input("Time Budget (minutes, 0 = none):", min_value=0, value=0, step=5, disabled=not prioritize)
+    with col3:
+        max_mb = st.number_input("Data Budget (MB, 0 = none):", min_value=0, value=0, step=100, disabled=not prioritize)
     
-    if st.button("Start Research"):
-        if not downloader.driver:
+    unfinished_run = journal.latest_unfinished()
+    if unfinished_run:
+        run_info = journal.get_run(unfinished_run)
+        done_count = sum(1 for c in run_info["companies"] if c["status"] == "done")
+        st.info(f"Run {unfinished_run} ({run_info['created_at']}) stopped after "
+                f"{done_count}/{len(run_info['companies'])} companies. Resume picks up from its last finished page.")
+
+    start_col, resume_col = st.columns(2)
+    with start_col:
+        start_clicked = st.button("Start Research")
+    with resume_col:
+        # A queued or running batch also counts as unfinished until it is done
+        resume_clicked = st.button("Resume Last Run", disabled=not unfinished_run or runner.busy())
+
+    if start_clicked or resume_clicked:
+        if not browser_ready():
             st.error("🚨 Browser is not running. Please click 'Launch Browser' in the sidebar first.")
         else:
-            st.subheader("Live Execution Logs")
-            
-            companies = [c.strip() for c in tickers.split(",") if c.strip()]
-            
-            progress_bar = st.progress(0)
+            if resume_clicked:
+                # Same options as the original run, only the companies that did not finish
+                run_id = unfinished_run
+                options = journal.get_run(run_id)["options"]
+                min_pages = options.get("min_pages", min_pages)
+                primary_only = options.get("primary_only", primary_only)
+                prioritize = options.get("prioritize", prioritize)
+                companies = journal.pending_companies(run_id)
+                journal.reopen_run(run_id)
+                runner.log(f"Resuming run {run_id} with {len(companies)} remaining companies.")
+            else:
+                companies = [c.strip() for c in tickers.split(",") if c.strip()]
+                run_id = journal.create_run(companies, {"min_pages": int(min_pages), "primary_only": primary_only,
+                                                        "prioritize": prioritize})
             
-            for i, company in enumerate(companies):
-                st.markdown(f"**Processing: {company}**")
-                
-                # The downloader methods will call stream_log(), which calls st.code()
-                # These logs will appear right here in the flow
-                downloader.search_company(company)
-                downloader.download_reports(company, min_pages=min_pages, primary_only=primary_only)
-                
-                progress_bar.progress((i + 1) / len(companies))
-                
-            st.success("✅ Batch processing complete!")
+            submit_batch(f"Research: {batch_label(companies)}",
+                         functools.partial(run_research, downloader=downloader, journal=journal, search_index=search_index,
+                                           run_id=run_id, companies=companies, min_pages=min_pages, primary_only=primary_only,
+                                           prioritize=prioritize, max_minutes=max_minutes, max_mb=max_mb,
+                                           num_workers=num_workers),
+                         total=len(companies))
 
 with tab3:
     st.header("Batch Model Download")
@@ -174,25 +400,13 @@ with tab3:
     model_tickers = st.text_input("Enter Company Tickers for Models (comma-separated):", "Apple, Tesla", key="model_tickers")
     
     if st.button("Download Models Only"):
-        if not downloader.driver:
+        if not browser_ready():
             st.error("🚨 Browser is not running. Please click 'Launch Browser' in the sidebar first.")
         else:
-            st.subheader("Model Download Logs")
-            
             companies = [c.strip() for c in model_tickers.split(",") if c.strip()]
-            
-            progress_bar = st.progress(0)
-            
-            for i, company in enumerate(companies):
-                st.markdown(f"**Processing Model for: {company}**")
-                
-                downloader.search_company(company)
-                # Pass models_only=True
-                downloader.download_reports(company, min_pages=1, primary_only=True, models_only=True)
-                
-                progress_bar.progress((i + 1) / len(companies))
-                
-            st.success("✅ Batch model download complete!")
+            submit_batch(f"Models: {batch_label(companies)}",
+                         functools.partial(run_models, downloader=downloader, companies=companies),
+                         total=len(companies))
 
 with tab2:
     st.header("Watchlist Management")
@@ -206,38 +420,46 @@ with tab2:
     else:
         st.info("Watchlist is empty.")
         
-    # Add Ticker
+    # Add Tickers (one request for the whole list)
     with st.form("add_ticker_form"):
-        new_ticker = st.text_input("Add New Ticker")
-        add_submitted = st.form_submit_button("Add Ticker")
-        if add_submitted and new_ticker:
-            if wm.add_ticker(new_ticker):
-                st.success(f"Added {new_ticker}")
+        new_tickers = st.text_area("Add Tickers (comma, space or one per line)")
+        add_submitted = st.form_submit_button("Add Tickers")
+        if add_submitted and new_tickers:
+            added = wm.add_tickers(re.split(r"[,\s]+", new_tickers))
+            if added:
+                st.success(f"Added {len(added)}: {', '.join(added[:20])}{' ...' if len(added) > 20 else ''}")
                 st.rerun()
             else:
-                st.warning("Ticker already exists or invalid.")
+                st.warning("Tickers already exist or invalid.")
 
-    # Remove Ticker
+    # Remove Tickers
     if watchlist:
         with st.form("remove_ticker_form"):
-            rem_ticker = st.selectbox("Select Ticker to Remove", watchlist)
-            rem_submitted = st.form_submit_button("Remove Ticker")
-            if rem_submitted:
-                if wm.remove_ticker(rem_ticker):
-                    st.success(f"Removed {rem_ticker}")
+            rem_tickers = st.multiselect("Select Tickers to Remove", watchlist)
+            rem_submitted = st.form_submit_button("Remove Tickers")
+            if rem_submitted and rem_tickers:
+                removed = wm.remove_tickers(rem_tickers)
+                if removed:
+                    st.success(f"Removed {', '.join(removed)}")
                     st.rerun()
 
     st.markdown("---")
     st.subheader("Auto-Update")
     st.write("Check for reports updated in the last 30 days for all watchlist companies.")
     
+    col1, col2 = st.columns(2)
+    with col1:
+        watch_minutes = st.number_input("Time Budget (minutes, 0 = none)", min_value=0, value=0, step=5, key="watch_minutes")
+    with col2:
+        watch_mb = st.number_input("Data Budget (MB, 0 = none)", min_value=0, value=0, step=100, key="watch_mb")
+    
     if st.button("Check Watchlist Updates"):
-        if not downloader.driver:
+        if not browser_ready():
             st.error("🚨 Browser is not running. Please click 'Launch Browser' in the sidebar first.")
         else:
-            st.subheader("Update Logs")
-            downloader.check_watchlist_updates(wm)
-            st.success("✅ Watchlist update check complete!")
+            submit_batch("Watchlist update check",
+                         functools.partial(run_watchlist_check, downloader=downloader, wm=wm,
+                                           budget=RunBudget.from_limits(watch_minutes or None, watch_mb or None)))
 
     st.markdown("---")
     st.subheader("Settings")
@@ -252,8 +474,54 @@ with tab2:
             else:
                 st.error("Failed to save path.")
 
+with tab4:
+    st.header("Search Downloaded Reports")
+    stats = search_index.stats()
+    st.caption(f"{stats['documents']} reports from {stats['companies']} companies indexed"
+               + (f" (last update {stats['last_indexed']})" if stats["last_indexed"] else ""))
+    
+    search_query = st.text_input("Search text", placeholder='e.g. "free cash flow" AND guidance, margin*')
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        search_company = st.selectbox("Company", ["All"] + search_index.companies())
+    with col2:
+        search_flag = st.selectbox("Type", ["All", "Initiations", "Rating Changes"])
+    with col3:
+        search_from = st.date_input("From", value=None)
+    with col4:
+        search_to = st.date_input("To", value=None)
+    
+    if st.button("Update Index"):
+        # Runs on the batch thread like the downloads, so a large folder does not block the page
+        submit_batch("Update search index",
+                     functools.partial(run_index_update, search_index=search_index,
+                                       downloads_root=st.session_state.custom_download_path,
+                                       manifest=downloader.manifest if downloader else None))
+    
+    results = search_index.search(
+        search_query,
+        company=None if search_company == "All" else search_company,
+        date_from=search_from.isoformat() if search_from else None,
+        date_to=search_to.isoformat() if search_to else None,
+        initiation=True if search_flag == "Initiations" else None,
+        rating_change=True if search_flag == "Rating Changes" else None,
+        limit=50
+    )
+    if not results:
+        st.info("No matching reports.")
+    for r in results:
+        tags = " ".join(tag for tag, on in (("🟢 Initiation", r["initiation"]), ("🔄 Rating Change", r["rating_change"])) if on)
+        st.markdown(f"**{r['title']}** — {r['company']} · {r['report_date'] or 'unknown date'} · {r['page_count'] or '?'}pg {tags}")
+        if r["snippet"]:
+            st.caption(r["snippet"])
+        st.text(r["path"])
+
 # --- Log History ---
 st.markdown("---")
 with st.expander("View Full Session Log History"):
-    for log in st.session_state.logs:
-        st.text(log)
+    session_log = runner.logs
+    log_pages = session_log.pages(size=200)
+    log_page = st.number_input(f"Page (1 = newest, {log_pages} total)", min_value=1, max_value=log_pages, value=1, step=1)
+    st.code("\n".join(session_log.page(log_page - 1, size=200)) or "No logs yet.", language="text")
+    if session_log.spilled:
+        st.caption(f"{session_log.spilled} older messages were moved to {session_log.spill_path}")
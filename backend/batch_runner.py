@@ -0,0 +1,124 @@
+import time
+import uuid
+import threading
+from log_sink import SessionLog
+
+class Batch:
+    """
+    One unit of work submitted to a BatchRunner (e.g. a research run over some companies).
+    status: queued, running, done, cancelled, failed
+    """
+    def __init__(self, name, fn, total=0):
+        self.id = uuid.uuid4().hex[:8]
+        self.name = name
+        self.fn = fn
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.done = 0
+        self.total = total
+        self.result = None # {"level": "success" | "warning" | "error", "message"} set by fn or on failure
+        self.cancel_event = threading.Event()
+
+    def should_stop(self):
+        return self.cancel_event.is_set()
+
+    def progress(self, done, total=None):
+        self.done = done
+        if total is not None:
+            self.total = total
+
+    def finish(self, level, message):
+        self.result = {"level": level, "message": message}
+
+    def elapsed(self):
+        if not self.started_at:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+class BatchRunner:
+    """
+    Runs submitted batches one after another on a background thread, so a long run
+    survives UI reruns and further batches can be queued behind it.
+    fn(batch) does the work; it should check batch.should_stop() between steps (and pass it
+    on as should_stop) and report batch.progress(). Everything it logs goes to the shared
+    SessionLog, which the UI reads.
+    """
+    def __init__(self, log=None, history=20):
+        self.logs = log or SessionLog()
+        self.history = history
+        self.batches = [] # submission order, finished ones trimmed to `history`
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def log(self, message):
+        self.logs.append(message)
+
+    def submit(self, name, fn, total=0):
+        batch = Batch(name, fn, total)
+        with self._cond:
+            self.batches.append(batch)
+            finished = [b for b in self.batches if b.finished_at]
+            for old in finished[:max(0, len(finished) - self.history)]:
+                self.batches.remove(old)
+            if not self._thread or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="batch-runner", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+        self.log(f"Batch {batch.id} queued: {name}")
+        return batch
+
+    def cancel(self, batch_id):
+        """
+        Drops a queued batch, or asks the running one to stop after its current report.
+        """
+        with self._cond:
+            batch = next((b for b in self.batches if b.id == batch_id), None)
+            if not batch or batch.finished_at:
+                return batch
+            batch.cancel_event.set()
+            if batch.status == "queued":
+                batch.status = "cancelled"
+                batch.finished_at = time.time()
+        self.log(f"Batch {batch.id} cancellation requested.")
+        return batch
+
+    def running(self):
+        with self._cond:
+            return next((b for b in self.batches if b.status == "running"), None)
+
+    def queued(self):
+        with self._cond:
+            return [b for b in self.batches if b.status == "queued"]
+
+    def finished(self):
+        with self._cond:
+            return [b for b in self.batches if b.finished_at]
+
+    def busy(self):
+        with self._cond:
+            return any(b.status in ("queued", "running") for b in self.batches)
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                batch = next((b for b in self.batches if b.status == "queued"), None)
+                if batch is None:
+                    # Exit when idle; submit() starts a new thread
+                    self._thread = None
+                    return
+                batch.status = "running"
+                batch.started_at = time.time()
+            self.log(f"Batch {batch.id} started: {batch.name}")
+            try:
+                batch.fn(batch)
+                status = "cancelled" if batch.should_stop() else "done"
+            except Exception as e:
+                self.log(f"Batch {batch.id} failed: {e}")
+                batch.finish("error", f"Batch failed: {e}")
+                status = "failed"
+            with self._cond:
+                batch.status = status
+                batch.finished_at = time.time()
+            self.log(f"Batch {batch.id} {status} after {batch.elapsed() / 60:.1f} min.")
@@ -0,0 +1,167 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+from mock_portal import MockPortal
+from metrics import Metrics
+
+def run_benchmark(companies=5, pages=3, per_page=10, layout="grid", pdf_kb=200, latency_ms=50,
+                  http_workers=4, listing_api=True, workers=1, report_tabs=1, crawl_profile="full",
+                  keep_files=False, log=print):
+    """
+    Runs search -> paginate -> download against a local MockPortal in headless Chrome.
+    Returns a dict with throughput, page-load times, Chrome memory and the per-stage metrics summary.
+    """
+    # Imported here so the mock portal can be used without Selenium installed
+    from core import GSResearchDownloader
+    from worker_pool import BrowserWorkerPool
+
+    os.environ["HEADLESS_MODE"] = "true"
+    portal = MockPortal(companies, pages, per_page, layout, pdf_kb, latency_ms).start()
+    download_dir = tempfile.mkdtemp(prefix="gs_bench_")
+    metrics = Metrics()
+    downloader = None
+    pool = None
+    rss = {"peak": 0.0, "samples": []}
+    sampling = threading.Event()
+    log(f"Mock portal at {portal.url}, downloading into {download_dir}")
+
+    try:
+        downloader = GSResearchDownloader(download_dir, log_callback=lambda m: None, http_workers=http_workers,
+                                          listing_api=listing_api, metrics=metrics, base_url=portal.url,
+                                          report_tabs=report_tabs, crawl_profile=crawl_profile)
+        downloader.login_init()
+
+        def sample_memory():
+            # Chrome RSS of the main browser (chromedriver + all its processes) once a second
+            while not sampling.wait(1.0):
+                mb = downloader.supervisor.memory_mb()
+                if mb:
+                    rss["samples"].append(mb)
+                    rss["peak"] = max(rss["peak"], mb)
+        threading.Thread(target=sample_memory, name="bench-rss", daemon=True).start()
+
+        totals = {"downloaded": 0, "bytes": 0}
+        totals_lock = threading.Lock()
+        def task(worker, company):
+            worker.search_company(company)
+            result = worker.download_reports(company, min_pages=1, primary_only=True)
+            with totals_lock:
+                totals["downloaded"] += result["downloaded"]
+                totals["bytes"] += result["bytes"]
+
+        start = time.perf_counter()
+        if workers > 1:
+            pool = BrowserWorkerPool(downloader, num_workers=workers, log_callback=lambda m: None)
+            pool.run(portal.tickers, task)
+        else:
+            for company in portal.tickers:
+                task(downloader, company)
+        elapsed = time.perf_counter() - start
+    finally:
+        sampling.set()
+        if pool:
+            pool.close()
+        if downloader:
+            downloader.close()
+        portal.stop()
+        if not keep_files:
+            shutil.rmtree(download_dir, ignore_errors=True)
+
+    minutes = elapsed / 60
+    page_load = metrics.summary()["stages"].get("page_load", {})
+    return {
+        "config": {
+            "companies": companies, "pages": pages, "per_page": per_page, "layout": layout,
+            "pdf_kb": pdf_kb, "latency_ms": latency_ms, "http_workers": http_workers,
+            "listing_api": listing_api, "workers": workers, "report_tabs": report_tabs,
+            "crawl_profile": crawl_profile
+        },
+        "elapsed_seconds": round(elapsed, 2),
+        "reports": totals["downloaded"],
+        "expected_reports": companies * pages * per_page,
+        "megabytes": round(totals["bytes"] / 1024 / 1024, 2),
+        "companies_per_min": round(companies / minutes, 2) if minutes else None,
+        "reports_per_min": round(totals["downloaded"] / minutes, 2) if minutes else None,
+        "page_load_p50_seconds": page_load.get("p50_seconds"),
+        "page_load_p95_seconds": page_load.get("p95_seconds"),
+        "chrome_rss_peak_mb": round(rss["peak"], 1) if rss["samples"] else None,
+        "chrome_rss_avg_mb": round(sum(rss["samples"]) / len(rss["samples"]), 1) if rss["samples"] else None,
+        "portal_requests": portal.requests,
+        "portal_megabytes": round(portal.bytes_sent / 1024 / 1024, 2),
+        "metrics": metrics.summary(),
+        "report": metrics.report()
+    }
+
+def compare(result, baseline, threshold=0.10):
+    """
+    Lines describing throughput and p95 changes against a previous result. Slowdowns above
+    `threshold` are marked as regressions.
+    """
+    lines = ["Compared with baseline:"]
+    for key in ("companies_per_min", "reports_per_min"):
+        old, new = baseline.get(key), result.get(key)
+        if old and new:
+            change = (new - old) / old
+            flag = "  <-- REGRESSION" if change < -threshold else ""
+            lines.append(f"  {key}: {old} -> {new} ({change:+.0%}){flag}")
+    # Lower is better for these
+    for key in ("page_load_p95_seconds", "chrome_rss_peak_mb", "portal_megabytes"):
+        old, new = baseline.get(key), result.get(key)
+        if old and new:
+            change = (new - old) / old
+            flag = "  <-- REGRESSION" if change > threshold else ""
+            lines.append(f"  {key}: {old} -> {new} ({change:+.0%}){flag}")
+    old_stages = baseline.get("metrics", {}).get("stages", {})
+    for name, stage in sorted(result["metrics"]["stages"].items()):
+        old = old_stages.get(name, {}).get("p95_seconds")
+        new = stage["p95_seconds"]
+        if old:
+            change = (new - old) / old
+            flag = "  <-- REGRESSION" if change > threshold and new - old > 0.05 else ""
+            lines.append(f"  {name} p95: {old:.2f}s -> {new:.2f}s ({change:+.0%}){flag}")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark GSResearchDownloader against a local mock portal.")
+    parser.add_argument("--companies", type=int, default=5)
+    parser.add_argument("--pages", type=int, default=3, help="Result pages per company")
+    parser.add_argument("--per-page", type=int, default=10)
+    parser.add_argument("--layout", choices=["grid", "table", "mixed"], default="grid")
+    parser.add_argument("--pdf-kb", type=float, default=200)
+    parser.add_argument("--latency-ms", type=float, default=50, help="Added to every portal response")
+    parser.add_argument("--http-workers", type=int, default=4, help="0 = download every PDF through a browser tab")
+    parser.add_argument("--dom-only", action="store_true", help="Page through the UI instead of the listing API")
+    parser.add_argument("--workers", type=int, default=1, help="Parallel browsers")
+    parser.add_argument("--report-tabs", type=int, default=1, help="Report tabs per browser (with --http-workers 0)")
+    parser.add_argument("--crawl-profile", choices=["full", "lean"], default="full",
+                        help="lean = block images/fonts/CSS/analytics, eager page loads, low-memory Chrome flags")
+    parser.add_argument("--output", help="Write the result as JSON to this file")
+    parser.add_argument("--baseline", help="Earlier --output file to compare against")
+    parser.add_argument("--keep-files", action="store_true")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.companies, args.pages, args.per_page, args.layout, args.pdf_kb, args.latency_ms,
+                           http_workers=args.http_workers, listing_api=not args.dom_only,
+                           workers=args.workers, report_tabs=args.report_tabs,
+                           crawl_profile=args.crawl_profile, keep_files=args.keep_files)
+
+    print(f"\n{result['reports']}/{result['expected_reports']} reports, {result['megabytes']} MB in {result['elapsed_seconds']}s")
+    print(f"Throughput: {result['companies_per_min']} companies/min, {result['reports_per_min']} reports/min")
+    print(f"Page loads: p50 {result['page_load_p50_seconds']}s, p95 {result['page_load_p95_seconds']}s; "
+          f"Chrome RSS: peak {result['chrome_rss_peak_mb']} MB, avg {result['chrome_rss_avg_mb']} MB; "
+          f"portal traffic: {result['portal_requests']} requests, {result['portal_megabytes']} MB")
+    print(result["report"])
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            print(compare(result, json.load(f)))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=4)
+        print(f"Saved to {args.output}")
+    if result["reports"] < result["expected_reports"]:
+        sys.exit(1)
@@ -0,0 +1,62 @@
+import os
+import shutil
+import threading
+from manifest import file_sha256
+
+class BlobStore:
+    """
+    Content-addressed store for report PDFs under <download_dir>/.blobs/<aa>/<sha256>.pdf.
+    Company folders hold hardlinks to the blobs (symlinks, or copies as a last resort,
+    where hardlinks are not possible), so a report tagged to several companies, or
+    downloaded again under another name, is stored on disk once.
+    """
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def blob_path(self, sha256):
+        return os.path.join(self.root, sha256[:2], f"{sha256}.pdf")
+
+    def has(self, sha256):
+        return bool(sha256) and os.path.exists(self.blob_path(sha256))
+
+    def add(self, path, sha256=None):
+        """
+        Moves a downloaded file into the store and leaves a link at its path.
+        If the same content is already stored, the new copy is dropped in favour of a link.
+        Returns (sha256, deduplicated).
+        """
+        sha256 = sha256 or file_sha256(path)
+        blob = self.blob_path(sha256)
+        with self._lock:
+            if os.path.exists(blob):
+                if os.path.samefile(blob, path):
+                    return sha256, False
+                os.remove(path)
+                self._link(blob, path)
+                return sha256, True
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            os.replace(path, blob)
+            self._link(blob, path)
+        return sha256, False
+
+    def link(self, sha256, target_path):
+        """
+        Puts the stored blob at target_path. Raises KeyError if the blob is missing.
+        """
+        blob = self.blob_path(sha256)
+        if not os.path.exists(blob):
+            raise KeyError(sha256)
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        self._link(blob, target_path)
+        return target_path
+
+    def _link(self, blob, target_path):
+        try:
+            os.link(blob, target_path)
+        except OSError:
+            try:
+                os.symlink(blob, target_path)
+            except OSError:
+                shutil.copy2(blob, target_path)
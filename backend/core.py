@@ -1,8 +1,6 @@
 import os
 import time
-import glob
 import shutil
-import re
 from datetime import datetime, timedelta
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
@@ -10,33 +8,162 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+from waits import SmartWaiter
+from http_downloader import SessionDownloader
+from manifest import DownloadManifest, normalize_title, report_id_from_url
+from blob_store import BlobStore
+from download_tracker import DownloadTracker
+from listing_api import capture_listing_endpoint, ListingCrawler
+from resolution_cache import CompanyPageCache
+from driver_supervisor import DriverSupervisor
+from session_store import SessionStore, chromedriver_path
+from metrics import METRICS, timed, instrument_driver
+from priority_scheduler import PriorityScheduler
+from tab_pool import ReportTabPool
+from crawl_profile import CrawlProfile
+from selector_registry import SelectorRegistry
+from portal_selectors import (SEARCH_BOX_SELECTOR, MODEL_SECTION_SELECTOR, REPORT_LINK_SELECTOR,
+                              NEXT_PAGE_SELECTORS, PDF_SELECTORS)
+
+# Reads every result on the current page in one round trip. Handles both the grid
+# view (div[data-testid='search-item-content']) and the table view (tr rows with
+# .SearchResults__colCopy). Returns {mode, first, items} where `first` is the first
+# container element (used to detect the page change) and each item is
+# {url, title, pages, date (epoch ms or null), flags}.
+EXTRACT_ITEMS_SCRIPT = r"""
+const parsePages = (text) => {
+    const m = /(\d+)\s*(pg|pp|pages)/i.exec(text || "");
+    return m ? parseInt(m[1], 10) : 0;
+};
+const parseDate = (el) => {
+    const time = el.querySelector("time[datetime]");
+    const candidates = [time ? time.getAttribute("datetime") : null];
+    const text = el.innerText || "";
+    const patterns = [
+        /\b\d{4}-\d{2}-\d{2}\b/,
+        /\b\d{1,2} [A-Z][a-z]{2,8} \d{4}\b/,
+        /\b[A-Z][a-z]{2,8} \d{1,2}, \d{4}\b/
+    ];
+    for (const p of patterns) {
+        const m = p.exec(text);
+        if (m) candidates.push(m[0]);
+    }
+    for (const c of candidates) {
+        const ts = c ? Date.parse(c) : NaN;
+        if (!isNaN(ts)) return ts;
+    }
+    return null;
+};
+const flags = (text) => ({
+    initiation: text.includes("Initiation"),
+    rating_change: text.includes("Rating Change")
+});
+
+let mode = "unknown";
+let containers = Array.from(document.querySelectorAll("div[data-testid='search-item-content']"));
+if (containers.length) {
+    mode = "grid";
+} else {
+    containers = Array.from(document.querySelectorAll("tr")).filter(r => r.querySelector(".SearchResults__colCopy"));
+    if (containers.length) mode = "table";
+}
+
+const items = [];
+for (const c of containers) {
+    const text = c.innerText || "";
+    const item = {url: "", title: "", pages: 0, date: null, flags: flags(text)};
+    if (mode === "grid") {
+        const link = c.querySelector("a");
+        const meta = c.querySelector("div[data-testid='search-item-metadata']");
+        if (link) { item.url = link.href; item.title = link.innerText; }
+        item.pages = parsePages(meta ? meta.innerText : "");
+        item.date = parseDate(c);
+    } else {
+        const link = c.querySelector(".SearchResults__colCopy a");
+        const pages = c.querySelector(".SearchResults__colPages");
+        const date = c.querySelector(".SearchResults__colDate .SearchResults__hiddenEl");
+        if (link) { item.url = link.href; item.title = link.innerText; }
+        const pagesText = pages ? pages.innerText.trim() : "";
+        item.pages = /^\d+$/.test(pagesText) ? parseInt(pagesText, 10) : 0;
+        // Hidden column holds a millisecond timestamp
+        const ts = date ? parseInt(date.textContent.trim(), 10) : NaN;
+        item.date = isNaN(ts) ? null : ts;
+    }
+    items.push(item);
+}
+return {mode: mode, first: containers.length ? containers[0] : null, items: items};
+"""
 
 class GSResearchDownloader:
-    def __init__(self, download_dir="downloads", log_callback=None):
-        self.base_url = "https://publishing.gs.com/"
+    def __init__(self, download_dir="downloads", log_callback=None, staging_dir=None, wait_timeouts=None, http_workers=4, listing_api=True,
+                 recycle_after=150, max_memory_mb=1500, profile=None, metrics=None, base_url="https://publishing.gs.com/",
+                 report_tabs=1, crawl_profile=None):
+        self.base_url = base_url
         self.download_dir = os.path.abspath(download_dir)
+        # Launch options shared with extra pool browsers (see BrowserWorkerPool). The Chrome
+        # profile is left out: it can only be open in one Chrome at a time.
+        self.settings = {
+            "download_dir": self.download_dir, "wait_timeouts": wait_timeouts, "http_workers": http_workers,
+            "listing_api": listing_api, "recycle_after": recycle_after, "max_memory_mb": max_memory_mb,
+            "base_url": base_url, "report_tabs": report_tabs, "crawl_profile": crawl_profile
+        }
+        # Chrome drops files here before they are moved into the company folder.
+        # Parallel workers each get their own so they never pick up each other's files.
+        self.staging_dir = os.path.abspath(staging_dir or os.path.join(self.download_dir, ".staging", "main"))
         self.log_callback = log_callback
+        # Stage timings and counters (shared process-wide unless a Metrics instance is passed)
+        self.metrics = metrics or METRICS
+        # Replay the portal's listing XHR over HTTP instead of paging through the UI (needs http_workers)
+        self.listing_api = listing_api and bool(http_workers)
+        # Report tabs kept in flight by the browser download path (see ReportTabPool); 1 = one at a time
+        self.report_tabs = max(1, report_tabs)
+        # What Chrome loads while crawling: "full" (default) or "lean" (see CrawlProfile)
+        self.crawl_profile = CrawlProfile.get(crawl_profile)
         
-        # --- SELECTORS (Updated based on user's Adobe Inc. report HTML) ---
-        self.SEARCH_BOX_SELECTOR = "div[data-cy='gs-uitk-header__search__search-input'] input"
-        self.MODEL_SECTION_SELECTOR = "react-company-model-v2[data-title='DOWNLOAD MODEL']"
-        self.REPORT_LINK_SELECTOR = "a[href*='/content/research/en/reports/']"
+        # --- SELECTORS (see portal_selectors, shared with the mock portal) ---
+        self.SEARCH_BOX_SELECTOR = SEARCH_BOX_SELECTOR
+        self.MODEL_SECTION_SELECTOR = MODEL_SECTION_SELECTOR
+        self.REPORT_LINK_SELECTOR = REPORT_LINK_SELECTOR
         # --------------------------------------------------------------------------
 
-        if not os.path.exists(self.download_dir):
-            os.makedirs(self.download_dir)
+        os.makedirs(self.download_dir, exist_ok=True)
+        os.makedirs(self.staging_dir, exist_ok=True)
+
+        # Index of downloaded reports used for duplicate checks
+        self.manifest = DownloadManifest(os.path.join(self.download_dir, "manifest.db"))
+        if self.manifest.is_new:
+            # First run against an existing folder: index what is already there, without
+            # holding up the browser launch (duplicate checks wait for it)
+            self.manifest.rebuild_in_background(self.download_dir, log=self.log)
+        # Report PDFs are stored once by content hash and hardlinked into company folders
+        self.blobs = BlobStore(os.path.join(self.download_dir, ".blobs"))
+
+        # Ticker/name -> company page URL, so repeat runs skip the search box
+        self.company_cache = CompanyPageCache(os.path.join(self.download_dir, "company_pages.json"))
+        # Which Next/PDF selector matched last time, so the usual one is tried first
+        self.selectors = SelectorRegistry(os.path.join(self.download_dir, "selectors.json"))
+
+        # Persistent Chrome profile + saved cookies for this app user, so relaunches stay logged in.
+        # Extra pool browsers leave this unset: a profile can only be open in one Chrome at a time.
+        self.session = SessionStore(profile) if profile else None
+        self.session_restored = False
 
         # Configure Chrome options
         self.options = webdriver.ChromeOptions()
         prefs = {
-            "download.default_directory": self.download_dir,
+            "download.default_directory": self.staging_dir,
             "download.prompt_for_download": False,
             "directory_upgrade": True,
             "safebrowsing.enabled": True,
             "plugins.always_open_pdf_externally": True
         }
+        self.crawl_profile.configure(self.options, prefs)
         self.options.add_experimental_option("prefs", prefs)
+        if self.session:
+            self.options.add_argument(f"--user-data-dir={self.session.profile_dir}")
+        if self.listing_api:
+            # Network events in the performance log let us find the listing request
+            self.options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
         
         # Headless mode for Streamlit Cloud / Linux
         # Use simple heuristic: if os.name != 'nt' (Windows) assume headless, or check for specific env vars
@@ -49,10 +176,35 @@ class GSResearchDownloader:
             self.options.add_argument("--window-size=1920,1080")
         
         # Initialize driver
-        try:
-            # 尝试自动安装并启动
-            self.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=self.options)
-        except Exception:
+        self.driver = None
+        self._start_driver()
+        
+        # Matches files appearing in the staging folder to the click that started them
+        self.downloads = DownloadTracker(self.staging_dir)
+        # Condition-driven waits; wait_timeouts overrides the per-step limits in waits.DEFAULT_TIMEOUTS
+        self.waits = SmartWaiter(self.driver, wait_timeouts, metrics=self.metrics)
+        # Direct HTTP download path for report PDFs (0 disables it and always uses the tab flow)
+        self.http = SessionDownloader(max_workers=http_workers) if http_workers else None
+        # Replaces the browser when it dies, hangs, or has been running too long
+        self.supervisor = DriverSupervisor(self, recycle_after=recycle_after, max_memory_mb=max_memory_mb)
+
+    def _start_driver(self):
+        """
+        Launches Chrome with self.options. Also used by the DriverSupervisor to replace a dead browser.
+        """
+        self.driver = None
+        # The pinned driver path skips webdriver_manager on warm starts. If it no longer
+        # works (e.g. Chrome was updated), look it up again once.
+        for refresh in (False, True):
+            driver_path = chromedriver_path(refresh=refresh)
+            if not driver_path:
+                break
+            try:
+                self.driver = webdriver.Chrome(service=Service(driver_path), options=self.options)
+                break
+            except Exception:
+                continue
+        if self.driver is None:
             # 如果自动安装失败（常见于 Streamlit Cloud），尝试使用默认系统路径
             try:
                 self.driver = webdriver.Chrome(options=self.options)
@@ -60,7 +212,16 @@ class GSResearchDownloader:
                 # 再次失败，抛出更清晰的错误信息
                 raise RuntimeError(f"Failed to initialize Chrome Driver. Error: {e}")
         
+        instrument_driver(self.driver, self.metrics)
+        self.crawl_profile.apply(self.driver)
         self.wait = WebDriverWait(self.driver, 20)
+        if getattr(self, "waits", None):
+            # Restarted browser: point the waits at it and restore the staging folder
+            self.waits.driver = self.driver
+            self.driver.execute_cdp_cmd("Browser.setDownloadBehavior", {
+                "behavior": "allow",
+                "downloadPath": self.staging_dir
+            })
 
     def log(self, message):
         if self.log_callback:
@@ -74,13 +235,99 @@ class GSResearchDownloader:
         """
         self.log(f"Opening {self.base_url}...")
         self.driver.get(self.base_url)
+        if self.session and self.restore_session():
+            return "Restored saved session. Already logged in."
         return "Please log in manually in the browser."
 
+    def is_logged_in(self):
+        """
+        True once the portal's search box is on the page (it is only shown to logged-in users).
+        """
+        return bool(self.waits.until("login_check", self.waits.any_present((By.CSS_SELECTOR, self.SEARCH_BOX_SELECTOR))))
+
+    def restore_session(self):
+        """
+        Checks whether the persistent profile is still logged in, and if not, tries the saved cookies.
+        """
+        self.session_restored = False
+        if self.is_logged_in():
+            self.log("Browser profile is still logged in.")
+            self.session_restored = True
+        else:
+            cookies = self.session.load_cookies()
+            if cookies:
+                self.log("Restoring saved session cookies...")
+                self.load_session_cookies(cookies)
+                self.session_restored = self.is_logged_in()
+            if not self.session_restored:
+                self.log("Saved session has expired. Manual login required.")
+        if self.session_restored:
+            self.save_session()
+        return self.session_restored
+
+    def save_session(self, cookies=None):
+        """
+        Stores the current session cookies for the next launch. No-op without a profile.
+        """
+        if not self.session:
+            return
+        try:
+            self.session.save_cookies(cookies if cookies is not None else self.driver.get_cookies())
+        except Exception as e:
+            self.log(f"Could not save session cookies: {e}")
+
+    def get_session_cookies(self):
+        """
+        Returns the cookies of the logged-in session so other browsers can reuse it.
+        """
+        return self.driver.get_cookies()
+
+    def load_session_cookies(self, cookies):
+        """
+        Copies cookies from another browser into this one and reloads the portal.
+        Cookies can only be set for the domain currently loaded, so we open the portal first.
+        """
+        self.driver.get(self.base_url)
+        loaded = 0
+        for cookie in cookies:
+            try:
+                self.driver.add_cookie(cookie)
+                loaded += 1
+            except Exception:
+                # Cookies for other domains (e.g. SSO) cannot be set from here
+                pass
+        self.driver.refresh()
+        self.log(f"Loaded {loaded}/{len(cookies)} session cookies.")
+        return loaded
+
+    def set_staging_dir(self, staging_dir):
+        """
+        Points Chrome's downloads at a different folder on a running browser.
+        """
+        self.staging_dir = os.path.abspath(staging_dir)
+        os.makedirs(self.staging_dir, exist_ok=True)
+        self.downloads.close()
+        self.downloads = DownloadTracker(self.staging_dir)
+        self.driver.execute_cdp_cmd("Browser.setDownloadBehavior", {
+            "behavior": "allow",
+            "downloadPath": self.staging_dir
+        })
+
+    @timed("search_company")
     def search_company(self, company_ticker):
         """
         Searches for a company by ticker or name.
         """
         self.log(f"Searching for company: {company_ticker}")
+        try:
+            self.supervisor.before_company()
+        except Exception as e:
+            self.log(f"Browser health check failed: {e}")
+        if self.listing_api:
+            # The listing request may fire on the company page itself, so capture starts here
+            self._drain_performance_log()
+        if self._open_cached_company_page(company_ticker):
+            return
         try:
             # Wait for the search box to be present
             search_box = self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, self.SEARCH_BOX_SELECTOR)))
@@ -94,15 +341,25 @@ class GSResearchDownloader:
             # Clear existing text and enter new search term
             search_box.clear()
             search_box.send_keys(company_ticker)
-            time.sleep(2) # Wait for UI to react/dropdown
+            # Wait for UI to react/dropdown
+            self.waits.until("search_dropdown", self.waits.any_present(
+                (By.CSS_SELECTOR, "[role='listbox'] [role='option']"),
+                (By.CSS_SELECTOR, "div[data-testid='search-item-content']")
+            ))
+            start_url = self.driver.current_url
             search_box.send_keys(Keys.RETURN)
             
             self.log("Search submitted. Waiting for navigation...")
-            time.sleep(5) # Wait for page load
+            # Done as soon as the company dashboard shows up, or the new page has settled
+            self.waits.until("search_navigation", self.waits.any_of(
+                lambda d: self._is_on_company_page(),
+                self.waits.all_of(self.waits.url_changed(start_url), self.waits.network_idle())
+            ))
 
             # Check if we are already on the dashboard (Model section exists)
             if self._is_on_company_page():
                 self.log("Successfully navigated to company page.")
+                self.company_cache.set(company_ticker, self.driver.current_url)
                 return
 
             # If not, we might be on a search results page.
@@ -144,9 +401,10 @@ class GSResearchDownloader:
                     found_link.click()
                     
                     # Wait again for navigation
-                    time.sleep(5)
+                    self.waits.until("result_navigation", lambda d: self._is_on_company_page())
                     if self._is_on_company_page():
                         self.log("Clicked result and navigated to company page.")
+                        self.company_cache.set(company_ticker, self.driver.current_url)
                     else:
                         self.log("Clicked link but still not detecting company page elements.")
                 else:
@@ -160,6 +418,26 @@ class GSResearchDownloader:
             self.log(f"Error searching for company: {e}")
             self.log(f"Please check if selector '{self.SEARCH_BOX_SELECTOR}' is correct.")
 
+    def _open_cached_company_page(self, company_ticker):
+        """
+        Opens the company page remembered from an earlier search.
+        Returns False (and forgets the entry if it is stale) when the search box is needed.
+        """
+        cached_url = self.company_cache.get(company_ticker)
+        if not cached_url:
+            return False
+        try:
+            self.log(f"Opening cached company page: {cached_url}")
+            self.driver.get(cached_url)
+            if self.waits.until("cached_page", lambda d: self._is_on_company_page()):
+                self.log("Successfully navigated to company page.")
+                return True
+        except Exception as e:
+            self.log(f"Error opening cached company page: {e}")
+        self.log("Cached company page did not load. Searching again...")
+        self.company_cache.invalidate(company_ticker)
+        return False
+
     def _is_on_company_page(self):
         """Checks if the current page has company dashboard elements."""
         try:
@@ -167,18 +445,29 @@ class GSResearchDownloader:
         except:
             return False
 
-    def download_reports(self, company_name, min_pages=1, primary_only=True, days_filter=None, models_only=False):
+    def download_reports(self, company_name, min_pages=1, primary_only=True, days_filter=None, models_only=False, high_water=None,
+                         should_stop=None, on_report=None, checkpoint=None, collect=None):
         """
         Identifies and downloads models and reports.
         days_filter: int, optional. If set, only download reports from the last N days.
         models_only: bool, optional. If True, only download the model and skip reports.
+        high_water: dict, optional. {"date", "report_id"} of the newest report seen last time.
+            When given (even empty), results are treated as newest-first and paging stops at the
+            first report that was already seen or is older than the mark / days_filter cutoff.
+        should_stop: callable, optional. Checked before each report; returning True ends the run early.
+        on_report: callable(report, path, size), optional. Called after each finished report download.
+        checkpoint: CompanyCheckpoint, optional. Run journal entry for this company; pages it has
+            already finished are skipped and every report's status is recorded.
+        collect: list, optional. Listing-only mode: reports that pass the filters are appended
+            here (see fetch_reports) instead of being downloaded.
+        Returns {"downloaded": int, "bytes": int, "newest": {"date", "report_id"} or None}.
         """
+        result = {"downloaded": 0, "bytes": 0, "failed": 0, "newest": None}
         self.log(f"Attempting to find {'models only' if models_only else 'reports and models'} for {company_name}...")
         
         # Create a specific directory for this company
         company_dir = os.path.join(self.download_dir, company_name)
-        if not os.path.exists(company_dir):
-            os.makedirs(company_dir)
+        os.makedirs(company_dir, exist_ok=True)
 
         # 1. Handle Primary Tab
         if primary_only:
@@ -193,7 +482,10 @@ class GSResearchDownloader:
                 download_btn = model_section[0].find_element(By.CSS_SELECTOR, "a") # The link wraps the button
                 if download_btn:
                     self.log("Downloading Model...")
-                    self._click_and_download(download_btn, company_dir, f"{company_name}_Model")
+                    model_path = self._click_and_download(download_btn, company_dir, f"{company_name}_Model")
+                    if model_path:
+                        result["bytes"] += os.path.getsize(model_path)
+                        self.metrics.incr("bytes_downloaded", os.path.getsize(model_path), kind="model")
             else:
                 self.log("No Model section found.")
         except Exception as e:
@@ -201,11 +493,12 @@ class GSResearchDownloader:
             
         if models_only:
             self.log("Models only mode enabled. Skipping reports download.")
-            return
+            return result
     
         # 3. Download Reports
         try:
             # 3.1 Click "View More" if available to see all reports
+            view_more_start = time.perf_counter()
             try:
                 # Selector based on user HTML: <span ...>View More</span> inside an <a> tag
                 view_more_links = self.driver.find_elements(By.XPATH, "//span[contains(text(), 'View More')]")
@@ -214,20 +507,57 @@ class GSResearchDownloader:
                         # Click the parent <a> or the span itself
                         parent = vm.find_element(By.XPATH, "./..")
                         self.log("Found 'View More' link, clicking to expand...")
+                        start_url = self.driver.current_url
                         parent.click()
-                        time.sleep(5) # Wait for search page load
+                        # Wait for search page load
+                        self.waits.until("view_more", self.waits.all_of(
+                            self.waits.any_of(self.waits.url_changed(start_url), EC.staleness_of(parent)),
+                            self.waits.results_present
+                        ))
                         break
                     except:
                         pass
             except Exception as e:
                 self.log(f"No 'View More' link found or error clicking it: {e}")
+            self.metrics.observe("view_more", time.perf_counter() - view_more_start)
 
             # 3.2 Loop through pages
             page_num = 1
-            processed_count = 0
+            ctx = {
+                "company": company_name,
+                "company_dir": company_dir,
+                "min_pages": min_pages,
+                "days_filter": days_filter,
+                "cutoff_date": datetime.now() - timedelta(days=days_filter) if days_filter else None,
+                "high_water": high_water,
+                "processed": 0,
+                "result": result,
+                "should_stop": should_stop,
+                "on_report": on_report,
+                "checkpoint": checkpoint,
+                "interrupted": False,
+                "collect": collect,
+                "api_items_done": 0 # items the listing API handled before it failed
+            }
+            
+            if self.http:
+                self.http.sync_cookies(self.driver)
+            
+            # Fast path: replay the portal's own listing request over HTTP
+            if self.listing_api and self.http and self._crawl_listing_api(ctx):
+                return result
+            
+            # Page checkpoints mean "downloaded", so a listing-only pass always starts at page 1
+            pages_skipped = checkpoint.pages_done("dom") if checkpoint and collect is None else 0
+            if pages_skipped:
+                self.log(f"Resuming: pages 1-{pages_skipped} were finished in an earlier attempt.")
+            # Continue where a failed listing API crawl stopped (same order, so skip by item count)
+            skip_items = ctx["api_items_done"]
+            if skip_items:
+                self.log(f"Skipping the {skip_items} reports the listing API already handled.")
             
             while True:
-                self.log(f"Processing Page {page_num}...")
+                self.log(f"{'Skipping' if page_num <= pages_skipped else 'Processing'} Page {page_num}...")
                 
                 # Explicit wait for report items to load (especially after pagination)
                 try:
@@ -240,28 +570,9 @@ class GSResearchDownloader:
                     # If timeout, we just proceed to check (it might be empty really, or already loaded)
                     pass
 
-                # Initialize lists and mode
-                report_items = []
-                mode = "unknown"
-                
-                # Strategy 1: Grid View (Standard)
-                grid_items = self.driver.find_elements(By.CSS_SELECTOR, "div[data-testid='search-item-content']")
-                if grid_items:
-                    # self.log(f"Found {len(grid_items)} reports in Grid View.")
-                    report_items = grid_items
-                    mode = "grid"
-                else:
-                    # Strategy 2: Table View (Search Results Page)
-                    # Find all rows that have the copy column
-                    # We look for tr that contains .SearchResults__colCopy
-                    table_rows = self.driver.find_elements(By.CSS_SELECTOR, "tr")
-                    for row in table_rows:
-                        if row.find_elements(By.CLASS_NAME, "SearchResults__colCopy"):
-                            report_items.append(row)
-                    
-                    if report_items:
-                        # self.log(f"Found {len(report_items)} reports in Table View.")
-                        mode = "table"
+                # Read every item on the page (grid or table view) in a single call
+                page = self._extract_page_items()
+                report_items = page["items"]
                 
                 if not report_items:
                     self.log("No report items found in either Grid or Table view on this page.")
@@ -270,161 +581,34 @@ class GSResearchDownloader:
                     if page_num > 1:
                          self.log("Warning: Pagination occurred but no items found on new page.")
 
-                for i, container in enumerate(report_items):
-                    if processed_count >= 1000: # Global limit increased
+                if page_num > pages_skipped:
+                    if skip_items:
+                        handled = min(skip_items, len(report_items))
+                        skip_items -= handled
+                        report_items = report_items[handled:]
+                    if self._process_items(report_items, ctx):
                         break
-                        
-                    try:
-                        url = ""
-                        title = ""
-                        page_count = 0
-                        container_text = container.text # For prefix check
-                        report_date = None
-                        
-                        if mode == "grid":
-                            # Extract Link and Title (Grid)
-                            link_el = container.find_element(By.CSS_SELECTOR, "a")
-                            url = link_el.get_attribute("href")
-                            title = link_el.text
-                            
-                            # Extract Metadata (Page Count)
-                            try:
-                                metadata_el = container.find_element(By.CSS_SELECTOR, "div[data-testid='search-item-metadata']")
-                                metadata_text = metadata_el.text
-                                pg_match = re.search(r'(\d+)\s*(pg|pp|pages)', metadata_text, re.IGNORECASE)
-                                if pg_match:
-                                    page_count = int(pg_match.group(1))
-                            except:
-                                pass
-                                
-                        elif mode == "table":
-                            # Extract Link and Title (Table)
-                            # Look inside .SearchResults__colCopy
-                            col_copy = container.find_element(By.CLASS_NAME, "SearchResults__colCopy")
-                            link_el = col_copy.find_element(By.TAG_NAME, "a")
-                            url = link_el.get_attribute("href")
-                            title = link_el.text
-                            
-                            # Extract Page Count (Table)
-                            try:
-                                col_pages = container.find_element(By.CLASS_NAME, "SearchResults__colPages")
-                                pg_text = col_pages.text.strip() # e.g. "9"
-                                if pg_text.isdigit():
-                                    page_count = int(pg_text)
-                            except:
-                                pass
-
-                            # Extract Date (Table)
-                            try:
-                                date_el = container.find_element(By.CSS_SELECTOR, ".SearchResults__colDate .SearchResults__hiddenEl")
-                                ts = int(date_el.get_attribute("textContent").strip())
-                                # timestamp is milliseconds
-                                report_date = datetime.fromtimestamp(ts / 1000)
-                            except Exception as e:
-                                # self.log(f"Could not extract date: {e}")
-                                pass
-
-                        if not url or "/content/research/en/reports/" not in url:
-                            continue
-                            
-                        # Check Page Count Filter
-                        if page_count < min_pages:
-                            # self.log(f"Skipping report '{title[:30]}...' ({page_count} pages < {min_pages})")
-                            continue
-
-                        # Check Date Filter
-                        if days_filter and report_date:
-                            cutoff_date = datetime.now() - timedelta(days=days_filter)
-                            if report_date < cutoff_date:
-                                self.log(f"Skipping report '{title[:30]}...' (Date {report_date.date()} older than {days_filter} days)")
-                                continue
-
-                        # Check Duplicate (File Existence)
-                        # Create a safe version of the title to match against existing filenames
-                        # We used to take only first 30 chars, but let's be more robust
-                        # We'll check if the "safe_title" part is contained in any existing filename
-                        safe_title = "".join([c for c in title if c.isalnum() or c in " -_"]).strip()
-                        # Truncate to a reasonable length for filename matching (avoid OS limits but keep enough uniqueness)
-                        match_pattern = safe_title[:50] 
-                        
-                        existing_files = os.listdir(company_dir)
-                        is_duplicate = False
-                        
-                        # Check 1: Filename match (Loose)
-                        for f in existing_files:
-                            if match_pattern in f and f.endswith(".pdf"):
-                                is_duplicate = True
-                                break
-                        
-                        if is_duplicate:
-                            self.log(f"Skipping report '{title[:40]}...' (Already exists in folder)")
-                            continue
-
-                        # Determine Prefix (Rating Change / Initiation)
-                        prefix = ""
-                        if "Initiation" in title or "Initiation" in container_text:
-                            prefix = "A_Initiation_"
-                        elif "Rating Change" in title or "Rating Change" in container_text:
-                                prefix = "A_Rating_"
-                        
-                        full_prefix = f"{prefix}{company_name}_Report_{processed_count+1}"
-                        
-                        self.log(f"Processing Report {processed_count+1}: {title[:50]}... ({page_count}pg)")
-                        self._download_report_pdf(url, title, company_dir, full_prefix, processed_count+1)
-                        processed_count += 1
-                        
-                    except Exception as e:
-                        # self.log(f"Error processing report item {i}: {e}")
-                        continue
-                        
+                    self._checkpoint_page(ctx, "dom", page_num)
+
                 # 3.3 Check for Next Page
                 try:
                     # Selector based on user HTML: <a data-cy="gs-uitk-pagination__nav-link-next" ...>
                     next_btn = None
                     try:
                         # Capture the first item of the current page to wait for staleness later
-                        first_item_on_current_page = report_items[0] if report_items else None
-
-                        # Use the specific data-cy attribute found in HTML
-                        # Also keep fallback to aria-label and common classes
-                        next_selectors = [
-                            "a[data-cy='gs-uitk-pagination__nav-link-next']", 
-                            "a[aria-label='Goto next page']",
-                            "a[aria-label='Next page']",
-                            "a.SearchResults__paginationNext",
-                            ".SearchResults__paginationNext",
-                            "//a[contains(text(), 'Next')]",
-                            "//a[contains(text(), '>')]",
-                            "//a[contains(text(), '›')]",
-                            "//span[contains(text(), 'Next')]/parent::a",
-                            "//span[contains(text(), '>')]/parent::a"
-                        ]
-                        
-                        for sel in next_selectors:
-                            try:
-                                if sel.startswith("//"):
-                                    els = self.driver.find_elements(By.XPATH, sel)
-                                else:
-                                    els = self.driver.find_elements(By.CSS_SELECTOR, sel)
-                                
-                                if els:
-                                    # Check visibility and state
-                                    # Iterate to find the first visible one
-                                    for el in els:
-                                        if el.is_displayed() and el.get_attribute("aria-disabled") != "true" and "disabled" not in (el.get_attribute("class") or ""):
-                                            next_btn = el
-                                            self.log(f"Found 'Next' button using selector: {sel}")
-                                            break
-                                    if next_btn:
-                                        break
-                            except:
-                                pass
+                        first_item_on_current_page = page["first"]
+
+                        # First visible, enabled match, checked best-first in one call
+                        found = self.selectors.find(self.driver, "next_page", page["mode"], NEXT_PAGE_SELECTORS, visible=True)
+                        if found:
+                            next_btn, sel = found
+                            self.log(f"Found 'Next' button using selector: {sel}")
                                 
                         if next_btn:
                             self.log("Found 'Next' button. Moving to next page...")
+                            nav_start = time.perf_counter()
                             # Scroll to ensure it's in view
                             self.driver.execute_script("arguments[0].scrollIntoView(true);", next_btn)
-                            time.sleep(1)
                             
                             # Try standard click first
                             try:
@@ -445,7 +629,12 @@ class GSResearchDownloader:
                                 except:
                                     self.log("Warning: Timed out waiting for page update (staleness).")
                             
-                            time.sleep(5) # Extra buffer for new elements to render
+                            # Wait for new elements to render and the listing requests to finish
+                            self.waits.until("next_page", self.waits.all_of(
+                                self.waits.results_present,
+                                self.waits.network_idle()
+                            ))
+                            self.metrics.observe("next_page", time.perf_counter() - nav_start)
                             page_num += 1
                         else:
                             self.log("No 'Next' button found or it is disabled/hidden. Finished all pages.")
@@ -462,6 +651,299 @@ class GSResearchDownloader:
         except Exception as e:
             self.log(f"Error processing reports: {e}")
 
+        self.selectors.save()
+        return result
+
+    def _process_items(self, items, ctx):
+        """
+        Filters one page of extracted items and downloads the new reports (or, in listing-only
+        mode, adds them to ctx["collect"]).
+        Shared by the DOM crawl and the listing API crawl.
+        ctx: per-company state built in download_reports (filters, counters, result).
+        Returns True when paging should stop (already-seen report reached or global limit hit).
+        """
+        company_name = ctx["company"]
+        min_pages = ctx["min_pages"]
+        days_filter = ctx["days_filter"]
+        cutoff_date = ctx["cutoff_date"]
+        high_water = ctx["high_water"]
+        incremental = high_water is not None
+        result = ctx["result"]
+        stop_paging = False
+        pending = [] # downloads started on this page (HTTP or queued for the tab pool)
+
+        # Filtering below is pure Python over the extracted metadata
+        for i, item in enumerate(items):
+            if ctx["processed"] >= 1000: # Global limit increased
+                break
+            if ctx["should_stop"] and ctx["should_stop"]():
+                self.log("Stop requested. Ending report download.")
+                ctx["interrupted"] = True
+                stop_paging = True
+                break
+
+            url, title = item.get("url"), item.get("title")
+            try:
+                page_count = item["pages"]
+                report_date = item["date"]
+
+                if not url or "/content/research/en/reports/" not in url:
+                    continue
+
+                report_id = report_id_from_url(url)
+                newest = result["newest"]
+                if report_date and (newest is None or newest["date"] is None or report_date > newest["date"]):
+                    result["newest"] = {"date": report_date, "report_id": report_id}
+                elif newest is None:
+                    result["newest"] = {"date": None, "report_id": report_id}
+
+                # Incremental mode: everything from here on is already known
+                if incremental:
+                    if high_water.get("report_id") == report_id:
+                        self.log(f"Reached last seen report '{title[:30]}...'. Stopping.")
+                        stop_paging = True
+                        break
+                    mark_date = high_water.get("date")
+                    if report_date and ((cutoff_date and report_date < cutoff_date) or (mark_date and report_date < mark_date)):
+                        self.log(f"Reached report older than high-water mark/cutoff ({report_date.date()}). Stopping.")
+                        stop_paging = True
+                        break
+
+                # Check Page Count Filter
+                if page_count < min_pages:
+                    # self.log(f"Skipping report '{title[:30]}...' ({page_count} pages < {min_pages})")
+                    continue
+
+                # Check Date Filter
+                if cutoff_date and report_date:
+                    if report_date < cutoff_date:
+                        self.log(f"Skipping report '{title[:30]}...' (Date {report_date.date()} older than {days_filter} days)")
+                        continue
+
+                # Check Duplicate
+                # Check 1: Manifest lookup by report ID or normalized title
+                is_duplicate = self.manifest.find(url, company_name, title) is not None
+
+                # Check 2: Same report already downloading on this page (or already listed)
+                norm_title = normalize_title(title)
+                if any(url == p["url"] or norm_title == normalize_title(p["title"]) for p in pending + (ctx["collect"] or [])):
+                    is_duplicate = True
+
+                # Check 3: Finished earlier in this run (the file may have been moved since)
+                if ctx["checkpoint"] and ctx["checkpoint"].report_done(url):
+                    is_duplicate = True
+
+                if is_duplicate:
+                    self.log(f"Skipping report '{title[:40]}...' (Already exists in folder)")
+                    continue
+
+                # Determine Prefix (Rating Change / Initiation)
+                prefix = ""
+                kind = "other"
+                if "Initiation" in title or item["flags"]["initiation"]:
+                    prefix = "A_Initiation_"
+                    kind = "initiation"
+                elif "Rating Change" in title or item["flags"]["rating_change"]:
+                        prefix = "A_Rating_"
+                        kind = "rating_change"
+
+                index = ctx["processed"] + 1
+                full_prefix = f"{prefix}{company_name}_Report_{index}"
+
+                report = {
+                    "url": url,
+                    "title": title,
+                    "company": company_name,
+                    "date": report_date,
+                    "pages": page_count or None,
+                    "prefix": full_prefix,
+                    "kind": kind
+                }
+
+                if ctx["collect"] is not None:
+                    ctx["collect"].append(report)
+                    ctx["processed"] += 1
+                    continue
+
+                self.log(f"Processing Report {index}: {title[:50]}... ({page_count}pg)")
+                self._start_report(report, ctx, pending, index)
+                ctx["processed"] += 1
+                result["downloaded"] = ctx["processed"]
+
+            except Exception as e:
+                # One bad item (odd metadata, manifest error) must not end the page
+                self.log(f"Error processing report '{(title or url or '?')[:50]}': {e}")
+                if url:
+                    self._checkpoint_report(ctx, url, "failed")
+                self._count_failed(ctx)
+                continue
+
+        if pending:
+            self._finish_downloads(pending, ctx)
+
+        return stop_paging or ctx["processed"] >= 1000
+
+    def _start_report(self, report, ctx, pending, index=0):
+        """
+        Downloads one report: links an already stored copy, queues it on the HTTP pool or
+        the tab pool (appended to pending, see _finish_downloads) or fetches it through a browser tab.
+        """
+        url, title = report["url"], report["title"]
+        target_path = self._unique_path(os.path.join(ctx["company_dir"], self._report_filename(report["prefix"], title) + ".pdf"))
+        # Already downloaded for another company: link the stored copy instead of fetching it again
+        known_sha = self.manifest.find_sha256(url)
+        if known_sha and self.blobs.has(known_sha):
+            try:
+                self.blobs.link(known_sha, target_path)
+                self.log(f"Linked existing copy: {os.path.basename(target_path)}")
+                self._record_download(report, target_path, ctx, sha256=known_sha, linked=True)
+                return
+            except Exception as e:
+                self.log(f"Could not link stored copy ({e}). Downloading again.")
+        if self.http:
+            # Fast path: fetch over HTTP in the background, fall back to the tab flow
+            self._checkpoint_report(ctx, url, "queued")
+            report["future"] = self.http.submit(url, target_path)
+            pending.append(report)
+        elif self.report_tabs > 1:
+            # Loaded alongside the page's other reports, see _download_in_browser
+            self._checkpoint_report(ctx, url, "queued")
+            pending.append(report)
+        else:
+            self._checkpoint_report(ctx, url, "downloading")
+            path = self._download_report_pdf(url, title, ctx["company_dir"], report["prefix"], index)
+            self._record_download(report, path, ctx, browser=True)
+
+    def fetch_reports(self, reports, should_stop=None, on_report=None, checkpoint_for=None):
+        """
+        Downloads reports listed by download_reports(collect=...), in the order given (any
+        iterable, e.g. a priority queue). With HTTP workers up to http_workers downloads run
+        at once and finish in order; without, batches of report_tabs go through the tab pool.
+        should_stop is checked before each new download;
+        downloads already started are allowed to finish.
+        checkpoint_for: callable(company) -> CompanyCheckpoint, optional.
+        Returns {company: {"downloaded", "bytes"}} and whether the run was stopped early.
+        """
+        contexts = {}
+        window = [] # (report, ctx) started on the HTTP pool or queued for the tab pool, oldest first
+        limit = self.http.max_workers if self.http else self.report_tabs
+        stopped = False
+
+        def finish_oldest():
+            if not self.http:
+                # Tab pool: the whole batch loads side by side
+                self._download_in_browser(window)
+                window.clear()
+                return
+            report, ctx = window.pop(0)
+            self._finish_downloads([report], ctx)
+
+        def counted(report, path, size):
+            contexts[report["company"]]["result"]["downloaded"] += 1
+            if on_report:
+                on_report(report, path, size)
+
+        for report in reports:
+            if should_stop and should_stop():
+                stopped = True
+                break
+            company = report["company"]
+            ctx = contexts.get(company)
+            if ctx is None:
+                company_dir = os.path.join(self.download_dir, company)
+                os.makedirs(company_dir, exist_ok=True)
+                ctx = contexts[company] = {
+                    "company": company,
+                    "company_dir": company_dir,
+                    "result": {"downloaded": 0, "bytes": 0, "failed": 0},
+                    "on_report": counted,
+                    "checkpoint": checkpoint_for(company) if checkpoint_for else None
+                }
+            self.log(f"Processing Report ({company}, {report['kind'].replace('_', ' ')}): {report['title'][:50]}... ({report['pages'] or 0}pg)")
+            pending = []
+            try:
+                self._start_report(report, ctx, pending)
+            except Exception as e:
+                self.log(f"Error starting download of '{report['title'][:40]}...': {e}")
+                continue
+            window.extend((r, ctx) for r in pending)
+            while len(window) >= limit:
+                finish_oldest()
+        while window:
+            finish_oldest()
+
+        results = {company: ctx["result"] for company, ctx in contexts.items()}
+        return results, stopped
+
+    def _drain_performance_log(self):
+        """
+        Discards buffered network events so the next capture only sees this company's requests.
+        """
+        try:
+            self.driver.get_log("performance")
+        except Exception:
+            pass
+
+    def _crawl_listing_api(self, ctx):
+        """
+        Pages through the captured listing XHR over HTTP instead of clicking through the UI.
+        Returns False if no usable listing request was seen or the API crawl failed,
+        in which case the caller falls back to the DOM crawl. ctx["api_items_done"] tells
+        it how many results were already handled.
+        """
+        try:
+            endpoint = capture_listing_endpoint(self.driver, log=self.log)
+        except Exception as e:
+            self.log(f"Could not read listing requests from performance log: {e}")
+            return False
+        if not endpoint:
+            self.log("No listing API request captured. Using page crawl.")
+            return False
+
+        crawler = ListingCrawler(self.http.session, endpoint, self.base_url)
+        start = ctx["checkpoint"].pages_done("api") if ctx["checkpoint"] and ctx["collect"] is None else 0
+        if start:
+            self.log(f"Resuming listing API after page {start} (finished in an earlier attempt).")
+        pages_done = start
+        # Pages finished in an earlier attempt count too, when their size is known
+        ctx["api_items_done"] = start * (endpoint.page_size or 0)
+        try:
+            for items in crawler.pages(start_index=start):
+                pages_done += 1
+                self.log(f"Processing Page {pages_done} (listing API, {len(items)} items)...")
+                stop = self._process_items(items, ctx)
+                ctx["api_items_done"] += len(items)
+                self._checkpoint_page(ctx, "api", pages_done)
+                if stop:
+                    break
+        except Exception as e:
+            self.log(f"Listing API crawl failed on page {pages_done + 1}: {e}. Continuing with page crawl.")
+            return False
+
+        if pages_done == 0:
+            self.log("Listing API returned no items. Using page crawl.")
+            return False
+        self.log(f"Finished all pages via listing API ({pages_done} pages).")
+        return True
+
+    @timed("extract_page")
+    def _extract_page_items(self):
+        """
+        Returns {mode, first, items} for the current results page using one execute_script call.
+        Dates are converted to datetime objects.
+        """
+        try:
+            page = self.driver.execute_script(EXTRACT_ITEMS_SCRIPT) or {}
+        except Exception as e:
+            self.log(f"Error extracting report items: {e}")
+            page = {}
+        items = page.get("items") or []
+        for item in items:
+            item["title"] = (item.get("title") or "").strip()
+            item["date"] = datetime.fromtimestamp(item["date"] / 1000) if item.get("date") else None
+        return {"mode": page.get("mode", "unknown"), "first": page.get("first"), "items": items}
+
+    @timed("primary_tab")
     def _ensure_primary_tab(self):
         """
         Attempts to click the 'Primary' tab if available and not active.
@@ -479,7 +961,12 @@ class GSResearchDownloader:
                 if "active" not in classes:
                     self.log("Switching to 'Primary' tab...")
                     el.click()
-                    time.sleep(3) # Wait for reload
+                    # Wait for reload
+                    self.waits.until("primary_tab", self.waits.all_of(
+                        lambda d: any("active" in (a.get_attribute("class") or "")
+                                      for a in d.find_elements(By.XPATH, "//a[contains(text(), 'Primary')]")),
+                        self.waits.network_idle()
+                    ))
                 else:
                     self.log("'Primary' tab is already active.")
             else:
@@ -487,68 +974,167 @@ class GSResearchDownloader:
         except Exception as e:
             self.log(f"Error switching tabs: {e}")
 
+    def _report_filename(self, file_prefix, report_title):
+        """
+        Builds the file name (without extension) used for a report, for both download paths.
+        """
+        safe_title = "".join([c for c in report_title if c.isalnum() or c in " -_"]).strip()
+        # Limit to prevent OS path length issues but ensure it covers the match_pattern length
+        name = f"{file_prefix}_{safe_title[:100]}"
+        return "".join([c for c in name if c.isalpha() or c.isdigit() or c==' ' or c=='_']).strip()
+
+    def _unique_path(self, target_path):
+        """
+        Appends a timestamp if target_path is already taken.
+        """
+        if os.path.exists(target_path):
+            base, ext = os.path.splitext(target_path)
+            target_path = f"{base}_{int(time.time())}{ext}"
+        return target_path
+
+    def _finish_downloads(self, pending, ctx):
+        """
+        Waits for the page's HTTP downloads, then fetches failures and reports queued for
+        the tab pool through the browser.
+        """
+        browser = []
+        for report in pending:
+            if "future" not in report:
+                browser.append((report, ctx))
+                continue
+            try:
+                path, size, sha256 = report["future"].result()
+                self.log(f"Downloaded via HTTP: {os.path.basename(path)} ({size / 1024:.0f} KB)")
+            except Exception as e:
+                self.log(f"HTTP download failed for '{report['title'][:40]}...' ({e}). Falling back to browser.")
+                browser.append((report, ctx))
+                continue
+            self._record_download(report, path, ctx, sha256=sha256)
+        if browser:
+            self._download_in_browser(browser)
+
+    def _download_in_browser(self, entries):
+        """
+        Downloads (report, ctx) entries through the browser: several tabs at once with
+        report_tabs > 1, otherwise one tab after another.
+        """
+        for report, ctx in entries:
+            self._checkpoint_report(ctx, report["url"], "downloading")
+        if self.report_tabs > 1 and len(entries) > 1:
+            contexts = {id(report): ctx for report, ctx in entries}
+            ReportTabPool(self, size=self.report_tabs).run(
+                [(report, ctx["company_dir"]) for report, ctx in entries],
+                on_done=lambda report, path: self._record_download(report, path, contexts[id(report)], browser=True)
+            )
+            return
+        for report, ctx in entries:
+            path = self._download_report_pdf(report["url"], report["title"], ctx["company_dir"], report["prefix"], 0)
+            self._record_download(report, path, ctx, browser=True)
+
+    def _checkpoint_page(self, ctx, page_mode, page_num):
+        """
+        Marks a results page as finished in the run journal, unless the run was stopped midway.
+        """
+        if ctx["checkpoint"] and not ctx["interrupted"] and ctx.get("collect") is None:
+            try:
+                ctx["checkpoint"].page_done(page_mode, page_num)
+            except Exception as e:
+                self.log(f"Could not checkpoint page {page_num}: {e}")
+
+    def _checkpoint_report(self, ctx, url, status, path=None):
+        if ctx.get("checkpoint"):
+            try:
+                ctx["checkpoint"].report(url, status, path)
+            except Exception as e:
+                self.log(f"Could not checkpoint report status: {e}")
+
+    def _count_failed(self, ctx):
+        ctx["result"]["failed"] += 1
+        self.metrics.incr("reports_failed")
+
+    def _record_download(self, report, path, ctx, sha256=None, linked=False, browser=False):
+        """
+        Adds a finished report download to the blob store, the manifest, the run totals
+        and the progress callback. `linked` means the file is a link to an already stored
+        blob, so no bytes were transferred. `browser` means it was loaded in a Chrome tab,
+        which counts toward the supervisor's recycling.
+        """
+        if not path or not os.path.exists(path):
+            self._checkpoint_report(ctx, report["url"], "failed")
+            self._count_failed(ctx)
+            return
+        self._checkpoint_report(ctx, report["url"], "done", path)
+        size = os.path.getsize(path)
+        if browser:
+            self.supervisor.report_done()
+        if not linked:
+            ctx["result"]["bytes"] += size
+            self.metrics.incr("bytes_downloaded", size, kind="report")
+            if path.lower().endswith(".pdf"):
+                try:
+                    sha256, deduplicated = self.blobs.add(path, sha256)
+                    if deduplicated:
+                        self.log(f"Same content already stored, linked {os.path.basename(path)} to it")
+                        self.metrics.incr("bytes_deduplicated", size)
+                except Exception as e:
+                    self.log(f"Could not add {os.path.basename(path)} to blob store: {e}")
+        self.metrics.incr("reports_downloaded")
+        if ctx.get("on_report"):
+            try:
+                ctx["on_report"](report, path, size)
+            except Exception as e:
+                self.log(f"Progress callback failed: {e}")
+        if not path.lower().endswith(".pdf"):
+            return
+        try:
+            self.manifest.record(path, report["company"], report["title"], url=report["url"],
+                                 report_date=report["date"], page_count=report["pages"], sha256=sha256)
+        except Exception as e:
+            self.log(f"Could not record {os.path.basename(path)} in manifest: {e}")
+
     def _click_and_download(self, element, target_dir, file_prefix):
         """
         Helper to click an element and handle the download file.
         """
+        ticket = self.downloads.expect()
         try:
-            before_files = set(os.listdir(self.download_dir))
             element.click()
-            self.wait_and_organize_download(before_files, target_dir, file_prefix)
+            return self.wait_and_organize_download(ticket, target_dir, file_prefix)
         except Exception as e:
+            ticket.cancel()
             self.log(f"Failed to download via click: {e}")
+            return None
 
+    @timed("download_report_pdf")
     def _download_report_pdf(self, report_url, report_title, target_dir, file_prefix, index):
         """
         Navigates to report page and attempts to download PDF.
         file_prefix: The prefix string passed from caller (e.g. "0291HK_Report_1")
+        Returns the final file path, or None if nothing was downloaded.
         """
+        try:
+            self.supervisor.before_report()
+        except Exception as e:
+            self.log(f"Browser health check failed: {e}")
         original_window = self.driver.current_window_handle
+        downloaded_path = None
         
         try:
-            # Open in new tab
-            self.driver.execute_script("window.open(arguments[0]);", report_url)
-            self.driver.switch_to.window(self.driver.window_handles[-1])
+            # Open in new tab (blank first, so the crawl profile's blocking covers the report page)
+            self.driver.switch_to.new_window("tab")
+            self.crawl_profile.apply(self.driver)
+            self.driver.execute_script("window.location.href = arguments[0];", report_url)
             
-            # Wait for load
-            time.sleep(3)
-            
-            # Try to find PDF button
-            # Common patterns: link ending in .pdf, or button with text "PDF" or "Download"
-            pdf_selectors = [
-                "a[href$='.pdf']",
-                "a[aria-label*='PDF']",
-                "button[aria-label*='PDF']",
-                "//a[contains(text(), 'PDF')]",
-                "//button[contains(text(), 'PDF')]"
-            ]
-            
-            found = False
-            for selector in pdf_selectors:
-                try:
-                    if selector.startswith("//"):
-                        element = self.driver.find_element(By.XPATH, selector)
-                    else:
-                        element = self.driver.find_element(By.CSS_SELECTOR, selector)
-                    
-                    if element:
-                        self.log(f"Found PDF link on report page.")
-                        # Use same safe_title logic as in check loop to ensure consistency
-                        safe_title = "".join([c for c in report_title if c.isalnum() or c in " -_"]).strip()
-                        # Limit to prevent OS path length issues but ensure it covers the match_pattern length
-                        safe_title_filename = safe_title[:100] 
-                        
-                        # Fix: Avoid double prefixing. The caller already passes "Company_Report_X"
-                        # We just append the title.
-                        final_filename_prefix = f"{file_prefix}_{safe_title_filename}"
-                        
-                        self._click_and_download(element, target_dir, final_filename_prefix)
-                        found = True
-                        break
-                except:
-                    continue
+            # Wait for load: stop as soon as any PDF control is on the page (one script call per poll)
+            found = self.waits.until("report_page", lambda d: self.selectors.find(d, "pdf_link", "report_page", PDF_SELECTORS))
             
-            if not found:
+            if found:
+                self.log("Found PDF link on report page.")
+                # Same naming as the HTTP path. The caller already passes "Company_Report_X",
+                # we just append the title.
+                final_filename_prefix = self._report_filename(file_prefix, report_title)
+                downloaded_path = self._click_and_download(found[0], target_dir, final_filename_prefix)
+            else:
                 self.log(f"No PDF link found for report: {report_title}")
                 
         except Exception as e:
@@ -561,87 +1147,24 @@ class GSResearchDownloader:
                 self.driver.switch_to.window(original_window)
             except:
                 pass
+        return downloaded_path
 
-    def wait_and_organize_download(self, before_files, target_dir, new_name_prefix, timeout=30):
+    @timed("wait_and_organize_download")
+    def wait_and_organize_download(self, ticket, target_dir, new_name_prefix, timeout=30):
         """
-        Waits for a new file to appear in the download directory, then moves and renames it.
+        Waits for the download behind `ticket` to finish, then moves and renames it.
+        Detection is event-driven (see DownloadTracker), so concurrent downloads never swap files.
+        Returns the final path, or None on failure.
         """
-        end_time = time.time() + timeout
-        new_file = None
-        
         self.log("Waiting for download to start...")
-        while time.time() < end_time:
-            current_files = set(os.listdir(self.download_dir))
-            new_files = current_files - before_files
-            
-            # Filter out temporary/hidden files if necessary, but keep crdownload for tracking
-            valid_new_files = [f for f in new_files if not f.endswith('.tmp')]
-            
-            if valid_new_files:
-                # Find the one that is likely the download (e.g. crdownload or final file)
-                # If there are multiple, pick the one that is .crdownload or has just appeared
-                for f in valid_new_files:
-                     new_file = os.path.join(self.download_dir, f)
-                     break
-                if new_file:
-                    break
-            
-            time.sleep(1)
-            
+        new_file = ticket.wait(start_timeout=timeout, finish_timeout=300, log=self.log) # 5 minutes max download time
         if not new_file:
-            self.log("Timeout: No new file detected.")
-            return
-
-        self.log(f"Detected new file: {os.path.basename(new_file)}")
-
-        # If it's a partial download, wait for it to finish
-        wait_start = time.time()
-        max_download_time = 300  # 5 minutes max wait
-        
-        while time.time() - wait_start < max_download_time:
-            # Check if the file we are tracking still exists
-            if not os.path.exists(new_file):
-                # The .crdownload file disappeared. It was likely renamed to the final name.
-                # Scan directory for any new file that is NOT .crdownload
-                current_files = set(os.listdir(self.download_dir))
-                final_candidates = current_files - before_files
-                
-                found_final = False
-                for f in final_candidates:
-                    if not f.endswith(".crdownload") and not f.endswith(".tmp"):
-                        new_file = os.path.join(self.download_dir, f)
-                        found_final = True
-                        break
-                
-                if found_final:
-                    self.log(f"Download finished. Identified final file: {os.path.basename(new_file)}")
-                    break
-                else:
-                    # If the file is gone and we can't find a replacement, it might have been deleted or moved.
-                    # We'll wait a brief moment and check again, but if it persists, we break to avoid infinite loop.
-                    time.sleep(1)
-                    current_files = set(os.listdir(self.download_dir))
-                    if not any(f for f in (current_files - before_files) if not f.endswith('.crdownload')):
-                         self.log("Warning: Temporary file disappeared but no final file found yet. Retrying detection...")
-                         continue
-
-            # If the file exists, check if it still has a temporary extension
-            if not (new_file.endswith(".crdownload") or new_file.endswith(".tmp")):
-                self.log("File extension indicates download complete.")
-                break
-                
-            time.sleep(1)
-            
-        # Double check if file exists after loop
+            return None
         if not os.path.exists(new_file):
-             # Try to find any new file that is not in before_files
-             current_files = set(os.listdir(self.download_dir))
-             final_new_files = current_files - before_files
-             if final_new_files:
-                 new_file = os.path.join(self.download_dir, list(final_new_files)[0])
-             else:
-                 self.log("Error: Downloaded file lost.")
-                 return
+            self.log("Error: Downloaded file lost.")
+            return None
+
+        self.log(f"Download finished. Identified final file: {os.path.basename(new_file)}")
 
         filename = os.path.basename(new_file)
         extension = os.path.splitext(filename)[1]
@@ -654,27 +1177,48 @@ class GSResearchDownloader:
         
         try:
             # Handle overwrite
-            if os.path.exists(target_path):
-                base, ext = os.path.splitext(target_path)
-                target_path = f"{base}_{int(time.time())}{ext}"
-                
+            target_path = self._unique_path(target_path)
             shutil.move(new_file, target_path)
             self.log(f"Moved and renamed to: {target_path}")
+            return target_path
         except Exception as e:
             self.log(f"Error moving file: {e}")
+            return None
 
-    def check_watchlist_updates(self, watchlist_manager):
+    def check_watchlist_updates(self, watchlist_manager, budget=None, should_stop=None):
         """
         Checks for updates for all tickers in the watchlist.
+        Each ticker keeps a high-water mark (newest report seen), so paging stops at the
+        first report we already know about instead of walking all 30 days of results.
+        New reports from all tickers are downloaded by priority (see PriorityScheduler);
+        budget: RunBudget, optional, to time-box the run.
         """
+        # Marks belong to this downloader's folder, not to wherever the manager was created
+        watchlist_manager.set_download_dir(self.download_dir)
         watchlist = watchlist_manager.get_watchlist()
         self.log(f"Checking updates for watchlist: {watchlist}")
         
-        for ticker in watchlist:
-            self.search_company(ticker)
-            self.download_reports(ticker, min_pages=1, primary_only=False, days_filter=30)
+        run = PriorityScheduler(self).run(watchlist, min_pages=1, primary_only=False, days_filter=30, budget=budget,
+                                          high_water=watchlist_manager.get_high_water, should_stop=should_stop)
+        for ticker, entry in run["companies"].items():
+            # A ticker cut off by the budget keeps its old mark, so the rest is picked up next time
+            if entry["complete"] and entry["newest"]:
+                watchlist_manager.set_high_water(ticker, entry["newest"]["date"], entry["newest"]["report_id"])
+        return run
 
     def close(self):
+        if self.driver and self.session:
+            self.save_session()
+        self.selectors.save()
+        if self.http:
+            self.http.close()
+            self.http = None
+        if self.manifest:
+            self.manifest.close()
+            self.manifest = None
+        if self.downloads:
+            self.downloads.close()
+            self.downloads = None
         if self.driver:
             self.log("Closing browser...")
             self.driver.quit()
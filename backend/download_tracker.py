@@ -0,0 +1,254 @@
+import os
+import sys
+import errno
+import select
+import struct
+import ctypes
+import threading
+
+TEMP_SUFFIXES = (".crdownload", ".tmp", ".part")
+
+# inotify event masks (see <sys/inotify.h>)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0x00000800
+IN_CLOEXEC = 0x00080000
+EVENT_HEADER = struct.Struct("iIII")
+
+def is_temporary(name):
+    # Chrome also creates hidden ".com.google.Chrome.XXXX" scratch files
+    return name.endswith(TEMP_SUFFIXES) or name.startswith(".")
+
+class DownloadTicket:
+    """
+    One expected download. Created before the click that starts it, so the
+    tracker can hand the next file that appears to the request that caused it.
+    """
+    def __init__(self, tracker):
+        self.tracker = tracker
+        self.name = None # current file name in the watched folder
+        self.path = None # final path once complete
+        self.started = threading.Event()
+        self.finished = threading.Event()
+
+    def wait(self, start_timeout=30, finish_timeout=300, log=None):
+        """
+        Blocks until the download completes. Returns the final path or None on timeout.
+        """
+        if not self.started.wait(start_timeout):
+            self.cancel()
+            if log:
+                log("Timeout: No new file detected.")
+            return None
+        if log:
+            log(f"Detected new file: {self.name}")
+        if not self.finished.wait(finish_timeout):
+            self.cancel()
+            if log:
+                log("Timeout: Download did not finish.")
+            return None
+        return self.path
+
+    def cancel(self):
+        self.tracker._cancel(self)
+
+class DownloadTracker:
+    """
+    Watches a staging folder and matches each new download to the ticket that
+    requested it. Uses inotify on Linux (renames are followed by their cookie,
+    so ".crdownload" -> final name is exact) and falls back to polling elsewhere.
+    Tickets are served in the order they were created.
+    """
+    def __init__(self, watch_dir, poll_interval=0.25):
+        self.watch_dir = os.path.abspath(watch_dir)
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._waiting = []  # tickets whose file has not appeared yet, oldest first
+        self._claimed = {}  # file name -> ticket
+        self._ignored = set(os.listdir(self.watch_dir)) # files that were here before us
+        self._stop = threading.Event()
+        self._fd = self._init_inotify()
+        self.backend = "inotify" if self._fd is not None else "polling"
+        self._thread = threading.Thread(target=self._run, name="download-tracker", daemon=True)
+        self._thread.start()
+
+    def expect(self):
+        """
+        Registers a download that is about to start. Call before clicking.
+        """
+        ticket = DownloadTicket(self)
+        with self._lock:
+            self._waiting.append(ticket)
+        return ticket
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    # --- Ticket bookkeeping (called with the lock held) ---
+
+    def _cancel(self, ticket):
+        with self._lock:
+            if ticket in self._waiting:
+                self._waiting.remove(ticket)
+            # A late file for a cancelled ticket stays claimed so nobody else takes it
+
+    def _on_created(self, name):
+        if name in self._claimed or name in self._ignored:
+            return
+        if not self._waiting:
+            self._ignored.add(name)
+            return
+        ticket = self._waiting.pop(0)
+        ticket.name = name
+        self._claimed[name] = ticket
+        ticket.started.set()
+
+    def _on_moved(self, old_name, new_name):
+        ticket = self._claimed.pop(old_name, None)
+        if ticket is None:
+            self._on_created(new_name)
+            if not is_temporary(new_name):
+                self._on_closed(new_name)
+            return
+        ticket.name = new_name
+        self._claimed[new_name] = ticket
+        if not is_temporary(new_name):
+            self._complete(new_name)
+
+    def _on_removed(self, name):
+        # Files we moved out (or that were deleted) free their name for the next download
+        self._ignored.discard(name)
+
+    def _on_closed(self, name):
+        if name in self._claimed and not is_temporary(name):
+            self._complete(name)
+
+    def _complete(self, name):
+        ticket = self._claimed.pop(name)
+        ticket.path = os.path.join(self.watch_dir, name)
+        ticket.finished.set()
+
+    # --- inotify backend ---
+
+    def _init_inotify(self):
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            libc = ctypes.CDLL("libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                return None
+            mask = IN_CREATE | IN_MOVED_FROM | IN_MOVED_TO | IN_CLOSE_WRITE | IN_DELETE
+            if libc.inotify_add_watch(fd, self.watch_dir.encode(), mask) < 0:
+                os.close(fd)
+                return None
+            return fd
+        except (OSError, AttributeError):
+            return None
+
+    def _run(self):
+        if self._fd is not None:
+            self._run_inotify()
+        else:
+            self._run_polling()
+
+    def _run_inotify(self):
+        while not self._stop.is_set():
+            ready, _, _ = select.select([self._fd], [], [], 0.5)
+            if not ready:
+                continue
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except OSError as e:
+                if e.errno == errno.EAGAIN:
+                    continue
+                raise
+
+            offset = 0
+            moved_from = {} # cookie -> old name; the MOVED_TO half arrives in the same read
+            with self._lock:
+                while offset < len(data):
+                    _, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                    offset += EVENT_HEADER.size
+                    name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+                    offset += length
+
+                    if mask & IN_CREATE:
+                        self._on_created(name)
+                    elif mask & IN_MOVED_FROM:
+                        moved_from[cookie] = name
+                    elif mask & IN_MOVED_TO:
+                        old_name = moved_from.pop(cookie, None)
+                        if old_name is None:
+                            # Moved in from another folder: appears complete
+                            self._on_created(name)
+                            self._on_closed(name)
+                        else:
+                            self._on_moved(old_name, name)
+                    elif mask & IN_CLOSE_WRITE:
+                        self._on_closed(name)
+                    elif mask & IN_DELETE:
+                        self._on_removed(name)
+
+                # Renames without a MOVED_TO went to another folder
+                for name in moved_from.values():
+                    self._on_removed(name)
+
+    # --- Polling fallback ---
+
+    def _scan(self):
+        """
+        Returns {name: (mtime_ns, size)}.
+        """
+        files = {}
+        with os.scandir(self.watch_dir) as entries:
+            for entry in entries:
+                try:
+                    stat = entry.stat()
+                    files[entry.name] = (stat.st_mtime_ns, stat.st_size)
+                except OSError:
+                    pass
+        return files
+
+    def _run_polling(self):
+        previous = self._scan()
+        while not self._stop.wait(self.poll_interval):
+            current = self._scan()
+            # Oldest first, so files map onto tickets in the order their downloads started.
+            # A rename keeps the mtime, which also lines up renamed files with their originals.
+            appeared = sorted((n for n in current if n not in previous), key=lambda n: current[n])
+            vanished = sorted((n for n in previous if n not in current), key=lambda n: previous[n])
+
+            with self._lock:
+                # A claimed file that vanished while another appeared was renamed.
+                # Match on the unchanged mtime, then on the old stem ("x.pdf.crdownload" -> "x.pdf").
+                for old_name in vanished:
+                    if old_name not in self._claimed or not appeared:
+                        continue
+                    stem = old_name
+                    for suffix in TEMP_SUFFIXES:
+                        if stem.endswith(suffix):
+                            stem = stem[:-len(suffix)]
+                    new_name = next((n for n in appeared if current[n][0] == previous[old_name][0]), None) or \
+                               next((n for n in appeared if n.startswith(stem)), appeared[0])
+                    appeared.remove(new_name)
+                    self._on_moved(old_name, new_name)
+
+                for name in appeared:
+                    self._on_created(name)
+                for name in vanished:
+                    self._on_removed(name)
+
+                # A final-named file is complete once its size stops changing
+                for name, ticket in list(self._claimed.items()):
+                    if not is_temporary(name) and name in previous and current.get(name) == previous[name] and current[name][1] > 0:
+                        self._on_closed(name)
+
+            previous = current
@@ -0,0 +1,238 @@
+import os
+import time
+import signal
+import threading
+import subprocess
+
+try:
+    import psutil
+except ImportError:
+    psutil = None # memory is read from /proc instead (Linux only)
+
+class DriverSupervisor:
+    """
+    Keeps a GSResearchDownloader's Chrome usable over long runs.
+    Health-checks the driver, and replaces it when it has died or hung, after
+    `recycle_after` reports, or when Chrome uses more than `max_memory_mb`.
+    The replacement gets the last known session cookies and returns to the
+    page the old one was on, so the manual login is not lost.
+    """
+    def __init__(self, downloader, recycle_after=150, max_memory_mb=1500, check_timeout=10, cookie_refresh=60):
+        self.downloader = downloader
+        self.recycle_after = recycle_after # 0/None disables recycling by count
+        self.max_memory_mb = max_memory_mb # 0/None disables the memory check
+        self.check_timeout = check_timeout
+        self.cookie_refresh = cookie_refresh
+        self.reports_since_restart = 0
+        self.restarts = 0
+        self.cookies = []
+        self._cookies_at = 0
+        self._lock = threading.Lock()
+
+    def log(self, message):
+        self.downloader.log(message)
+
+    # --- Health ---
+
+    def _call(self, fn, timeout):
+        """
+        Runs a driver command with a deadline. A hung renderer blocks Selenium calls
+        for minutes, so the call runs in a helper thread and is abandoned on timeout.
+        Returns (ok, value).
+        """
+        outcome = {}
+        def _run():
+            try:
+                outcome["value"] = fn()
+            except Exception as e:
+                outcome["error"] = e
+        t = threading.Thread(target=_run, daemon=True)
+        t.start()
+        t.join(timeout)
+        if t.is_alive() or "error" in outcome:
+            return False, outcome.get("error")
+        return True, outcome.get("value")
+
+    def is_healthy(self):
+        driver = self.downloader.driver
+        if driver is None:
+            return False
+        ok, _ = self._call(lambda: driver.execute_script("return document.readyState"), self.check_timeout)
+        return ok
+
+    def _driver_pid(self, driver=None):
+        try:
+            return (driver or self.downloader.driver).service.process.pid
+        except Exception:
+            return None
+
+    def _process_tree(self, pid):
+        """
+        pid and every process under it (chromedriver, Chrome and its helpers), parents
+        first. Empty if the tree cannot be read (no psutil and no /proc).
+        """
+        if psutil:
+            try:
+                root = psutil.Process(pid)
+                return [pid] + [p.pid for p in root.children(recursive=True)]
+            except Exception:
+                return []
+        if not os.path.isdir("/proc"):
+            return []
+
+        # Build the process tree from /proc/<pid>/stat (field 4 is the parent pid)
+        children = {}
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    fields = f.read().rsplit(")", 1)[1].split()
+                children.setdefault(int(fields[1]), []).append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+        tree, stack = [], [pid]
+        while stack:
+            current = stack.pop()
+            tree.append(current)
+            stack.extend(children.get(current, []))
+        return tree
+
+    def memory_mb(self):
+        """
+        Resident memory of chromedriver and every Chrome process under it, or None if unknown.
+        """
+        pid = self._driver_pid()
+        tree = self._process_tree(pid) if pid else []
+        if not tree:
+            return None
+        if psutil:
+            try:
+                return sum(psutil.Process(p).memory_info().rss for p in tree) / 1024 / 1024
+            except Exception:
+                return None
+        page_size = os.sysconf("SC_PAGE_SIZE")
+        total = 0
+        for current in tree:
+            try:
+                with open(f"/proc/{current}/statm") as f:
+                    total += int(f.read().split()[1]) * page_size
+            except (OSError, IndexError, ValueError):
+                pass
+        return total / 1024 / 1024
+
+    def _kill_tree(self, pid, tree, timeout=5):
+        """
+        Kills whatever is left of a quit browser's process tree and waits for it to exit.
+        Chrome holds a lock on its --user-data-dir until its last process is gone, and a
+        new Chrome on the same profile fails to start while it is held.
+        """
+        if os.name == "nt" and not psutil:
+            # No process tree without psutil on Windows; taskkill walks it itself
+            subprocess.run(["taskkill", "/T", "/F", "/PID", str(pid)], capture_output=True)
+            return
+        for current in tree:
+            try:
+                os.kill(current, signal.SIGKILL if hasattr(signal, "SIGKILL") else signal.SIGTERM)
+            except OSError:
+                pass
+        deadline = time.time() + timeout
+        alive = tree
+        while time.time() < deadline:
+            alive = [p for p in alive if self._is_running(p)]
+            if not alive:
+                return
+            time.sleep(0.2)
+        self.log(f"{len(alive)} Chrome process(es) still running after restart.")
+
+    def _is_running(self, pid):
+        """
+        False once the process has exited (a zombie waiting to be reaped counts as exited).
+        """
+        if psutil:
+            try:
+                return psutil.Process(pid).status() != psutil.STATUS_ZOMBIE
+            except Exception:
+                return False
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+        except (OSError, IndexError):
+            return False
+
+    def _refresh_cookies(self, force=False):
+        if not force and time.time() - self._cookies_at < self.cookie_refresh:
+            return
+        driver = self.downloader.driver
+        ok, cookies = self._call(driver.get_cookies, self.check_timeout) if driver else (False, None)
+        if ok and cookies:
+            self.cookies = cookies
+            self._cookies_at = time.time()
+            self.downloader.save_session(cookies)
+
+    # --- Hooks called by the downloader ---
+
+    def report_done(self):
+        with self._lock:
+            self.reports_since_restart += 1
+
+    def before_report(self):
+        """
+        Cheap check before a browser-based report download: only replaces a dead driver.
+        """
+        with self._lock:
+            if not self.is_healthy():
+                self.restart("driver is not responding")
+
+    def before_company(self):
+        """
+        Full check between companies, where recycling does not interrupt any paging.
+        Returns True if the driver was replaced.
+        """
+        with self._lock:
+            if not self.is_healthy():
+                return self.restart("driver is not responding")
+            self._refresh_cookies()
+            if self.recycle_after and self.reports_since_restart >= self.recycle_after:
+                return self.restart(f"{self.reports_since_restart} reports since last start")
+            memory = self.memory_mb() if self.max_memory_mb else None
+            if memory and memory > self.max_memory_mb:
+                return self.restart(f"Chrome is using {memory:.0f} MB")
+        return False
+
+    # --- Restart ---
+
+    def restart(self, reason):
+        """
+        Quits the current browser (killing it if it does not respond) and starts a new
+        one with the saved session. Call with the lock held.
+        """
+        downloader = self.downloader
+        self.log(f"Restarting browser: {reason}.")
+        self._refresh_cookies(force=True)
+        ok, url = self._call(lambda: downloader.driver.current_url, self.check_timeout) if downloader.driver else (False, None)
+
+        old = downloader.driver
+        downloader.driver = None
+        if old is not None:
+            # Taken before quitting, as Chrome's helpers are orphaned once chromedriver exits
+            pid = self._driver_pid(old)
+            tree = self._process_tree(pid) if pid else []
+            quit_ok, _ = self._call(old.quit, self.check_timeout)
+            if pid and (tree or not quit_ok):
+                self._kill_tree(pid, tree or [pid])
+
+        downloader._start_driver()
+        self.restarts += 1
+        self.reports_since_restart = 0
+        if self.cookies:
+            downloader.load_session_cookies(self.cookies)
+        else:
+            self.log("No saved session cookies. You may need to log in again.")
+        if ok and url and url.startswith("http"):
+            try:
+                downloader.driver.get(url)
+            except Exception as e:
+                self.log(f"Could not reopen {url}: {e}")
+        self.log(f"Browser restarted (restart #{self.restarts}).")
+        return True
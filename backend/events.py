@@ -0,0 +1,75 @@
+import json
+import time
+import threading
+from collections import deque
+
+class EventLog:
+    """
+    Bounded, sequence-numbered buffer of log/progress events.
+    Readers remember the last seq they saw and ask for everything after it,
+    so a reconnecting client only receives what it missed.
+    """
+    def __init__(self, maxlen=1000):
+        self._events = deque(maxlen=maxlen)
+        self._seq = 0
+        self._cond = threading.Condition()
+
+    @property
+    def last_seq(self):
+        return self._seq
+
+    def publish(self, event_type, **data):
+        with self._cond:
+            self._seq += 1
+            event = {"seq": self._seq, "time": time.time(), "type": event_type, **data}
+            self._events.append(event)
+            self._cond.notify_all()
+        return event
+
+    def since(self, seq=0, types=None):
+        """
+        Returns (events newer than seq, whether older ones were already dropped).
+        """
+        with self._cond:
+            return self._since(seq, types)
+
+    def _since(self, seq, types):
+        events = [e for e in self._events if e["seq"] > seq and (types is None or e["type"] in types)]
+        truncated = bool(self._events) and self._events[0]["seq"] > seq + 1
+        return events, truncated
+
+    def wait(self, seq=0, timeout=15, types=None):
+        """
+        Like since(), but blocks up to `timeout` seconds until something newer than seq arrives.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > seq, timeout)
+            return self._since(seq, types)
+
+    def messages(self, limit=100):
+        """
+        Plain text of the most recent log events, oldest first.
+        """
+        with self._cond:
+            lines = [e["message"] for e in self._events if e["type"] == "log"]
+        return lines[-limit:]
+
+    def stream(self, seq=0, types=None, heartbeat=15):
+        """
+        Yields Server-Sent Events frames forever, starting after seq.
+        A comment line is sent every `heartbeat` seconds so proxies keep the connection open.
+        """
+        _, truncated = self.since(seq)
+        if truncated:
+            yield f"event: truncated\ndata: {json.dumps({'since': seq})}\n\n"
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._seq > seq, heartbeat)
+                events, _ = self._since(seq, types)
+                # Filtered-out events still move the cursor forward
+                idle = self._seq == seq
+                seq = self._seq
+            if idle:
+                yield ": keep-alive\n\n"
+            for event in events:
+                yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
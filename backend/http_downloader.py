@@ -0,0 +1,127 @@
+import os
+import re
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# href="...pdf", src='...pdf?x=1' or "pdfUrl": "..." in the report page HTML / embedded JSON
+PDF_LINK_PATTERN = re.compile(
+    r'''(?:href|src|"pdf[A-Za-z]*")\s*[=:]\s*["']([^"'<>\s]+?\.pdf(?:\?[^"'<>\s]*)?)["']''',
+    re.IGNORECASE
+)
+
+class SessionDownloader:
+    """
+    Downloads report PDFs over plain HTTP using the browser's logged-in session.
+    Selenium cookies are copied into a pooled requests.Session and several
+    downloads run at once on a thread pool. Files are streamed straight to
+    their final path, so there is no tab, no rendering and no folder polling.
+    """
+    def __init__(self, max_workers=4, timeout=60, chunk_size=256 * 1024):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+
+        self.session = requests.Session()
+        retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers, max_retries=retries)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pdf-http")
+
+    def sync_cookies(self, driver):
+        """
+        Copies the current Selenium cookies and user agent into the HTTP session.
+        """
+        self.session.cookies.clear()
+        for cookie in driver.get_cookies():
+            self.session.cookies.set(
+                cookie["name"],
+                cookie["value"],
+                domain=cookie.get("domain"),
+                path=cookie.get("path", "/")
+            )
+        try:
+            user_agent = driver.execute_script("return navigator.userAgent")
+            if user_agent:
+                self.session.headers["User-Agent"] = user_agent
+        except Exception:
+            pass
+
+    def resolve_pdf_url(self, report_url):
+        """
+        Finds the PDF link for a report without rendering it.
+        Returns the absolute PDF URL, or None if the page does not expose one.
+        """
+        # Streamed so the body is only read once the headers say it is a page
+        with self.session.get(report_url, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            content_type = response.headers.get("Content-Type", "")
+
+            # Some report links already point at the PDF itself
+            if "application/pdf" in content_type:
+                return response.url
+            # Anything else (images, binaries) cannot hold a link, so it is never downloaded
+            if content_type and not any(kind in content_type for kind in ("html", "json", "text")):
+                return None
+
+            match = PDF_LINK_PATTERN.search(response.text)
+            if not match:
+                return None
+            return urljoin(response.url, match.group(1).replace("\\/", "/"))
+
+    def download(self, pdf_url, target_path):
+        """
+        Streams a PDF to target_path. Writes to a .part file first so a failed
+        download never leaves a truncated PDF behind. The SHA-256 is computed on the
+        same chunks, so the file never has to be read back.
+        Returns (bytes written, sha256 hex digest).
+        """
+        part_path = target_path + ".part"
+        try:
+            with self.session.get(pdf_url, stream=True, timeout=self.timeout) as response:
+                response.raise_for_status()
+                written = 0
+                sha = hashlib.sha256()
+                with open(part_path, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        if not chunk:
+                            continue
+                        # Login pages come back as HTML with a 200, so check the magic bytes
+                        if written == 0 and not chunk.startswith(b"%PDF"):
+                            raise ValueError(f"Response is not a PDF ({response.headers.get('Content-Type')})")
+                        f.write(chunk)
+                        sha.update(chunk)
+                        written += len(chunk)
+            if written == 0:
+                raise ValueError("Empty response")
+            os.replace(part_path, target_path)
+            return written, sha.hexdigest()
+        except Exception:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+
+    def fetch_report(self, report_url, target_path):
+        """
+        Resolves and downloads one report. Returns (target_path, bytes, sha256) or raises.
+        """
+        pdf_url = self.resolve_pdf_url(report_url)
+        if not pdf_url:
+            raise LookupError("No PDF link in report page")
+        written, sha256 = self.download(pdf_url, target_path)
+        return target_path, written, sha256
+
+    def submit(self, report_url, target_path):
+        """
+        Schedules fetch_report on the pool and returns its Future.
+        """
+        return self.executor.submit(self.fetch_report, report_url, target_path)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.session.close()
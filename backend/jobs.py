@@ -0,0 +1,328 @@
+import time
+import uuid
+import threading
+from worker_pool import BrowserWorkerPool
+
+class Job:
+    """
+    One batch of companies submitted to the JobManager, with its progress counters.
+    status: queued, running, done, cancelled, failed
+    """
+    def __init__(self, companies, options=None, max_parallel=None, owner=None, run_id=None):
+        self.id = uuid.uuid4().hex[:8]
+        self.run_id = run_id # RunJournal entry this job checkpoints into
+        self.companies = list(companies)
+        self.options = options or {}
+        self.max_parallel = max_parallel # None = as many workers as are free
+        self.owner = owner
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+        self.pending = list(self.companies) # not started yet
+        self.in_flight = []                 # being processed right now
+        self.companies_done = 0
+        self.reports_downloaded = 0
+        self.bytes_downloaded = 0
+        self.errors = []
+        self.cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def eta_seconds(self):
+        """
+        Remaining time based on the average pace so far. None until one company is done.
+        """
+        if not self.started_at or not self.companies_done or self.status != "running":
+            return None
+        elapsed = time.time() - self.started_at
+        remaining = len(self.companies) - self.companies_done
+        return round(elapsed / self.companies_done * remaining, 1)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "owner": self.owner,
+            "run_id": self.run_id,
+            "companies": self.companies,
+            "options": self.options,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": {
+                "companies_total": len(self.companies),
+                "companies_done": self.companies_done,
+                "in_progress": list(self.in_flight),
+                "reports_downloaded": self.reports_downloaded,
+                "bytes_downloaded": self.bytes_downloaded,
+                "eta_seconds": self.eta_seconds()
+            },
+            "errors": self.errors[-20:]
+        }
+
+def run_company(downloader, company, options, should_stop=None, on_report=None, checkpoint=None):
+    """
+    Default per-company task: search, then download models/reports with the job's options.
+    """
+    downloader.search_company(company)
+    return downloader.download_reports(
+        company,
+        min_pages=options.get("min_pages", 1),
+        primary_only=options.get("primary_only", True),
+        days_filter=options.get("days_filter"),
+        models_only=options.get("models_only", False),
+        should_stop=should_stop,
+        on_report=on_report,
+        checkpoint=checkpoint
+    )
+
+class JobManager:
+    """
+    Queues jobs and schedules their companies onto a bounded pool of browser workers.
+    Companies are handed out round-robin across active jobs, so a big batch does not
+    starve a small one. The browsers are created lazily from the logged-in primary
+    downloader (see BrowserWorkerPool).
+    on_progress(job_dict) is called whenever a job's status or counters change.
+    With a RunJournal, every job is checkpointed and can be resumed after a crash.
+    With a SearchIndex, the new PDFs are indexed in the background after each job.
+    """
+    def __init__(self, primary, max_workers=2, log_callback=None, task=run_company, on_progress=None, journal=None,
+                 search_index=None):
+        self.pool = BrowserWorkerPool(primary, num_workers=max_workers, log_callback=log_callback)
+        self.task = task
+        self.on_progress = on_progress
+        self.journal = journal
+        self.search_index = search_index
+        self.jobs = {}   # id -> Job, in submission order
+        self._cond = threading.Condition()
+        self._threads = []
+        self._started = False
+        self._shutdown = False
+        self._rr = 0     # round-robin cursor over active jobs
+
+    def log(self, message):
+        self.pool.log(message)
+
+    def _progress(self, job):
+        if self.on_progress:
+            try:
+                self.on_progress(job.to_dict())
+            except Exception as e:
+                print(f"Error publishing job progress: {e}")
+
+    # --- Public API ---
+
+    def submit(self, companies, options=None, max_parallel=None, owner=None, run_id=None):
+        if self.journal and run_id is None:
+            run_id = self.journal.create_run(companies, options)
+        job = Job(companies, options, max_parallel, owner, run_id)
+        with self._cond:
+            self.jobs[job.id] = job
+            if not job.companies:
+                self._finish(job, "done")
+                return job
+            self._progress(job)
+            self._cond.notify_all()
+        self.log(f"Job {job.id} queued with {len(job.companies)} companies.")
+        self._ensure_started()
+        return job
+
+    def resume(self, run_id, max_parallel=None, owner=None):
+        """
+        Starts a new job for the unfinished companies of a journaled run.
+        Each company continues after its last finished results page.
+        Returns None if the run does not exist or is already running.
+        """
+        if not self.journal:
+            return None
+        run = self.journal.get_run(run_id)
+        if not run:
+            return None
+        with self._cond:
+            if any(j.run_id == run_id and j.status in ("queued", "running") for j in self.jobs.values()):
+                return None
+        companies = self.journal.pending_companies(run_id)
+        self.journal.reopen_run(run_id)
+        self.log(f"Resuming run {run_id}: {len(companies)} of {len(run['companies'])} companies left.")
+        return self.submit(companies, run["options"], max_parallel=max_parallel, owner=owner, run_id=run_id)
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def list(self):
+        return list(self.jobs.values())
+
+    def cancel(self, job_id):
+        """
+        Drops the job's queued companies and asks running ones to stop after the current report.
+        """
+        job = self.jobs.get(job_id)
+        if not job:
+            return None
+        with self._cond:
+            if job.status in ("queued", "running"):
+                job.cancel_event.set()
+                job.pending = []
+                if not job.in_flight:
+                    self._finish(job, "cancelled")
+                else:
+                    self._progress(job)
+        self.log(f"Job {job.id} cancellation requested.")
+        return job
+
+    def busy(self):
+        return any(job.status in ("queued", "running") for job in self.jobs.values())
+
+    def shutdown(self):
+        """
+        Cancels everything and closes the extra browsers.
+        """
+        with self._cond:
+            self._shutdown = True
+            for job in self.jobs.values():
+                if job.status in ("queued", "running"):
+                    job.cancel_event.set()
+                    job.pending = []
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join(timeout=5)
+        self.pool.close()
+
+    # --- Scheduling ---
+
+    def _ensure_started(self):
+        with self._cond:
+            if self._started:
+                return
+            self._started = True
+        # Browser start-up is slow, so it happens off the request thread
+        threading.Thread(target=self._start_workers, name="job-manager-start", daemon=True).start()
+
+    def _start_workers(self):
+        try:
+            workers = self.pool.start_workers()
+        except Exception as e:
+            workers = []
+            self.log(f"Could not start browser workers: {e}")
+        if not workers:
+            with self._cond:
+                for job in self.jobs.values():
+                    if job.status == "queued":
+                        job.errors.append("No browser workers available")
+                        self._finish(job, "failed")
+                self._started = False
+            return
+        self._threads = [
+            threading.Thread(target=self._worker_loop, args=(w,), name=f"job-worker-{i + 1}", daemon=True)
+            for i, w in enumerate(workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def _next_task(self):
+        """
+        Picks the next (job, company), rotating over active jobs. Call with the lock held.
+        """
+        active = [j for j in self.jobs.values()
+                  if j.pending and not j.cancelled
+                  and (j.max_parallel is None or len(j.in_flight) < j.max_parallel)]
+        if not active:
+            return None
+        job = active[self._rr % len(active)]
+        self._rr += 1
+        company = job.pending.pop(0)
+        job.in_flight.append(company)
+        if job.status == "queued":
+            job.status = "running"
+            job.started_at = time.time()
+        self._progress(job)
+        return job, company
+
+    def _finish(self, job, status):
+        job.status = status
+        job.finished_at = time.time()
+        if self.journal and job.run_id:
+            try:
+                # Failed companies keep the run open for a later resume
+                complete = status == "done" and not self.journal.pending_companies(job.run_id)
+                self.journal.finish_run(job.run_id, "done" if complete else "interrupted")
+            except Exception as e:
+                print(f"Error updating run journal: {e}")
+        self._progress(job)
+        self.log(f"Job {job.id} {status}: {job.companies_done}/{len(job.companies)} companies, "
+                 f"{job.reports_downloaded} reports, {job.bytes_downloaded / 1024 / 1024:.1f} MB.")
+        metrics = getattr(self.pool.primary, "metrics", None)
+        if metrics and job.started_at:
+            self.log(metrics.report())
+        if self.search_index and job.reports_downloaded:
+            threading.Thread(target=self._update_index, name="search-index", daemon=True).start()
+
+    def _update_index(self):
+        primary = self.pool.primary
+        try:
+            self.search_index.update(primary.download_dir, manifest=primary.manifest, log=self.log)
+        except Exception as e:
+            self.log(f"Search index update failed: {e}")
+
+    def _worker_loop(self, worker):
+        while True:
+            with self._cond:
+                task = self._next_task()
+                while task is None and not self._shutdown:
+                    self._cond.wait()
+                    task = self._next_task()
+                if task is None:
+                    return
+            job, company = task
+            self._run_task(worker, job, company)
+
+    def _run_task(self, worker, job, company):
+        reported = {"bytes": 0}
+
+        def on_report(report, path, size):
+            with self._cond:
+                job.reports_downloaded += 1
+                job.bytes_downloaded += size
+                reported["bytes"] += size
+                self._progress(job)
+
+        checkpoint = None
+        if self.journal and job.run_id:
+            self.journal.set_company_status(job.run_id, company, "running")
+            checkpoint = self.journal.checkpoint(job.run_id, company)
+
+        worker.log(f"[{job.id}] Processing company: {company}")
+        company_status, error = "done", None
+        try:
+            result = self.task(worker, company, job.options, should_stop=job.cancel_event.is_set,
+                               on_report=on_report, checkpoint=checkpoint)
+            # The model download is only included in the final total
+            if result:
+                with self._cond:
+                    job.bytes_downloaded += max(0, result.get("bytes", 0) - reported["bytes"])
+            worker.log(f"[{job.id}] Finished processing {company}")
+        except Exception as e:
+            worker.log(f"[{job.id}] Error processing {company}: {e}")
+            with self._cond:
+                job.errors.append(f"{company}: {e}")
+            company_status, error = "failed", str(e)
+        if job.cancelled and company_status == "done":
+            company_status = "interrupted" # may have stopped mid-company
+        if checkpoint:
+            try:
+                self.journal.set_company_status(job.run_id, company, company_status, error)
+            except Exception as e:
+                print(f"Error updating run journal: {e}")
+
+        with self._cond:
+            job.in_flight.remove(company)
+            job.companies_done += 1
+            if not job.pending and not job.in_flight and job.status == "running":
+                self._finish(job, "cancelled" if job.cancelled else "done")
+            else:
+                self._progress(job)
+            self._cond.notify_all()
@@ -0,0 +1,231 @@
+import json
+import copy
+from datetime import datetime
+from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
+
+REPORT_PATH_MARKER = "/content/research/en/reports/"
+
+# Names the portal's front end might use for paging, in order of preference
+PAGE_PARAMS = ("page", "pageNumber", "pageNo", "pageIndex", "currentPage", "p")
+OFFSET_PARAMS = ("offset", "start", "from", "skip")
+SIZE_PARAMS = ("size", "pageSize", "limit", "rows", "count", "perPage", "per_page")
+
+TITLE_KEYS = ("title", "headline", "name", "displayTitle")
+PAGES_KEYS = ("pages", "pageCount", "numPages", "numberOfPages", "page_count")
+DATE_KEYS = ("publishDate", "publishedDate", "publicationDate", "date", "timestamp", "publishTime", "published")
+DATE_FORMATS = ("%d %b %Y", "%d %B %Y", "%b %d, %Y", "%B %d, %Y", "%Y-%m-%d")
+
+def parse_date(value):
+    """
+    Accepts epoch seconds/milliseconds or common date strings. Returns datetime or None.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)) or (isinstance(value, str) and value.isdigit()):
+        ts = float(value)
+        return datetime.fromtimestamp(ts / 1000 if ts > 1e11 else ts)
+    text = str(value).strip()
+    try:
+        return datetime.fromisoformat(text.replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+def _strings(obj):
+    if isinstance(obj, str):
+        yield obj
+    elif isinstance(obj, dict):
+        for v in obj.values():
+            yield from _strings(v)
+    elif isinstance(obj, list):
+        for v in obj:
+            yield from _strings(v)
+
+def _first_key(record, keys):
+    for key in keys:
+        if key in record and record[key] not in (None, ""):
+            return record[key]
+    return None
+
+def _find_report_lists(obj):
+    """
+    Yields every list in the JSON whose entries are dicts that link to a report.
+    """
+    if isinstance(obj, list):
+        if obj and all(isinstance(x, dict) for x in obj) and any(REPORT_PATH_MARKER in s for s in _strings(obj[0])):
+            yield obj
+        for v in obj:
+            yield from _find_report_lists(v)
+    elif isinstance(obj, dict):
+        for v in obj.values():
+            yield from _find_report_lists(v)
+
+def extract_items(payload, base_url):
+    """
+    Maps a listing JSON response onto the same item dicts the DOM extractor returns:
+    {url, title, pages, date, flags}.
+    """
+    lists = list(_find_report_lists(payload))
+    if not lists:
+        return []
+    records = max(lists, key=len)
+
+    items = []
+    for record in records:
+        url = next((s for s in _strings(record) if REPORT_PATH_MARKER in s), "")
+        if url.startswith("/"):
+            url = base_url.rstrip("/") + url
+        text = " ".join(_strings(record))
+        pages = _first_key(record, PAGES_KEYS)
+        try:
+            pages = int(pages)
+        except (TypeError, ValueError):
+            pages = 0
+        items.append({
+            "url": url,
+            "title": str(_first_key(record, TITLE_KEYS) or "").strip(),
+            "pages": pages,
+            "date": parse_date(_first_key(record, DATE_KEYS)),
+            "flags": {
+                "initiation": "Initiation" in text,
+                "rating_change": "Rating Change" in text
+            }
+        })
+    return items
+
+class ListingEndpoint:
+    """
+    A captured listing XHR that can be replayed page by page.
+    """
+    def __init__(self, url, method="GET", headers=None, body=None):
+        self.url = url
+        self.method = method.upper()
+        # Drop headers requests sets itself (the body length changes when we re-page)
+        self.headers = {k: v for k, v in (headers or {}).items()
+                        if not k.startswith(":") and k.lower() not in ("content-length", "host", "cookie", "accept-encoding")}
+        self.body = body # parsed JSON body for POST requests, else None
+
+        # Locate the paging parameter in the query string or JSON body
+        self.query = {k: v[0] for k, v in parse_qs(urlparse(url).query).items()}
+        self.page_param, self.page_in_body, self.page_is_offset = self._find_param(PAGE_PARAMS + OFFSET_PARAMS)
+        size_param, size_in_body, _ = self._find_param(SIZE_PARAMS)
+        source = self.body if size_in_body else self.query
+        try:
+            self.page_size = int(source[size_param]) if size_param else None
+        except (TypeError, ValueError, KeyError):
+            self.page_size = None
+
+    def _find_param(self, names):
+        for name in names:
+            if isinstance(self.body, dict) and name in self.body:
+                return name, True, name in OFFSET_PARAMS
+            if name in self.query:
+                return name, False, name in OFFSET_PARAMS
+        return None, False, False
+
+    @property
+    def pageable(self):
+        return self.page_param is not None and (not self.page_is_offset or bool(self.page_size))
+
+    def request_for(self, page_index):
+        """
+        Returns (url, json_body) for the zero-based page_index.
+        """
+        source = self.body if self.page_in_body else self.query
+        start = source.get(self.page_param) if self.page_param else None
+        try:
+            start = int(start)
+        except (TypeError, ValueError):
+            start = 0 if self.page_is_offset else 1
+        value = start + page_index * (self.page_size if self.page_is_offset else 1)
+
+        body = copy.deepcopy(self.body)
+        url = self.url
+        if self.page_param and self.page_in_body:
+            body[self.page_param] = value
+        elif self.page_param:
+            query = dict(self.query, **{self.page_param: value})
+            url = urlunparse(urlparse(self.url)._replace(query=urlencode(query)))
+        return url, body
+
+def capture_listing_endpoint(driver, log=print):
+    """
+    Looks through Chrome's performance log for the JSON request that returned the
+    report listing. Requires the "goog:loggingPrefs" {"performance": "ALL"} capability.
+    Returns a ListingEndpoint, or None if no such request was seen.
+    """
+    requests_by_id = {}
+    json_responses = []
+    for entry in driver.get_log("performance"):
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, ValueError):
+            continue
+        params = message.get("params", {})
+        if message.get("method") == "Network.requestWillBeSent":
+            requests_by_id[params["requestId"]] = params["request"]
+        elif message.get("method") == "Network.responseReceived":
+            response = params.get("response", {})
+            if "json" in response.get("mimeType", "") and params.get("type") in ("XHR", "Fetch"):
+                json_responses.append(params["requestId"])
+
+    # The newest matching response is the listing currently on screen
+    for request_id in reversed(json_responses):
+        request = requests_by_id.get(request_id)
+        if not request:
+            continue
+        try:
+            body = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+        except Exception:
+            continue
+        if REPORT_PATH_MARKER not in body.get("body", "").replace("\\/", "/"):
+            continue
+
+        post_data = None
+        if request.get("postData"):
+            try:
+                post_data = json.loads(request["postData"])
+            except ValueError:
+                continue # Form-encoded bodies are not supported
+        endpoint = ListingEndpoint(request["url"], request.get("method", "GET"), request.get("headers"), post_data)
+        if endpoint.pageable:
+            log(f"Captured listing API: {request.get('method', 'GET')} {urlparse(request['url']).path} (paged by '{endpoint.page_param}')")
+            return endpoint
+    return None
+
+class ListingCrawler:
+    """
+    Replays a captured listing request over HTTP with the browser's session cookies.
+    """
+    def __init__(self, session, endpoint, base_url, timeout=30, max_pages=200):
+        self.session = session
+        self.endpoint = endpoint
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_pages = max_pages
+
+    def fetch_page(self, page_index):
+        url, body = self.endpoint.request_for(page_index)
+        if self.endpoint.method == "POST":
+            response = self.session.post(url, json=body, headers=self.endpoint.headers, timeout=self.timeout)
+        else:
+            response = self.session.get(url, headers=self.endpoint.headers, timeout=self.timeout)
+        response.raise_for_status()
+        return extract_items(response.json(), self.base_url)
+
+    def pages(self, start_index=0):
+        """
+        Yields the item list of each page until an empty or repeated page.
+        """
+        previous_first = None
+        for page_index in range(start_index, self.max_pages):
+            items = self.fetch_page(page_index)
+            if not items or items[0]["url"] == previous_first:
+                return
+            previous_first = items[0]["url"]
+            yield items
@@ -0,0 +1,66 @@
+import os
+import logging
+import threading
+from itertools import islice
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+class SessionLog:
+    """
+    The most recent `maxlen` log messages of a UI session. Older messages are spilled to a
+    rotating file (spill_path, if given) instead of growing memory without bound.
+    """
+    def __init__(self, maxlen=2000, spill_path=None, max_bytes=5 * 1024 * 1024, backups=3):
+        self._messages = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self.spill_path = spill_path
+        self.spilled = 0
+        self._file = None
+        if spill_path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(spill_path)), exist_ok=True)
+                self._file = RotatingFileHandler(spill_path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+                self._file.setFormatter(logging.Formatter("%(message)s"))
+            except Exception as e:
+                print(f"Error opening log file {spill_path}: {e}")
+
+    def __len__(self):
+        return len(self._messages)
+
+    def append(self, message):
+        with self._lock:
+            if len(self._messages) == self._messages.maxlen:
+                self._spill(self._messages[0])
+            self._messages.append(str(message))
+
+    def _spill(self, message):
+        self.spilled += 1
+        if self._file:
+            try:
+                self._file.emit(logging.makeLogRecord({"msg": message, "levelno": logging.INFO}))
+            except Exception:
+                pass
+
+    def tail(self, n):
+        """
+        The last n messages, oldest first.
+        """
+        with self._lock:
+            start = max(0, len(self._messages) - n)
+            return list(islice(self._messages, start, None))
+
+    def page(self, number, size=200):
+        """
+        Page `number` counted from the newest (0 = latest `size` messages), oldest first.
+        """
+        with self._lock:
+            end = max(0, len(self._messages) - number * size)
+            return list(islice(self._messages, max(0, end - size), end))
+
+    def pages(self, size=200):
+        return max(1, (len(self._messages) + size - 1) // size)
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
@@ -1,11 +1,17 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 import threading
 import time
 import os
 from core import GSResearchDownloader
+from jobs import JobManager
+from events import EventLog
+from run_journal import RunJournal
+from search_index import SearchIndex
+from metrics import METRICS
 
 app = FastAPI()
 
@@ -21,29 +27,87 @@ app.add_middleware(
 # Global state
 class AppState:
     downloader: Optional[GSResearchDownloader] = None
+    jobs: Optional[JobManager] = None
+    journal: Optional[RunJournal] = None
+    search_index: Optional[SearchIndex] = None # stays open after /stop so downloads remain searchable
     status: str = "idle" # idle, login_pending, ready, processing, error
-    logs: List[str] = []
+    events: EventLog = EventLog(maxlen=1000) # log, status and job events
     
 state = AppState()
 
 class InitRequest(BaseModel):
     download_dir: str = "downloads"
+    wait_timeouts: Optional[Dict[str, float]] = None # Per-step overrides, see waits.DEFAULT_TIMEOUTS
+    max_browsers: int = 2 # Size of the browser pool shared by all jobs
+    recycle_after: int = 150 # Restart Chrome after this many reports (0 = never)
+    max_memory_mb: int = 1500 # Restart Chrome above this memory use (0 = no limit)
+    profile: Optional[str] = "default" # Persistent Chrome profile/cookies to reuse (None = fresh browser)
+    report_tabs: int = 1 # Report tabs each browser downloads through at once when HTTP download is unavailable
+    crawl_profile: str = "full" # "lean" blocks images/fonts/stylesheets/analytics and stops waiting at DOMContentLoaded
 
 class ProcessRequest(BaseModel):
     companies: List[str]
+    workers: int = 1 # Number of parallel browsers
+
+class JobRequest(BaseModel):
+    companies: List[str]
+    min_pages: int = 1
+    primary_only: bool = True
+    models_only: bool = False
+    days_filter: Optional[int] = None
+    max_parallel: Optional[int] = None # Cap on browsers used by this job (default: any free)
+    owner: Optional[str] = None
+
+class ResumeRequest(BaseModel):
+    max_parallel: Optional[int] = None
+    owner: Optional[str] = None
 
 def log(message: str):
     timestamp = time.strftime("%H:%M:%S")
     entry = f"[{timestamp}] {message}"
     print(entry)
-    state.logs.append(entry)
-    # Keep logs manageable
-    if len(state.logs) > 100:
-        state.logs = state.logs[-100:]
+    state.events.publish("log", message=entry)
+
+def current_status() -> str:
+    if state.status == "ready" and state.jobs and state.jobs.busy():
+        return "processing"
+    return state.status
+
+def set_status(status: str):
+    state.status = status
+    state.events.publish("status", status=current_status())
+
+def publish_job(job: dict):
+    state.events.publish("job", job=job)
+    # Jobs starting or finishing flip the overall status between ready and processing
+    if job["status"] in ("queued", "done", "cancelled", "failed"):
+        state.events.publish("status", status=current_status())
 
 @app.get("/status")
-def get_status():
-    return {"status": state.status, "logs": state.logs}
+def get_status(since: Optional[int] = None):
+    status = current_status()
+    if since is None:
+        return {"status": status, "logs": state.events.messages(100), "seq": state.events.last_seq}
+    # Incremental polling: only the events after the client's last seq
+    events, truncated = state.events.since(since)
+    return {"status": status, "events": events, "truncated": truncated, "seq": state.events.last_seq}
+
+@app.get("/events")
+def stream_events(since: Optional[int] = None, types: Optional[str] = None,
+                  last_event_id: Optional[int] = Header(None)):
+    """
+    Server-Sent Events stream of log/status/job events. Browsers resume
+    automatically via Last-Event-ID; other clients can pass ?since=<seq>.
+    """
+    # On a reconnect the browser sends the original ?since again, plus the id of the
+    # last event it got; resume from whichever is later so nothing is replayed
+    since = max(since or 0, last_event_id or 0)
+    type_filter = set(types.split(",")) if types else None
+    return StreamingResponse(
+        state.events.stream(since, type_filter),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.post("/init")
 def init_browser(req: InitRequest):
@@ -56,15 +120,27 @@ def init_browser(req: InitRequest):
         # Adjust download dir to be absolute relative to where the backend is running
         # Assuming backend is running from backend/ or root, let's make sure it's correct
         # If running from root, "downloads" is fine.
-        state.downloader = GSResearchDownloader(req.download_dir, log_callback=log)
-        state.status = "login_pending"
+        state.downloader = GSResearchDownloader(req.download_dir, log_callback=log, wait_timeouts=req.wait_timeouts,
+                                                recycle_after=req.recycle_after, max_memory_mb=req.max_memory_mb,
+                                                profile=req.profile, report_tabs=req.report_tabs,
+                                                crawl_profile=req.crawl_profile)
+        state.journal = RunJournal(os.path.join(req.download_dir, "runs.db"))
+        index_path = os.path.join(state.downloader.download_dir, "search.db")
+        if not state.search_index or state.search_index.db_path != index_path:
+            state.search_index = SearchIndex(index_path)
+        state.jobs = JobManager(state.downloader, max_workers=req.max_browsers, log_callback=log,
+                                on_progress=publish_job, journal=state.journal, search_index=state.search_index)
+        set_status("login_pending")
         
         msg = state.downloader.login_init()
         log(msg)
+        if state.downloader.session_restored:
+            set_status("ready")
+            return {"message": msg, "status": state.status}
         
         return {"message": "Browser initialized. Please log in.", "status": state.status}
     except Exception as e:
-        state.status = "error"
+        set_status("error")
         log(f"Error initializing: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -73,49 +149,142 @@ def confirm_login():
     if not state.downloader:
         raise HTTPException(status_code=400, detail="Browser not initialized")
     
-    state.status = "ready"
+    state.downloader.save_session()
+    set_status("ready")
     log("Login confirmed by user. Ready to process.")
     return {"status": state.status}
 
-def process_companies_task(companies: List[str]):
-    if not state.downloader:
-        return
-    
-    state.status = "processing"
-    try:
-        for company in companies:
-            if state.status != "processing": # Allow stopping
-                break
-            log(f"Processing company: {company}")
-            state.downloader.search_company(company)
-            state.downloader.download_reports(company)
-            log(f"Finished processing {company}")
-        
-        log("Batch processing complete.")
-        state.status = "ready"
-    except Exception as e:
-        log(f"Error during processing: {str(e)}")
-        state.status = "error"
+@app.get("/metrics")
+def get_metrics(format: str = "prometheus"):
+    """
+    Stage timings (p50/p95) and counters for every browser in this process.
+    format: "prometheus" (text exposition) or "json".
+    """
+    if format == "json":
+        summary = METRICS.summary()
+        summary["report"] = METRICS.report()
+        return summary
+    return PlainTextResponse(METRICS.prometheus(), media_type="text/plain; version=0.0.4")
 
-@app.post("/process")
-def start_processing(req: ProcessRequest, background_tasks: BackgroundTasks):
+@app.get("/wait-report")
+def get_wait_report():
     if not state.downloader:
         raise HTTPException(status_code=400, detail="Browser not initialized")
-    
-    if state.status != "ready":
-        # Allow force processing if needed, but warn
-        pass
+    waited, legacy = state.downloader.waits.time_saved()
+    return {
+        "steps": state.downloader.waits.stats,
+        "waited_seconds": round(waited, 2),
+        "fixed_sleep_seconds": legacy,
+        "saved_seconds": round(legacy - waited, 2),
+        "report": state.downloader.waits.report()
+    }
+
+def require_jobs() -> JobManager:
+    if not state.downloader or not state.jobs:
+        raise HTTPException(status_code=400, detail="Browser not initialized")
+    return state.jobs
+
+@app.post("/process")
+def start_processing(req: ProcessRequest):
+    # Kept for existing clients: a plain batch is just a job with default options
+    jobs = require_jobs()
+    job = jobs.submit(req.companies, max_parallel=req.workers)
+    return {"message": "Processing started", "status": "processing", "job_id": job.id}
+
+@app.post("/jobs")
+def create_job(req: JobRequest):
+    jobs = require_jobs()
+    options = {
+        "min_pages": req.min_pages,
+        "primary_only": req.primary_only,
+        "models_only": req.models_only,
+        "days_filter": req.days_filter
+    }
+    job = jobs.submit(req.companies, options, max_parallel=req.max_parallel, owner=req.owner)
+    return job.to_dict()
+
+@app.get("/jobs")
+def list_jobs():
+    jobs = require_jobs()
+    return [job.to_dict() for job in jobs.list()]
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = require_jobs().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    job = require_jobs().cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/runs")
+def list_runs(limit: int = 20):
+    require_jobs()
+    return state.journal.list_runs(limit)
+
+@app.get("/runs/{run_id}")
+def get_run(run_id: str):
+    require_jobs()
+    run = state.journal.get_run(run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return run
+
+@app.post("/runs/{run_id}/resume")
+def resume_run(run_id: str, req: Optional[ResumeRequest] = None):
+    jobs = require_jobs()
+    req = req or ResumeRequest()
+    if not state.journal.get_run(run_id):
+        raise HTTPException(status_code=404, detail="Run not found")
+    job = jobs.resume(run_id, max_parallel=req.max_parallel, owner=req.owner)
+    if not job:
+        raise HTTPException(status_code=409, detail="Run is already in progress")
+    return job.to_dict()
+
+def require_index() -> SearchIndex:
+    if not state.search_index:
+        raise HTTPException(status_code=400, detail="Search index not initialized")
+    return state.search_index
+
+@app.get("/search")
+def search_reports(q: str = "", company: Optional[str] = None, date_from: Optional[str] = None,
+                   date_to: Optional[str] = None, initiation: Optional[bool] = None,
+                   rating_change: Optional[bool] = None, limit: int = 20, offset: int = 0):
+    """
+    Full-text search over the downloaded PDFs (FTS5 syntax: AND/OR/NOT, "phrases", prefix*).
+    An empty q lists the filtered reports, newest first.
+    """
+    index = require_index()
+    results = index.search(q, company=company, date_from=date_from, date_to=date_to, initiation=initiation,
+                           rating_change=rating_change, limit=min(limit, 200), offset=offset)
+    return {"query": q, "results": results, "stats": index.stats()}
 
-    background_tasks.add_task(process_companies_task, req.companies)
-    return {"message": "Processing started", "status": "processing"}
+@app.post("/search/reindex")
+def reindex_reports():
+    index = require_index()
+    manifest = state.downloader.manifest if state.downloader else None
+    threading.Thread(target=index.update, args=(os.path.dirname(index.db_path),),
+                     kwargs={"manifest": manifest, "log": log}, name="search-index", daemon=True).start()
+    return {"message": "Index update started", "stats": index.stats()}
 
 @app.post("/stop")
 def stop_browser():
+    if state.jobs:
+        state.jobs.shutdown()
+        state.jobs = None
+    if state.journal:
+        state.journal.close()
+        state.journal = None
     if state.downloader:
         log("Stopping browser...")
         state.downloader.close()
         state.downloader = None
-    state.status = "idle"
+    set_status("idle")
     return {"message": "Browser stopped", "status": state.status}
 
 if __name__ == "__main__":
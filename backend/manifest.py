@@ -0,0 +1,222 @@
+import os
+import re
+import sqlite3
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+
+REPORT_PATH_MARKER = "/content/research/en/reports/"
+# {A_Initiation_|A_Rating_}{company}_Report_{n}_{title}.pdf, as written by GSResearchDownloader
+REPORT_FILENAME_PATTERN = re.compile(r"^(?:A_Initiation_|A_Rating_)?.+?_Report_\d+_(.*?)(?:_\d{10})?$")
+
+def report_id_from_url(url):
+    """
+    Stable ID for a report: the path after /content/research/en/reports/ without extension or query.
+    """
+    if not url:
+        return None
+    path = url.split("?")[0].split("#")[0].rstrip("/")
+    if REPORT_PATH_MARKER in path:
+        path = path.split(REPORT_PATH_MARKER, 1)[1]
+    return os.path.splitext(path)[0]
+
+def normalize_title(title):
+    """
+    Lowercase alphanumerics only, cut to 60 chars. Survives the sanitizing and
+    truncation applied to file names, so a title read back from disk still matches.
+    """
+    return re.sub(r"[^a-z0-9]", "", (title or "").lower())[:60]
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def pdf_page_count(path):
+    """
+    Best-effort page count from the page tree's /Count entries. Returns None if unknown.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        counts = [int(c) for c in re.findall(rb"/Type\s*/Pages\b[^>]*?/Count\s+(\d+)", data)]
+        counts += [int(c) for c in re.findall(rb"/Count\s+(\d+)[^>]*?/Type\s*/Pages\b", data)]
+        return max(counts) if counts else None
+    except Exception:
+        return None
+
+class DownloadManifest:
+    """
+    SQLite index of downloaded reports, keyed by report ID (from the URL) + company and by
+    company + normalized title. Duplicate checks are a single indexed lookup
+    instead of a scan over the company folder. The same report can be listed under
+    several companies; the sha256 column ties those copies to one blob (see BlobStore).
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._ready = threading.Event() # cleared while rebuild_in_background() runs
+        self._ready.set()
+        self.is_new = not os.path.exists(db_path)
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.init_db()
+
+    def init_db(self):
+        with self._lock:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS reports (
+                    report_id TEXT NOT NULL,
+                    url TEXT,
+                    company TEXT NOT NULL,
+                    title TEXT,
+                    norm_title TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    size INTEGER,
+                    sha256 TEXT,
+                    report_date TEXT,
+                    page_count INTEGER,
+                    downloaded_at TEXT,
+                    PRIMARY KEY (report_id, company)
+                )
+            ''')
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_title ON reports (company, norm_title)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_sha ON reports (sha256)")
+            self.conn.commit()
+
+    def find(self, url, company, title):
+        """
+        Returns the stored path if this company already has the report, else None.
+        Rows whose file has been deleted are dropped so the report is fetched again.
+        """
+        report_id = report_id_from_url(url)
+        self._ready.wait()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT report_id, path FROM reports WHERE company = ? AND (report_id = ? OR norm_title = ?) LIMIT 1",
+                (company, report_id, normalize_title(title))
+            ).fetchone()
+            if not row:
+                return None
+            if not os.path.exists(row[1]):
+                self.conn.execute("DELETE FROM reports WHERE report_id = ? AND company = ?", (row[0], company))
+                self.conn.commit()
+                return None
+            return row[1]
+
+    def find_sha256(self, url):
+        """
+        Content hash of this report if it was downloaded for any company, else None.
+        """
+        report_id = report_id_from_url(url)
+        self._ready.wait()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT sha256 FROM reports WHERE report_id = ? AND sha256 IS NOT NULL LIMIT 1", (report_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def entries(self):
+        """
+        Maps the path of every indexed file to its company, title, URL, date, page count and hash.
+        """
+        self._ready.wait()
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT path, company, title, url, report_date, page_count, sha256 FROM reports"
+            ).fetchall()
+        return {row[0]: {"company": row[1], "title": row[2], "url": row[3], "report_date": row[4],
+                         "page_count": row[5], "sha256": row[6]} for row in rows}
+
+    def record(self, path, company, title, url=None, report_date=None, page_count=None, sha256=None):
+        """
+        Adds or updates the entry for a downloaded file. Pass sha256 if it is already known.
+        """
+        norm_title = normalize_title(title)
+        report_id = report_id_from_url(url) or f"title:{company}:{norm_title}"
+        if isinstance(report_date, datetime):
+            report_date = report_date.date().isoformat()
+        if page_count is None:
+            page_count = pdf_page_count(path)
+
+        with self._lock:
+            # A report first seen on disk (no URL) gets upgraded to its real ID
+            if url:
+                self.conn.execute("DELETE FROM reports WHERE report_id = ? AND company = ?", (f"title:{company}:{norm_title}", company))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO reports VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (report_id, url, company, title, norm_title, os.path.abspath(path),
+                 os.path.getsize(path), sha256 or file_sha256(path), report_date, page_count,
+                 datetime.now().isoformat(timespec="seconds"))
+            )
+            self.conn.commit()
+
+    def rebuild(self, downloads_root, log=print):
+        """
+        Re-indexes every report PDF under <downloads_root>/<company>/.
+        Existing rows for files that are still on disk keep their URL and date.
+        """
+        downloads_root = os.path.abspath(downloads_root)
+        known = {}
+        with self._lock:
+            for row in self.conn.execute("SELECT path, url, report_date FROM reports"):
+                known[row[0]] = (row[1], row[2])
+            self.conn.execute("DELETE FROM reports")
+            self.conn.commit()
+
+        count = 0
+        for company in sorted(os.listdir(downloads_root)):
+            company_dir = os.path.join(downloads_root, company)
+            if company.startswith(".") or not os.path.isdir(company_dir):
+                continue
+            for filename in os.listdir(company_dir):
+                if not filename.lower().endswith(".pdf"):
+                    continue
+                path = os.path.join(company_dir, filename)
+                match = REPORT_FILENAME_PATTERN.match(os.path.splitext(filename)[0])
+                title = match.group(1) if match else os.path.splitext(filename)[0]
+                url, report_date = known.get(path, (None, None))
+                try:
+                    self.record(path, company, title, url=url, report_date=report_date)
+                    count += 1
+                except Exception as e:
+                    log(f"Could not index {path}: {e}")
+
+        log(f"Manifest rebuilt: {count} reports indexed from {downloads_root}")
+        return count
+
+    def rebuild_in_background(self, downloads_root, log=print):
+        """
+        Runs rebuild() on a background thread. Lookups wait until it has finished, so
+        nothing already on disk is mistaken for a new report.
+        """
+        def _run():
+            try:
+                self.rebuild(downloads_root, log=log)
+            except Exception as e:
+                log(f"Manifest rebuild failed: {e}")
+            finally:
+                self._ready.set()
+        self._ready.clear()
+        threading.Thread(target=_run, name="manifest-rebuild", daemon=True).start()
+
+    def close(self):
+        self._ready.wait()
+        with self._lock:
+            self.conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the download manifest.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rebuild_parser = subparsers.add_parser("rebuild", help="Rebuild the manifest from an existing downloads tree.")
+    rebuild_parser.add_argument("downloads_dir", nargs="?", default="downloads")
+    rebuild_parser.add_argument("--db", help="Manifest path (default: <downloads_dir>/manifest.db)")
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        manifest = DownloadManifest(args.db or os.path.join(args.downloads_dir, "manifest.db"))
+        manifest.rebuild(args.downloads_dir)
+        manifest.close()
@@ -0,0 +1,179 @@
+import math
+import time
+import functools
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank
+    index = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+class Metrics:
+    """
+    Thread-safe stage timings and counters for the crawler.
+    Stages keep their last `window` durations for percentiles, plus running totals.
+    Counters can carry labels, e.g. incr("webdriver_commands", command="findElements").
+    """
+    def __init__(self, window=5000):
+        self.window = window
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.stages = {}   # name -> {"count", "total", "errors", "samples"}
+            self.counters = {} # (name, labels) -> value
+
+    # --- Recording ---
+
+    def observe(self, stage, seconds, error=False):
+        with self._lock:
+            entry = self.stages.get(stage)
+            if entry is None:
+                entry = self.stages[stage] = {"count": 0, "total": 0.0, "errors": 0, "samples": deque(maxlen=self.window)}
+            entry["count"] += 1
+            entry["total"] += seconds
+            entry["samples"].append(seconds)
+            if error:
+                entry["errors"] += 1
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, error)
+
+    def incr(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    # --- Output ---
+
+    def summary(self):
+        """
+        JSON-friendly snapshot: per-stage count/total/p50/p95/max and all counters.
+        """
+        with self._lock:
+            stages = {name: (dict(e), sorted(e["samples"])) for name, e in self.stages.items()}
+            counters = dict(self.counters)
+            started_at = self.started_at
+
+        result = {"uptime_seconds": round(time.time() - started_at, 1), "stages": {}, "counters": {}}
+        for name, (entry, samples) in stages.items():
+            result["stages"][name] = {
+                "count": entry["count"],
+                "errors": entry["errors"],
+                "total_seconds": round(entry["total"], 3),
+                "p50_seconds": round(_percentile(samples, 50), 3),
+                "p95_seconds": round(_percentile(samples, 95), 3),
+                "max_seconds": round(samples[-1], 3) if samples else 0.0
+            }
+        for (name, labels), value in sorted(counters.items()):
+            if labels:
+                result["counters"].setdefault(name, {})[",".join(f"{k}={v}" for k, v in labels)] = value
+            else:
+                result["counters"][name] = value
+        return result
+
+    def report(self):
+        """
+        Human-readable table of stage timings followed by the counters.
+        """
+        data = self.summary()
+        if not data["stages"] and not data["counters"]:
+            return "Performance report: nothing recorded."
+
+        lines = ["Performance report:",
+                 f"  {'stage':<28}{'count':>7}{'total':>10}{'p50':>9}{'p95':>9}{'max':>9}"]
+        for name, s in sorted(data["stages"].items(), key=lambda kv: -kv[1]["total_seconds"]):
+            lines.append(f"  {name:<28}{s['count']:>7}{s['total_seconds']:>9.1f}s{s['p50_seconds']:>8.2f}s"
+                         f"{s['p95_seconds']:>8.2f}s{s['max_seconds']:>8.2f}s")
+        for name, value in data["counters"].items():
+            if isinstance(value, dict):
+                total = sum(value.values())
+                top = ", ".join(f"{k.split('=', 1)[1]}={v:g}" for k, v in sorted(value.items(), key=lambda kv: -kv[1])[:5])
+                lines.append(f"  {name}: {total:g} ({top})")
+            else:
+                lines.append(f"  {name}: {value:g}")
+        return "\n".join(lines)
+
+    def prometheus(self, prefix="gsbot"):
+        """
+        Prometheus text exposition format (stages as summaries, counters as counters).
+        """
+        with self._lock:
+            stages = {name: (dict(e), sorted(e["samples"])) for name, e in self.stages.items()}
+            counters = dict(self.counters)
+
+        lines = []
+        if stages:
+            metric = f"{prefix}_stage_seconds"
+            lines.append(f"# HELP {metric} Time spent per crawler stage.")
+            lines.append(f"# TYPE {metric} summary")
+            for name, (entry, samples) in sorted(stages.items()):
+                for quantile in (0.5, 0.95):
+                    lines.append(f'{metric}{{stage="{name}",quantile="{quantile}"}} {_percentile(samples, quantile * 100):.6f}')
+                lines.append(f'{metric}_sum{{stage="{name}"}} {entry["total"]:.6f}')
+                lines.append(f'{metric}_count{{stage="{name}"}} {entry["count"]}')
+            metric = f"{prefix}_stage_errors_total"
+            lines.append(f"# TYPE {metric} counter")
+            for name, (entry, _) in sorted(stages.items()):
+                lines.append(f'{metric}{{stage="{name}"}} {entry["errors"]}')
+
+        declared = set()
+        for (name, labels), value in sorted(counters.items()):
+            metric = f"{prefix}_{name}_total"
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} counter")
+                declared.add(metric)
+            lines.append(f"{metric}{_label_text(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+# Process-wide registry shared by every downloader, so pool workers add up in /metrics
+METRICS = Metrics()
+
+def timed(stage):
+    """
+    Method decorator: records the call's duration under `stage` in self.metrics.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.stage(stage):
+                return fn(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+def instrument_driver(driver, metrics):
+    """
+    Counts every WebDriver command sent by `driver` (per command name) and times navigations (stage "page_load").
+    """
+    original_execute = driver.execute
+
+    def execute(driver_command, params=None):
+        metrics.incr("webdriver_commands", command=driver_command)
+        if driver_command == "get":
+            # Navigation time as the crawler sees it (depends on pageLoadStrategy)
+            with metrics.stage("page_load"):
+                return original_execute(driver_command, params)
+        return original_execute(driver_command, params)
+
+    driver.execute = execute
+    return driver
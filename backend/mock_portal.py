@@ -0,0 +1,323 @@
+import re
+import json
+import time
+import argparse
+import threading
+from datetime import datetime, timedelta
+from html import escape
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, quote
+from portal_selectors import (REPORT_PATH_MARKER, SEARCH_BOX_SELECTOR, MODEL_SECTION_SELECTOR,
+                              NEXT_PAGE_SELECTORS, PDF_SELECTORS)
+
+SELECTOR_PART_PATTERN = re.compile(r"^([\w-]+)((?:\[[\w-]+[*^$]?='[^']*'\])*)$")
+SELECTOR_ATTR_PATTERN = re.compile(r"\[([\w-]+)([*^$]?)='([^']*)'\]")
+VOID_TAGS = {"input", "img", "br"}
+
+def element(selector, inner="", attrs=None):
+    """
+    HTML for an element matched by a simple CSS selector (tag[attr='value'] parts, joined
+    by descendant spaces), so the mock serves exactly what the downloader looks for.
+    attrs: extra attributes for the innermost element. A value given for an attribute the
+    selector only partly fixes (*=, ^=, $=) must satisfy it.
+    """
+    opening, closing = [], []
+    parts = re.findall(r"(?:[^\s\[]|\[[^\]]*\])+", selector) # spaces inside [...] do not split
+    for depth, part in enumerate(parts):
+        match = SELECTOR_PART_PATTERN.match(part)
+        if not match:
+            raise ValueError(f"Cannot build markup for selector part '{part}'")
+        tag = match.group(1)
+        values = dict(attrs or {}) if depth == len(parts) - 1 else {}
+        for name, op, value in SELECTOR_ATTR_PATTERN.findall(match.group(2)):
+            given = values.get(name)
+            if given is None or not op:
+                values[name] = value
+            elif not {"*": value in given, "^": given.startswith(value), "$": given.endswith(value)}[op]:
+                raise ValueError(f"{name}=\"{given}\" does not match selector '{selector}'")
+        opening.append(f"<{tag}" + "".join(f' {name}="{value}"' for name, value in values.items()) + ">")
+        closing.insert(0, "" if tag in VOID_TAGS else f"</{tag}>")
+    return "".join(opening) + inner + "".join(closing)
+
+# Page fragments are built from the selectors GSResearchDownloader looks for (portal_selectors),
+# using the first of each fallback list, so a selector change reaches the benchmark too
+HEADER_HTML = """
+%(search_box)s
+<div role="listbox" id="suggestions"></div>
+<script>
+const COMPANIES = %(companies)s;
+const box = document.querySelector(%(search_selector)s);
+const list = document.getElementById("suggestions");
+box.addEventListener("input", () => {
+    const q = box.value.trim().toUpperCase();
+    list.innerHTML = COMPANIES.filter(c => q && c.includes(q))
+        .map(c => `<div role="option"><a href="/company/${c}">${c}</a></div>`).join("");
+});
+box.addEventListener("keydown", (e) => {
+    if (e.key !== "Enter") return;
+    const q = box.value.trim().toUpperCase();
+    window.location = COMPANIES.includes(q) ? `/company/${q}` : `/companies?q=${encodeURIComponent(q)}`;
+});
+</script>
+"""
+
+# Like the real portal, every page pulls in a stylesheet with a web font, a logo and a tracker
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>%(title)s</title>
+<link rel="stylesheet" href="/static/portal.css"><script async src="/static/analytics.js"></script></head>
+<body><img src="/static/logo.png" alt="">%(header)s%(body)s</body></html>"""
+
+STATIC_ASSETS = {
+    "portal.css": ("text/css", "@font-face { font-family: Portal; src: url(/static/portal.woff2); }\n"
+                               "body { font-family: Portal, sans-serif; }\n" + "/* padding */\n" * 2000),
+    "portal.woff2": ("font/woff2", b"wOF2" + b"0" * 60000),
+    "logo.png": ("image/png", b"\x89PNG\r\n\x1a\n" + b"0" * 40000),
+    "analytics.js": ("application/javascript", "window.__beacon = Date.now();\n" + "//\n" * 5000)
+}
+
+COMPANY_BODY = """
+<h1>%(company)s</h1>
+<ul class="tabs">
+  <li><a class="tab" id="primary-tab" href="#">Primary</a></li>
+  <li><a class="tab active" href="#">All</a></li>
+</ul>
+%(model_section)s
+<a href="/search?company=%(company)s&page=1"><span>View More</span></a>
+<script>
+document.getElementById("primary-tab").addEventListener("click", (e) => {
+    e.preventDefault();
+    fetch("/api/ping").then(() => { e.target.className = "tab active"; });
+});
+</script>
+"""
+
+RESULTS_BODY = """
+<div id="results"></div>
+<div id="pagination"></div>
+<script>
+const params = new URLSearchParams(window.location.search);
+const company = params.get("company");
+const page = parseInt(params.get("page") || "1", 10);
+fetch(`/api/reports?company=${encodeURIComponent(company)}&page=${page}&size=%(per_page)d`)
+  .then(r => r.json())
+  .then(data => {
+    const results = document.getElementById("results");
+    if (data.layout === "table") {
+        results.innerHTML = "<table>" + data.results.map(r => `
+          <tr>
+            <td class="SearchResults__colCopy"><a href="${r.url}">${r.title}</a></td>
+            <td class="SearchResults__colPages">${r.pageCount}</td>
+            <td class="SearchResults__colDate"><span class="SearchResults__hiddenEl">${r.publishDate}</span>${new Date(r.publishDate).toDateString()}</td>
+          </tr>`).join("") + "</table>";
+    } else {
+        results.innerHTML = data.results.map(r => `
+          <div data-testid="search-item-content">
+            <a href="${r.url}">${r.title}</a>
+            <div data-testid="search-item-metadata">${r.pageCount} pg</div>
+            <time datetime="${new Date(r.publishDate).toISOString().slice(0, 10)}"></time>
+          </div>`).join("");
+    }
+    if (page < data.totalPages) {
+        document.getElementById("pagination").innerHTML =
+            `%(next_link)s`;
+    }
+  });
+</script>
+"""
+
+REPORT_BODY = """
+<h1>%(title)s</h1>
+%(pdf_link)s
+"""
+
+SELECTOR_MARKUP = {
+    "search_box": element(SEARCH_BOX_SELECTOR, attrs={"type": "text", "placeholder": "Search"}),
+    "search_selector": json.dumps(SEARCH_BOX_SELECTOR),
+    "model_section": element(MODEL_SECTION_SELECTOR, '<a href="/models/%(company)s.xlsx"><button>Download Model</button></a>'),
+    "next_link": element(NEXT_PAGE_SELECTORS[0], "Next",
+                         {"href": "/search?company=${encodeURIComponent(company)}&page=${page + 1}"}),
+    "pdf_link": element(PDF_SELECTORS[0], "PDF", {"href": "/pdf/%(report_id)s.pdf"})
+}
+# Fill in the markup now; the remaining %(...)s placeholders are per request
+HEADER_HTML = HEADER_HTML.replace("%(search_box)s", SELECTOR_MARKUP["search_box"]).replace(
+    "%(search_selector)s", SELECTOR_MARKUP["search_selector"])
+COMPANY_BODY = COMPANY_BODY.replace("%(model_section)s", SELECTOR_MARKUP["model_section"])
+RESULTS_BODY = RESULTS_BODY.replace("%(next_link)s", SELECTOR_MARKUP["next_link"])
+REPORT_BODY = REPORT_BODY.replace("%(pdf_link)s", SELECTOR_MARKUP["pdf_link"])
+
+def make_pdf(page_count, size):
+    """
+    A minimal PDF-looking file of roughly `size` bytes whose page tree reports page_count pages.
+    """
+    head = f"%PDF-1.4\n1 0 obj << /Type /Pages /Count {page_count} >> endobj\n".encode()
+    tail = b"\n%%EOF\n"
+    padding = max(0, size - len(head) - len(tail))
+    return head + b"%" + b"0" * max(0, padding - 1) + tail
+
+class MockPortal:
+    """
+    Local stand-in for the GS publishing portal, for benchmarking without live access.
+    Serves a home page with the search box, company pages (model section, Primary tab,
+    View More), paged results in grid or table layout backed by a JSON listing API,
+    report pages and PDFs of configurable size and latency, plus the static assets
+    (stylesheet, font, logo, tracker) every page loads.
+    """
+    def __init__(self, companies=5, pages=3, per_page=10, layout="grid", pdf_kb=200, latency_ms=50,
+                 host="127.0.0.1", port=0):
+        self.tickers = [f"MOCK{i + 1}" for i in range(companies)]
+        self.pages = pages
+        self.per_page = per_page
+        self.layout = layout # grid, table or mixed (alternates per company)
+        self.pdf_size = int(pdf_kb * 1024)
+        self.latency = latency_ms / 1000
+        self.requests = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="mock-portal", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    # --- Data ---
+
+    def layout_for(self, company):
+        if self.layout == "mixed":
+            return "grid" if self.tickers.index(company) % 2 == 0 else "table"
+        return self.layout
+
+    def report(self, company, index):
+        """
+        Report `index` of a company, newest first (index 0 is today).
+        """
+        date = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0) - timedelta(days=index)
+        report_id = f"{company.lower()}-{index:04d}"
+        kind = "Initiation" if index % 17 == 0 else "Rating Change" if index % 11 == 0 else "Update"
+        return {
+            "id": report_id,
+            "title": f"{company}: {kind} note {index + 1}",
+            "url": f"{REPORT_PATH_MARKER}{date:%Y/%m/%d}/{report_id}.html",
+            "pageCount": 3 + (index * 7) % 40,
+            "publishDate": int(date.timestamp() * 1000)
+        }
+
+    def listing(self, company, page, size):
+        total = self.pages * self.per_page
+        start = (page - 1) * size
+        results = [self.report(company, i) for i in range(max(0, start), min(total, start + size))]
+        return {
+            "company": company,
+            "layout": self.layout_for(company),
+            "page": page,
+            "totalPages": (total + size - 1) // size,
+            "results": results
+        }
+
+    # --- HTTP ---
+
+    def _handler_class(self):
+        portal = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass # keep benchmark output clean
+
+            def _send(self, status, body, content_type, extra_headers=None):
+                if isinstance(body, str):
+                    body = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (extra_headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+                with portal._lock:
+                    portal.requests += 1
+                    portal.bytes_sent += len(body)
+
+            def _page(self, title, body):
+                header = HEADER_HTML % {"companies": json.dumps(portal.tickers)}
+                self._send(200, PAGE_TEMPLATE % {"title": escape(title), "header": header, "body": body}, "text/html; charset=utf-8")
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                path = parsed.path
+                query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                if portal.latency:
+                    time.sleep(portal.latency)
+
+                if path == "/":
+                    self._page("GS Research", "<h1>Home</h1>")
+                elif path.startswith("/company/"):
+                    company = path.split("/")[2].upper()
+                    if company not in portal.tickers:
+                        return self._send(404, "Unknown company", "text/plain")
+                    self._page(company, COMPANY_BODY % {"company": company})
+                elif path == "/companies":
+                    q = query.get("q", "").upper()
+                    links = "".join(f'<div data-testid="search-item-content"><a href="/company/{c}">{c} Inc. ({c})</a></div>'
+                                    for c in portal.tickers if q in c)
+                    self._page("Search", links)
+                elif path == "/search":
+                    self._page("Results", RESULTS_BODY % {"per_page": portal.per_page})
+                elif path == "/api/reports":
+                    company = query.get("company", "").upper()
+                    page = int(query.get("page", 1))
+                    size = int(query.get("size", portal.per_page))
+                    self._send(200, json.dumps(portal.listing(company, page, size)), "application/json")
+                elif path.startswith("/static/") and path[8:] in STATIC_ASSETS:
+                    content_type, body = STATIC_ASSETS[path[8:]]
+                    self._send(200, body, content_type, {"Cache-Control": "no-store"})
+                elif path == "/api/ping":
+                    self._send(200, "{}", "application/json")
+                elif path.startswith(REPORT_PATH_MARKER):
+                    report_id = path.rsplit("/", 1)[1].replace(".html", "")
+                    self._page(report_id, REPORT_BODY % {"title": escape(report_id), "report_id": quote(report_id)})
+                elif path.startswith("/pdf/"):
+                    report_id = path.rsplit("/", 1)[1].replace(".pdf", "")
+                    try:
+                        index = int(report_id.rsplit("-", 1)[1])
+                    except (IndexError, ValueError):
+                        index = 0
+                    body = make_pdf(3 + (index * 7) % 40, portal.pdf_size)
+                    self._send(200, body, "application/pdf",
+                               {"Content-Disposition": f'attachment; filename="{report_id}.pdf"'})
+                elif path.startswith("/models/"):
+                    name = path.rsplit("/", 1)[1]
+                    self._send(200, b"PK\x03\x04" + b"0" * 20000, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                               {"Content-Disposition": f'attachment; filename="{name}"'})
+                else:
+                    self._send(404, "Not found", "text/plain")
+
+        return Handler
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a local mock of the GS publishing portal.")
+    parser.add_argument("--companies", type=int, default=5)
+    parser.add_argument("--pages", type=int, default=3, help="Result pages per company")
+    parser.add_argument("--per-page", type=int, default=10)
+    parser.add_argument("--layout", choices=["grid", "table", "mixed"], default="grid")
+    parser.add_argument("--pdf-kb", type=float, default=200)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    portal = MockPortal(args.companies, args.pages, args.per_page, args.layout, args.pdf_kb, args.latency_ms, port=args.port)
+    print(f"Mock portal on {portal.url} with companies {', '.join(portal.tickers)}")
+    try:
+        portal.server.serve_forever()
+    except KeyboardInterrupt:
+        portal.stop()
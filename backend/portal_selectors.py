@@ -0,0 +1,30 @@
+REPORT_PATH_MARKER = "/content/research/en/reports/"
+
+# --- SELECTORS (Updated based on user's Adobe Inc. report HTML) ---
+SEARCH_BOX_SELECTOR = "div[data-cy='gs-uitk-header__search__search-input'] input"
+MODEL_SECTION_SELECTOR = "react-company-model-v2[data-title='DOWNLOAD MODEL']"
+REPORT_LINK_SELECTOR = f"a[href*='{REPORT_PATH_MARKER}']"
+
+# Fallbacks for the results page's "Next" control, tried best-first by the SelectorRegistry
+NEXT_PAGE_SELECTORS = [
+    "a[data-cy='gs-uitk-pagination__nav-link-next']",
+    "a[aria-label='Goto next page']",
+    "a[aria-label='Next page']",
+    "a.SearchResults__paginationNext",
+    ".SearchResults__paginationNext",
+    "//a[contains(text(), 'Next')]",
+    "//a[contains(text(), '>')]",
+    "//a[contains(text(), '›')]",
+    "//span[contains(text(), 'Next')]/parent::a",
+    "//span[contains(text(), '>')]/parent::a"
+]
+
+# Common patterns: link ending in .pdf, or button with text "PDF" or "Download".
+# Tried best-first by the downloader's SelectorRegistry.
+PDF_SELECTORS = [
+    "a[href$='.pdf']",
+    "a[aria-label*='PDF']",
+    "button[aria-label*='PDF']",
+    "//a[contains(text(), 'PDF')]",
+    "//button[contains(text(), 'PDF')]"
+]
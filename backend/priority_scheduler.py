@@ -0,0 +1,161 @@
+import time
+import heapq
+
+# Higher ranks are downloaded first
+KIND_RANK = {"initiation": 2, "rating_change": 1}
+
+def report_priority(report):
+    """
+    Sort key for a listed report, smallest first: Initiations, then Rating Changes, then
+    everything else; within a type newer days first, then longer reports first.
+    """
+    date = report.get("date")
+    return (-KIND_RANK.get(report.get("kind"), 0), -(date.toordinal() if date else 0), -(report.get("pages") or 0))
+
+class RunBudget:
+    """
+    Time and/or byte allowance for a run (None = unlimited). The clock starts on start().
+    Checked between reports, so downloads already in flight can overshoot the byte limit slightly.
+    """
+    def __init__(self, max_seconds=None, max_bytes=None):
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+        self.started_at = None
+        self.bytes_used = 0
+
+    @classmethod
+    def from_limits(cls, max_minutes=None, max_mb=None):
+        return cls(max_seconds=max_minutes * 60 if max_minutes else None,
+                   max_bytes=int(max_mb * 1024 * 1024) if max_mb else None)
+
+    def start(self):
+        self.started_at = time.time()
+        self.bytes_used = 0
+        return self
+
+    def add_bytes(self, size):
+        self.bytes_used += size
+
+    def elapsed(self):
+        return time.time() - self.started_at if self.started_at else 0.0
+
+    def exhausted(self):
+        """
+        Reason the budget is used up, or None.
+        """
+        if self.max_seconds and self.elapsed() >= self.max_seconds:
+            return f"time limit of {round(self.max_seconds / 60, 1):g} min reached"
+        if self.max_bytes and self.bytes_used >= self.max_bytes:
+            return f"data limit of {round(self.max_bytes / 1024 / 1024, 1):g} MB reached"
+        return None
+
+class PriorityScheduler:
+    """
+    Two-phase run over many companies for time-boxed batches:
+    1. List: visit each company and collect its new reports without downloading them.
+    2. Download: fetch all collected reports from one priority queue (see report_priority),
+       so Initiations and Rating Changes across the whole batch come before routine updates.
+    Both phases stop cleanly when the RunBudget is used up or should_stop() returns True.
+    """
+    def __init__(self, downloader, log_callback=None):
+        self.downloader = downloader
+        self.log_callback = log_callback
+
+    def log(self, message):
+        if self.log_callback:
+            self.log_callback(message)
+        else:
+            self.downloader.log(message)
+
+    def run(self, companies, min_pages=1, primary_only=True, days_filter=None, budget=None, high_water=None,
+            should_stop=None, on_report=None, checkpoint_for=None):
+        """
+        high_water: callable(company) -> {"date", "report_id"} or None, optional. Enables
+            incremental listing (see download_reports), e.g. for the watchlist.
+        checkpoint_for: callable(company) -> CompanyCheckpoint, optional.
+        Returns {"companies": {company: {"listed", "downloaded", "bytes", "newest", "complete"}},
+                 "downloaded", "bytes", "left", "stopped"}. A company is complete when it was
+        fully listed and every listed report was downloaded; only then is it safe to
+        advance its high-water mark.
+        """
+        budget = budget or RunBudget()
+        if budget.started_at is None:
+            budget.start()
+        stop_reason = []
+
+        def stop():
+            if should_stop and should_stop():
+                stop_reason[:] = ["stop requested"]
+                return True
+            reason = budget.exhausted()
+            if reason:
+                stop_reason[:] = [reason]
+                return True
+            return False
+
+        # Phase 1: listing
+        summary = {}
+        queue = []
+        for company in companies:
+            if stop():
+                break
+            listed = []
+            try:
+                self.downloader.search_company(company)
+                mark = high_water(company) if high_water else None
+                result = self.downloader.download_reports(
+                    company, min_pages=min_pages, primary_only=primary_only, days_filter=days_filter,
+                    high_water=(mark or {}) if high_water else None, should_stop=stop,
+                    checkpoint=checkpoint_for(company) if checkpoint_for else None, collect=listed
+                )
+                budget.add_bytes(result["bytes"]) # model download
+                newest = result["newest"]
+                listing_complete = not stop_reason
+            except Exception as e:
+                self.log(f"Error listing reports for {company}: {e}")
+                newest, listing_complete = None, False
+            summary[company] = {"listed": len(listed), "downloaded": 0, "bytes": 0, "newest": newest,
+                                "complete": listing_complete}
+            for report in listed:
+                heapq.heappush(queue, (report_priority(report), len(queue), report))
+            kinds = [r["kind"] for r in listed]
+            self.log(f"Listed {len(listed)} new reports for {company} ({kinds.count('initiation')} initiations, "
+                     f"{kinds.count('rating_change')} rating changes).")
+
+        # Phase 2: downloads in priority order
+        total = len(queue)
+        if total:
+            self.log(f"Downloading {total} reports by priority...")
+
+        def take():
+            while queue:
+                yield heapq.heappop(queue)[2]
+
+        def counted(report, path, size):
+            budget.add_bytes(size)
+            if on_report:
+                on_report(report, path, size)
+
+        results, _ = self.downloader.fetch_reports(take(), should_stop=stop, on_report=counted, checkpoint_for=checkpoint_for)
+        downloaded = sum(r["downloaded"] for r in results.values())
+        for company, result in results.items():
+            summary[company]["downloaded"] = result["downloaded"]
+            summary[company]["bytes"] = result["bytes"]
+        for entry in summary.values():
+            entry["complete"] = entry["complete"] and entry["downloaded"] >= entry["listed"]
+
+        left = total - downloaded
+        if stop_reason:
+            self.log(f"Stopped ({stop_reason[0]}) after {budget.elapsed() / 60:.1f} min: {downloaded}/{total} reports, "
+                     f"{budget.bytes_used / 1024 / 1024:.1f} MB. {len(companies) - len(summary)} companies not listed, "
+                     f"{left} reports left for the next run.")
+        else:
+            self.log(f"Priority run finished in {budget.elapsed() / 60:.1f} min: {downloaded}/{total} reports, "
+                     f"{budget.bytes_used / 1024 / 1024:.1f} MB.")
+        return {
+            "companies": summary,
+            "downloaded": downloaded,
+            "bytes": budget.bytes_used,
+            "left": left,
+            "stopped": stop_reason[0] if stop_reason else None
+        }
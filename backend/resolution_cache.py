@@ -0,0 +1,62 @@
+import os
+import json
+import time
+import threading
+
+class CompanyPageCache:
+    """
+    Persistent map of search input (ticker or name) -> resolved company page URL.
+    Lets search_company open the page directly instead of going through the search box.
+    Entries expire after `ttl` seconds and are dropped when the cached page no longer loads.
+    """
+    def __init__(self, filepath, ttl=30 * 24 * 3600):
+        self.filepath = filepath
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(query):
+        return " ".join(query.split()).upper()
+
+    def _load(self):
+        if not os.path.exists(self.filepath):
+            return {}
+        try:
+            with open(self.filepath, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def _save(self, entries):
+        # Write then rename so parallel workers never read a half-written file
+        tmp_path = f"{self.filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, indent=4)
+        os.replace(tmp_path, self.filepath)
+
+    def get(self, query):
+        """Returns the cached URL, or None if missing or expired."""
+        with self._lock:
+            entry = self._load().get(self._key(query))
+        if not entry or time.time() - entry.get("resolved_at", 0) > self.ttl:
+            return None
+        return entry.get("url")
+
+    def set(self, query, url):
+        # Reload before writing so entries added by other workers are kept
+        with self._lock:
+            entries = self._load()
+            entries[self._key(query)] = {"url": url, "resolved_at": time.time()}
+            try:
+                self._save(entries)
+            except Exception as e:
+                print(f"Error saving company page cache: {e}")
+
+    def invalidate(self, query):
+        with self._lock:
+            entries = self._load()
+            if entries.pop(self._key(query), None) is not None:
+                try:
+                    self._save(entries)
+                except Exception as e:
+                    print(f"Error saving company page cache: {e}")
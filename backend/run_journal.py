@@ -0,0 +1,212 @@
+import json
+import uuid
+import sqlite3
+import threading
+from datetime import datetime
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+class RunJournal:
+    """
+    Durable record of batch runs: which companies are done, how many result pages
+    each one has finished, and the status of every report (queued, downloading,
+    done, failed). A run that was interrupted can be resumed from its last checkpoint.
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL") # a checkpoint is written per report
+        self.init_db()
+
+    def init_db(self):
+        with self._lock:
+            self.conn.executescript('''
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id TEXT PRIMARY KEY,
+                    options TEXT,
+                    status TEXT NOT NULL,
+                    created_at TEXT,
+                    updated_at TEXT
+                );
+                CREATE TABLE IF NOT EXISTS run_companies (
+                    run_id TEXT NOT NULL,
+                    company TEXT NOT NULL,
+                    position INTEGER,
+                    status TEXT NOT NULL,
+                    page_mode TEXT,
+                    pages_done INTEGER DEFAULT 0,
+                    error TEXT,
+                    updated_at TEXT,
+                    PRIMARY KEY (run_id, company)
+                );
+                CREATE TABLE IF NOT EXISTS run_reports (
+                    run_id TEXT NOT NULL,
+                    company TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    path TEXT,
+                    error TEXT,
+                    updated_at TEXT,
+                    PRIMARY KEY (run_id, url)
+                );
+            ''')
+            self.conn.commit()
+
+    # --- Runs ---
+
+    def create_run(self, companies, options=None):
+        run_id = uuid.uuid4().hex[:8]
+        now = _now()
+        with self._lock:
+            self.conn.execute("INSERT INTO runs VALUES (?, ?, ?, ?, ?)",
+                              (run_id, json.dumps(options or {}), "running", now, now))
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO run_companies (run_id, company, position, status, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(run_id, company, i, "queued", now) for i, company in enumerate(companies)]
+            )
+            self.conn.commit()
+        return run_id
+
+    def finish_run(self, run_id, status):
+        """
+        status: done, interrupted or failed. Only finished ("done") runs are skipped by resume.
+        """
+        with self._lock:
+            self.conn.execute("UPDATE runs SET status = ?, updated_at = ? WHERE run_id = ?", (status, _now(), run_id))
+            self.conn.commit()
+
+    def get_run(self, run_id):
+        with self._lock:
+            run = self.conn.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            if not run:
+                return None
+            companies = self.conn.execute(
+                "SELECT company, status, pages_done, error FROM run_companies WHERE run_id = ? ORDER BY position",
+                (run_id,)
+            ).fetchall()
+            reports = dict(self.conn.execute(
+                "SELECT status, COUNT(*) FROM run_reports WHERE run_id = ? GROUP BY status", (run_id,)
+            ).fetchall())
+        return {
+            "run_id": run["run_id"],
+            "status": run["status"],
+            "options": json.loads(run["options"] or "{}"),
+            "created_at": run["created_at"],
+            "updated_at": run["updated_at"],
+            "companies": [dict(row) for row in companies],
+            "reports": reports
+        }
+
+    def list_runs(self, limit=20):
+        with self._lock:
+            run_ids = [row[0] for row in self.conn.execute(
+                "SELECT run_id FROM runs ORDER BY created_at DESC, rowid DESC LIMIT ?", (limit,)
+            )]
+        return [self.get_run(run_id) for run_id in run_ids]
+
+    def latest_unfinished(self):
+        """
+        The newest run that did not complete, or None.
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT run_id FROM runs WHERE status != 'done' ORDER BY created_at DESC, rowid DESC LIMIT 1"
+            ).fetchone()
+        return row[0] if row else None
+
+    def pending_companies(self, run_id):
+        """
+        Companies of the run that still need work, in their original order.
+        Companies that were mid-flight when the run died count as pending.
+        """
+        with self._lock:
+            return [row[0] for row in self.conn.execute(
+                "SELECT company FROM run_companies WHERE run_id = ? AND status != 'done' ORDER BY position",
+                (run_id,)
+            )]
+
+    def reopen_run(self, run_id):
+        with self._lock:
+            self.conn.execute("UPDATE runs SET status = 'running', updated_at = ? WHERE run_id = ?", (_now(), run_id))
+            self.conn.commit()
+
+    # --- Companies ---
+
+    def set_company_status(self, run_id, company, status, error=None):
+        with self._lock:
+            self.conn.execute(
+                "UPDATE run_companies SET status = ?, error = ?, updated_at = ? WHERE run_id = ? AND company = ?",
+                (status, error, _now(), run_id, company)
+            )
+            self.conn.commit()
+
+    def checkpoint(self, run_id, company):
+        return CompanyCheckpoint(self, run_id, company)
+
+    def _pages_done(self, run_id, company, page_mode):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT page_mode, pages_done FROM run_companies WHERE run_id = ? AND company = ?",
+                (run_id, company)
+            ).fetchone()
+        # Page numbers from the listing API and the DOM crawl do not line up
+        if not row or row["page_mode"] != page_mode:
+            return 0
+        return row["pages_done"] or 0
+
+    def _page_done(self, run_id, company, page_mode, pages_done):
+        with self._lock:
+            self.conn.execute(
+                "UPDATE run_companies SET page_mode = ?, pages_done = ?, updated_at = ? WHERE run_id = ? AND company = ?",
+                (page_mode, pages_done, _now(), run_id, company)
+            )
+            self.conn.commit()
+
+    # --- Reports ---
+
+    def _set_report_status(self, run_id, company, url, status, path=None, error=None):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO run_reports VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (run_id, company, url, status, path, error, _now())
+            )
+            self.conn.commit()
+
+    def _report_status(self, run_id, url):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT status FROM run_reports WHERE run_id = ? AND url = ?", (run_id, url)
+            ).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+class CompanyCheckpoint:
+    """
+    The journal as seen by download_reports for one company of one run.
+    """
+    def __init__(self, journal, run_id, company):
+        self.journal = journal
+        self.run_id = run_id
+        self.company = company
+
+    def pages_done(self, page_mode):
+        """
+        Number of result pages (listing API or DOM crawl) already fully processed.
+        """
+        return self.journal._pages_done(self.run_id, self.company, page_mode)
+
+    def page_done(self, page_mode, pages_done):
+        self.journal._page_done(self.run_id, self.company, page_mode, pages_done)
+
+    def report(self, url, status, path=None, error=None):
+        self.journal._set_report_status(self.run_id, self.company, url, status, path, error)
+
+    def report_done(self, url):
+        return self.journal._report_status(self.run_id, url) == "done"
@@ -0,0 +1,369 @@
+import os
+import re
+import zlib
+import sqlite3
+import threading
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from manifest import REPORT_FILENAME_PATTERN, file_sha256, pdf_page_count
+
+try:
+    import pypdf
+except ImportError:
+    pypdf = None # falls back to the built-in extractor (uncompressed or Flate streams, simple fonts only)
+
+MAX_BODY_CHARS = 500000 # per report; keeps the index small for very long PDFs
+
+STREAM_PATTERN = re.compile(rb"<<(.*?)>>\s*stream\r?\n(.*?)\r?\nendstream", re.S)
+TEXT_BLOCK_PATTERN = re.compile(rb"\bBT\b(.*?)\bET\b", re.S)
+SHOW_TEXT_PATTERN = re.compile(rb"\[((?:\\.|[^\]\\])*)\]\s*TJ|\(((?:\\.|[^)\\])*)\)\s*(?:Tj|'|\")", re.S)
+TJ_PART_PATTERN = re.compile(rb"\(((?:\\.|[^)\\])*)\)|(-?\d+(?:\.\d+)?)")
+ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"", b"f": b"", b"(": b"(", b")": b")", b"\\": b"\\"}
+
+def _unescape(data):
+    def replace(match):
+        seq = match.group(1)
+        if seq[:1].isdigit():
+            return bytes([int(seq, 8) & 0xFF])
+        return ESCAPES.get(seq, seq)
+    return re.sub(rb"\\([0-7]{1,3}|.)", replace, data, flags=re.S)
+
+def _basic_pdf_text(path):
+    """
+    Text from the BT/ET blocks of the PDF's content streams. Good enough for
+    simple-font PDFs; CID-keyed fonts (hex strings) come out empty.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    lines = []
+    for header, stream in STREAM_PATTERN.findall(data):
+        if b"/FlateDecode" in header:
+            try:
+                stream = zlib.decompress(stream)
+            except zlib.error:
+                continue
+        elif b"/Filter" in header:
+            continue # images and other encodings
+        for block in TEXT_BLOCK_PATTERN.findall(stream):
+            for array, literal in SHOW_TEXT_PATTERN.findall(block):
+                if literal:
+                    lines.append(_unescape(literal))
+                    continue
+                # TJ arrays: large negative kerning between fragments is a word gap
+                text = b""
+                for part, kerning in TJ_PART_PATTERN.findall(array):
+                    if kerning:
+                        if float(kerning) < -200:
+                            text += b" "
+                    else:
+                        text += _unescape(part)
+                lines.append(text)
+    return b"\n".join(lines).decode("latin-1")
+
+def extract_pdf_text(path, max_chars=MAX_BODY_CHARS):
+    """
+    Returns (text, page_count) for a PDF. Runs in the indexer's worker processes,
+    so it only depends on module-level code.
+    """
+    if pypdf:
+        reader = pypdf.PdfReader(path)
+        parts = []
+        length = 0
+        for page in reader.pages:
+            text = page.extract_text() or ""
+            parts.append(text)
+            length += len(text)
+            if length >= max_chars:
+                break
+        text, page_count = "\n".join(parts), len(reader.pages)
+    else:
+        text, page_count = _basic_pdf_text(path), pdf_page_count(path)
+    text = re.sub(r"[ \t]+", " ", text)
+    return text[:max_chars], page_count
+
+def _flags(filename, title):
+    initiation = filename.startswith("A_Initiation_") or "Initiation" in (title or "")
+    rating_change = filename.startswith("A_Rating_") or "Rating Change" in (title or "")
+    return initiation, rating_change
+
+def _fts_query(query):
+    # Plain words, each quoted, for input that is not valid FTS5 syntax (e.g. "S&P 500 (US)")
+    terms = re.findall(r"\w+", query)
+    return " ".join(f'"{t}"' for t in terms)
+
+class SearchIndex:
+    """
+    Full-text index (SQLite FTS5) over the report PDFs under <downloads>/<company>/.
+    Covers title, company, date, the Initiation/Rating Change flags and the body text.
+    Updates are incremental: files whose mtime and size are unchanged are skipped, a
+    changed file is only re-extracted if its SHA-256 changed, and copies of the same
+    report (hardlinks from the blob store) reuse the text extracted once.
+    Text is extracted in a process pool; pypdf is used when installed.
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._update_lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.init_db()
+
+    def init_db(self):
+        with self._lock:
+            self.conn.executescript('''
+                CREATE TABLE IF NOT EXISTS documents (
+                    id INTEGER PRIMARY KEY,
+                    path TEXT UNIQUE NOT NULL,
+                    company TEXT,
+                    title TEXT,
+                    url TEXT,
+                    report_date TEXT,
+                    initiation INTEGER DEFAULT 0,
+                    rating_change INTEGER DEFAULT 0,
+                    page_count INTEGER,
+                    size INTEGER,
+                    mtime REAL,
+                    sha256 TEXT,
+                    indexed_at TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_documents_sha ON documents (sha256);
+                CREATE INDEX IF NOT EXISTS idx_documents_company ON documents (company, report_date);
+                CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+                    title, company, flags, body, tokenize = 'porter unicode61'
+                );
+            ''')
+            self.conn.commit()
+
+    # --- Indexing ---
+
+    def update(self, downloads_root, manifest=None, workers=None, log=print):
+        """
+        Brings the index in line with the PDFs on disk. Metadata (title, URL, date) comes
+        from the download manifest when given, else from the file name.
+        Returns {"indexed", "unchanged", "removed", "failed"}.
+        """
+        downloads_root = os.path.abspath(downloads_root)
+        stats = {"indexed": 0, "unchanged": 0, "removed": 0, "failed": 0}
+        with self._update_lock:
+            entries = manifest.entries() if manifest else {}
+            with self._lock:
+                known = {row["path"]: row for row in self.conn.execute("SELECT id, path, size, mtime, sha256 FROM documents")}
+
+            seen = set()
+            pending = {} # sha256 -> [document, ...] waiting for text extraction
+            for company in sorted(os.listdir(downloads_root)) if os.path.isdir(downloads_root) else []:
+                company_dir = os.path.join(downloads_root, company)
+                if company.startswith(".") or not os.path.isdir(company_dir):
+                    continue
+                for filename in os.listdir(company_dir):
+                    if not filename.lower().endswith(".pdf"):
+                        continue
+                    path = os.path.join(company_dir, filename)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    seen.add(path)
+                    row = known.get(path)
+                    if row and row["mtime"] == stat.st_mtime and row["size"] == stat.st_size:
+                        stats["unchanged"] += 1
+                        continue
+
+                    try:
+                        sha256 = file_sha256(path)
+                    except OSError as e:
+                        log(f"Could not read {path}: {e}")
+                        stats["failed"] += 1
+                        continue
+                    if row and row["sha256"] == sha256:
+                        # Touched but not changed
+                        with self._lock:
+                            self.conn.execute("UPDATE documents SET size = ?, mtime = ? WHERE id = ?",
+                                              (stat.st_size, stat.st_mtime, row["id"]))
+                            self.conn.commit()
+                        stats["unchanged"] += 1
+                        continue
+
+                    entry = entries.get(path, {})
+                    match = REPORT_FILENAME_PATTERN.match(os.path.splitext(filename)[0])
+                    title = entry.get("title") or (match.group(1) if match else os.path.splitext(filename)[0])
+                    initiation, rating_change = _flags(filename, title)
+                    document = {
+                        "path": path, "company": entry.get("company") or company, "title": title,
+                        "url": entry.get("url"), "report_date": entry.get("report_date"),
+                        "initiation": int(initiation), "rating_change": int(rating_change),
+                        "page_count": entry.get("page_count"), "size": stat.st_size,
+                        "mtime": stat.st_mtime, "sha256": sha256
+                    }
+                    body = self._indexed_text(sha256)
+                    if body is not None:
+                        self._store(document, body)
+                        stats["indexed"] += 1
+                    else:
+                        pending.setdefault(sha256, []).append(document)
+
+            for path in set(known) - seen:
+                self._remove(known[path]["id"])
+                stats["removed"] += 1
+
+            if pending:
+                log(f"Extracting text from {len(pending)} PDFs...")
+                for documents, body, page_count, error in self._extract(pending, workers):
+                    if error:
+                        log(f"Could not extract text from {os.path.basename(documents[0]['path'])}: {error}")
+                        stats["failed"] += 1
+                    for document in documents:
+                        document["page_count"] = document["page_count"] or page_count
+                        # Stored even without text so title/company search still finds it
+                        self._store(document, body)
+                        stats["indexed"] += 1
+
+        log(f"Search index updated: {stats['indexed']} indexed, {stats['unchanged']} unchanged, "
+            f"{stats['removed']} removed, {stats['failed']} failed.")
+        return stats
+
+    def _extract(self, pending, workers):
+        """
+        Yields (documents, text, page_count, error) per distinct file content.
+        """
+        done = set()
+        try:
+            # spawn: the API and app processes run browser threads, which fork does not mix well with
+            with ProcessPoolExecutor(max_workers=workers or min(4, os.cpu_count() or 1),
+                                     mp_context=multiprocessing.get_context("spawn")) as pool:
+                futures = {pool.submit(extract_pdf_text, documents[0]["path"]): sha256
+                           for sha256, documents in pending.items()}
+                for future in as_completed(futures):
+                    sha256 = futures[future]
+                    try:
+                        text, page_count = future.result()
+                        result = (text, page_count, None)
+                    except BrokenProcessPool:
+                        raise
+                    except Exception as e:
+                        result = ("", None, e)
+                    yield (pending[sha256],) + result
+                    done.add(sha256)
+        except (BrokenProcessPool, OSError) as e:
+            # No worker processes available (e.g. sandboxed host): extract the rest in this process
+            print(f"Process pool unavailable ({e}), extracting text in-process.")
+            for sha256, documents in pending.items():
+                if sha256 in done:
+                    continue
+                try:
+                    text, page_count = extract_pdf_text(documents[0]["path"])
+                    yield documents, text, page_count, None
+                except Exception as ex:
+                    yield documents, "", None, ex
+
+    def _indexed_text(self, sha256):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT f.body FROM documents d JOIN documents_fts f ON f.rowid = d.id WHERE d.sha256 = ? LIMIT 1",
+                (sha256,)
+            ).fetchone()
+        return row["body"] if row else None
+
+    def _store(self, document, body):
+        flags = " ".join(name for name in ("initiation", "rating_change") if document[name])
+        with self._lock:
+            row = self.conn.execute("SELECT id FROM documents WHERE path = ?", (document["path"],)).fetchone()
+            if row:
+                self.conn.execute("DELETE FROM documents_fts WHERE rowid = ?", (row["id"],))
+                self.conn.execute("DELETE FROM documents WHERE id = ?", (row["id"],))
+            cursor = self.conn.execute(
+                "INSERT INTO documents (path, company, title, url, report_date, initiation, rating_change, "
+                "page_count, size, mtime, sha256, indexed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (document["path"], document["company"], document["title"], document["url"], document["report_date"],
+                 document["initiation"], document["rating_change"], document["page_count"], document["size"],
+                 document["mtime"], document["sha256"], datetime.now().isoformat(timespec="seconds"))
+            )
+            self.conn.execute("INSERT INTO documents_fts (rowid, title, company, flags, body) VALUES (?, ?, ?, ?, ?)",
+                              (cursor.lastrowid, document["title"], document["company"], flags, body or ""))
+            self.conn.commit()
+
+    def _remove(self, document_id):
+        with self._lock:
+            self.conn.execute("DELETE FROM documents_fts WHERE rowid = ?", (document_id,))
+            self.conn.execute("DELETE FROM documents WHERE id = ?", (document_id,))
+            self.conn.commit()
+
+    # --- Search ---
+
+    def search(self, query="", company=None, date_from=None, date_to=None, initiation=None, rating_change=None,
+               limit=20, offset=0):
+        """
+        Ranked matches for an FTS5 query (e.g. `margin AND guidance`, `"free cash flow"`, `semi*`).
+        Title and company matches rank above body matches. An empty query lists the
+        filtered reports, newest first. Dates are ISO strings (YYYY-MM-DD).
+        """
+        filters, params = [], []
+        if company:
+            filters.append("d.company = ? COLLATE NOCASE")
+            params.append(company)
+        if date_from:
+            filters.append("d.report_date >= ?")
+            params.append(date_from)
+        if date_to:
+            filters.append("d.report_date <= ?")
+            params.append(date_to)
+        if initiation is not None:
+            filters.append("d.initiation = ?")
+            params.append(int(initiation))
+        if rating_change is not None:
+            filters.append("d.rating_change = ?")
+            params.append(int(rating_change))
+
+        columns = ("d.path, d.company, d.title, d.url, d.report_date, d.initiation, d.rating_change, "
+                   "d.page_count, d.size")
+        query = (query or "").strip()
+        if not query:
+            where = f"WHERE {' AND '.join(filters)}" if filters else ""
+            sql = (f"SELECT {columns}, NULL AS snippet, NULL AS rank FROM documents d {where} "
+                   f"ORDER BY d.report_date IS NULL, d.report_date DESC, d.id DESC LIMIT ? OFFSET ?")
+            return self._rows(sql, params + [limit, offset])
+
+        where = " AND ".join(["documents_fts MATCH ?"] + filters)
+        sql = (f"SELECT {columns}, snippet(documents_fts, 3, '[', ']', ' ... ', 16) AS snippet, "
+               f"bm25(documents_fts, 10.0, 5.0, 2.0, 1.0) AS rank "
+               f"FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid "
+               f"WHERE {where} ORDER BY rank LIMIT ? OFFSET ?")
+        try:
+            return self._rows(sql, [query] + params + [limit, offset])
+        except sqlite3.OperationalError:
+            fallback = _fts_query(query)
+            if not fallback:
+                return []
+            return self._rows(sql, [fallback] + params + [limit, offset])
+
+    def _rows(self, sql, params):
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        results = []
+        for row in rows:
+            result = dict(row)
+            result["initiation"] = bool(result["initiation"])
+            result["rating_change"] = bool(result["rating_change"])
+            if result["rank"] is not None:
+                result["rank"] = round(result["rank"], 3)
+            results.append(result)
+        return results
+
+    def companies(self):
+        with self._lock:
+            return [row[0] for row in self.conn.execute("SELECT DISTINCT company FROM documents ORDER BY company")]
+
+    def stats(self):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT COUNT(*) AS documents, COUNT(DISTINCT company) AS companies, "
+                "COUNT(DISTINCT sha256) AS unique_files, MAX(indexed_at) AS last_indexed FROM documents"
+            ).fetchone()
+        return dict(row)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
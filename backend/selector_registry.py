@@ -0,0 +1,118 @@
+import os
+import json
+import threading
+
+# Checks the selectors in the given order in one round trip and returns [element, index]
+# of the first match (optionally only visible, enabled elements), or null.
+FIND_SCRIPT = r"""
+const [selectors, visibleOnly] = arguments;
+for (let i = 0; i < selectors.length; i++) {
+    const sel = selectors[i];
+    let els = [];
+    try {
+        if (sel.startsWith("//")) {
+            const snap = document.evaluate(sel, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            for (let j = 0; j < snap.snapshotLength; j++) els.push(snap.snapshotItem(j));
+        } else {
+            els = document.querySelectorAll(sel);
+        }
+    } catch (e) {
+        continue;
+    }
+    for (const el of els) {
+        if (!visibleOnly) return [el, i];
+        const disabled = el.getAttribute("aria-disabled") === "true" || (el.getAttribute("class") || "").includes("disabled");
+        if (!disabled && el.getClientRects().length && getComputedStyle(el).visibility !== "hidden") return [el, i];
+    }
+}
+return null;
+"""
+
+class SelectorRegistry:
+    """
+    Remembers which of several fallback selectors matched, per purpose and site layout
+    (e.g. "next_page" in the "grid" view), and tries the best one first next time.
+    Each selector keeps a decaying score (+1 per hit), so after a portal redesign the new
+    winner overtakes the old one within a few pages. Lookups are a single script call
+    over the ranked list (see FIND_SCRIPT). Rankings persist in a JSON file between runs.
+    """
+    def __init__(self, filepath=None, decay=0.9):
+        self.filepath = filepath
+        self.decay = decay
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.stats = self._load() # "purpose:layout" -> {selector: {"hits", "misses", "score"}}
+
+    def _load(self):
+        if not self.filepath or not os.path.exists(self.filepath):
+            return {}
+        try:
+            with open(self.filepath, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def save(self):
+        """
+        Writes the rankings if anything changed since the last save.
+        """
+        if not self.filepath:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(self.stats, indent=4)
+            self._dirty = False
+        # Write then rename so parallel workers never read a half-written file
+        tmp_path = f"{self.filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.filepath)
+        except Exception as e:
+            print(f"Error saving selector rankings: {e}")
+
+    def ordered(self, purpose, layout, selectors):
+        """
+        The selectors best-first: by score, ties (e.g. never seen) in the given order.
+        """
+        with self._lock:
+            known = self.stats.get(f"{purpose}:{layout}", {})
+            scores = {sel: known.get(sel, {}).get("score", 0.0) for sel in selectors}
+        return sorted(selectors, key=lambda sel: -scores[sel])
+
+    def record(self, purpose, layout, tried, winner):
+        """
+        Counts a hit for `winner` and a miss for every selector tried before it.
+        """
+        with self._lock:
+            entries = self.stats.setdefault(f"{purpose}:{layout}", {})
+            for sel in tried:
+                entry = entries.setdefault(sel, {"hits": 0, "misses": 0, "score": 0.0})
+                entry["score"] = round(entry["score"] * self.decay, 4)
+                if sel == winner:
+                    entry["hits"] += 1
+                    entry["score"] += 1
+                    break
+                entry["misses"] += 1
+            self._dirty = True
+
+    def find(self, driver, purpose, layout, selectors, visible=False, guard=None):
+        """
+        Returns (element, selector) for the first match in ranked order, or None.
+        visible: skip hidden or disabled elements. guard: JS expression; while it is true
+        the page counts as not ready and nothing is matched.
+        Nothing is recorded when no selector matches (the page may still be loading, or
+        there is legitimately no such control, e.g. on the last results page).
+        """
+        ranked = self.ordered(purpose, layout, selectors)
+        script = (f"if ({guard}) return null;\n" if guard else "") + FIND_SCRIPT
+        try:
+            found = driver.execute_script(script, ranked, visible)
+        except Exception:
+            return None
+        if not found:
+            return None
+        element, index = found[0], int(found[1])
+        self.record(purpose, layout, ranked[:index + 1], ranked[index])
+        return element, ranked[index]
@@ -0,0 +1,86 @@
+import os
+import re
+import json
+import time
+import threading
+
+# Machine-wide state shared by all app users: Chrome profiles, saved cookies, pinned driver path
+DEFAULT_SESSION_DIR = os.environ.get("GS_SESSION_DIR", os.path.join(os.path.expanduser("~"), ".gs_research_bot"))
+
+_driver_lock = threading.Lock()
+
+def _write_json(path, data, mode=0o600):
+    # Write then rename, readable only by us (cookies are login credentials)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=4)
+    os.replace(tmp_path, path)
+
+def chromedriver_path(session_dir=DEFAULT_SESSION_DIR, refresh=False):
+    """
+    Returns a chromedriver executable path, pinned in <session_dir>/chromedriver.json.
+    Only the first start (or refresh=True, e.g. after a Chrome update) asks
+    webdriver_manager, which may hit the network. Returns None if no driver could be found,
+    in which case Selenium's own lookup is used.
+    """
+    cache_file = os.path.join(session_dir, "chromedriver.json")
+    with _driver_lock:
+        if not refresh and os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    path = json.load(f).get("path")
+                if path and os.access(path, os.X_OK):
+                    return path
+            except Exception:
+                pass
+
+        try:
+            from webdriver_manager.chrome import ChromeDriverManager
+            path = ChromeDriverManager().install()
+        except Exception:
+            return None
+        try:
+            os.makedirs(session_dir, exist_ok=True)
+            _write_json(cache_file, {"path": path, "resolved_at": time.time()}, mode=0o644)
+        except Exception as e:
+            print(f"Error saving chromedriver path: {e}")
+        return path
+
+class SessionStore:
+    """
+    Per-user browser state that survives restarts: a Chrome user-data-dir and a
+    JSON copy of the session cookies. With both, a relaunched browser is usually
+    still logged in, so the manual login is only needed when the session expires.
+    """
+    def __init__(self, user="default", session_dir=DEFAULT_SESSION_DIR):
+        self.user = user or "default"
+        self.session_dir = session_dir
+        safe_user = re.sub(r"[^A-Za-z0-9_.-]", "_", self.user)
+        self.profile_dir = os.path.join(session_dir, "profiles", safe_user)
+        self.cookies_path = os.path.join(session_dir, f"cookies_{safe_user}.json")
+        os.makedirs(self.profile_dir, exist_ok=True)
+
+    def save_cookies(self, cookies):
+        try:
+            _write_json(self.cookies_path, {"saved_at": time.time(), "cookies": cookies})
+        except Exception as e:
+            print(f"Error saving session cookies: {e}")
+
+    def load_cookies(self):
+        """
+        Returns the saved cookies that have not expired yet (empty list if none).
+        """
+        if not os.path.exists(self.cookies_path):
+            return []
+        try:
+            with open(self.cookies_path, 'r', encoding='utf-8') as f:
+                cookies = json.load(f).get("cookies", [])
+        except Exception:
+            return []
+        now = time.time()
+        return [c for c in cookies if not c.get("expiry") or c["expiry"] > now]
+
+    def clear(self):
+        if os.path.exists(self.cookies_path):
+            os.remove(self.cookies_path)
@@ -0,0 +1,270 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from supabase_client import SupabaseHelper
+
+_pool = {}
+_pool_lock = threading.Lock()
+_stores = {}
+_stores_lock = threading.Lock()
+
+class SharedConnection:
+    """
+    One long-lived SQLite connection (WAL) per database file, shared by every session and
+    thread in the process. SQLite serializes writers anyway, so a lock around a single
+    connection is cheaper than opening a new one per call.
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Yields the connection; commits on success, rolls back on error.
+        """
+        with self.lock:
+            try:
+                yield self.conn
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+
+def get_connection(db_path):
+    """
+    Returns the process-wide SharedConnection for db_path, opening it on first use.
+    """
+    key = os.path.abspath(db_path)
+    with _pool_lock:
+        if key not in _pool:
+            _pool[key] = SharedConnection(key)
+        return _pool[key]
+
+class ReadThroughCache:
+    """
+    Small TTL cache: get(key, loader) returns the cached value or calls loader() and keeps
+    the result for `ttl` seconds. Writers call invalidate() so readers never see stale data
+    from this process.
+    """
+    def __init__(self, ttl=300, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = {} # key -> (expires_at, value)
+
+    def get(self, key, loader):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                return entry[1]
+        value = loader()
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries = {k: e for k, e in self._entries.items() if e[0] > now}
+            self._entries[key] = (now + self.ttl, value)
+        return value
+
+    def invalidate(self, key=None):
+        """
+        Drops one key, every key of a tuple-keyed group (e.g. ("watchlist",)), or everything.
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            elif isinstance(key, tuple):
+                for k in [k for k in self._entries if k[:len(key)] == key]:
+                    del self._entries[k]
+            else:
+                self._entries.pop(key, None)
+
+class Storage:
+    """
+    Users and watchlists in Supabase, or locally when Supabase is not configured (users in
+    a SQLite file, each watchlist in its own JSON file). Supabase reads go through a
+    short-lived cache. A multi-ticker change is one request: one upsert/delete call in
+    Supabase, one file write locally.
+    Use get_storage() to share one instance, and its cache, across the process.
+    """
+    def __init__(self, use_supabase=True, db_path="users.db", cache_ttl=300):
+        self.use_supabase = use_supabase
+        self.supabase = None
+        self.cache = ReadThroughCache(ttl=cache_ttl)
+        # Serializes read-modify-write of local watchlist files
+        self._local_lock = threading.Lock()
+
+        if self.use_supabase:
+            try:
+                self.supabase = SupabaseHelper.get_client()
+            except Exception:
+                # Fallback to local SQLite if Supabase not configured
+                self.use_supabase = False
+
+        if not self.use_supabase:
+            self.db_path = db_path
+            self.db = get_connection(db_path)
+            self.init_local_db()
+
+    def init_local_db(self):
+        with self.db.transaction() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                    username TEXT PRIMARY KEY,
+                    password_hash TEXT NOT NULL,
+                    download_path TEXT
+                )
+            ''')
+            # Migration: Add download_path column if it doesn't exist
+            try:
+                conn.execute("ALTER TABLE users ADD COLUMN download_path TEXT")
+            except sqlite3.OperationalError:
+                pass # Column likely already exists
+
+    def invalidate(self, username=None):
+        """
+        Forgets cached settings and watchlist of one user (or of everyone), e.g. after
+        another process or the Supabase dashboard changed them.
+        """
+        if username is None:
+            self.cache.invalidate()
+        else:
+            self.cache.invalidate(("user", username))
+            self.cache.invalidate(("watchlist", username))
+
+    # --- Users ---
+
+    def get_user(self, username):
+        """
+        Returns {"username", "password_hash", "download_path"} or None. Cached.
+        """
+        return self.cache.get(("user", username), lambda: self._load_user(username))
+
+    def _load_user(self, username):
+        if self.use_supabase:
+            response = self.supabase.table("users").select("username, password_hash, download_path").eq("username", username).execute()
+            return response.data[0] if response.data else None
+        rows = self.db.query("SELECT username, password_hash, download_path FROM users WHERE username = ?", (username,))
+        if not rows:
+            return None
+        return {"username": rows[0][0], "password_hash": rows[0][1], "download_path": rows[0][2]}
+
+    def create_user(self, username, password_hash):
+        """
+        Raises sqlite3.IntegrityError (local) or the Supabase error if the user exists.
+        """
+        try:
+            if self.use_supabase:
+                self.supabase.table("users").insert({"username": username, "password_hash": password_hash}).execute()
+            else:
+                with self.db.transaction() as conn:
+                    conn.execute("INSERT INTO users (username, password_hash) VALUES (?, ?)", (username, password_hash))
+        finally:
+            self.cache.invalidate(("user", username))
+
+    def update_user(self, username, **fields):
+        try:
+            if self.use_supabase:
+                self.supabase.table("users").update(fields).eq("username", username).execute()
+            else:
+                columns = ", ".join(f"{name} = ?" for name in fields)
+                with self.db.transaction() as conn:
+                    conn.execute(f"UPDATE users SET {columns} WHERE username = ?", (*fields.values(), username))
+        finally:
+            self.cache.invalidate(("user", username))
+
+    # --- Watchlists ---
+
+    def get_watchlist(self, username, local_path=None):
+        """
+        The user's tickers in the order they were added. Cached for Supabase.
+        local_path: the JSON file holding the watchlist when Supabase is not configured or
+        there is no user. It is read on every call, so edits made to the file outside the
+        app show up immediately.
+        """
+        if not self._cloud(username):
+            return self._read_local(local_path)
+        return list(self.cache.get(("watchlist", username), lambda: self._load_watchlist(username)))
+
+    def _cloud(self, username):
+        # Supabase watchlists belong to a user; without one the local file is used
+        return self.use_supabase and bool(username)
+
+    def _load_watchlist(self, username):
+        response = self.supabase.table("watchlists").select("ticker").eq("username", username).execute()
+        return [item["ticker"] for item in response.data or []]
+
+    def _read_local(self, path):
+        if not path or not os.path.exists(path):
+            return []
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return []
+
+    def _write_local(self, path, tickers):
+        # Write then rename so a reader never sees a half-written file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(tickers, f, indent=4)
+        os.replace(tmp_path, path)
+
+    def add_tickers(self, username, tickers, local_path=None):
+        """
+        Adds the tickers the user does not have yet in one request (one batch insert in
+        Supabase, one file write locally). Returns the ones added.
+        """
+        with self._local_lock:
+            current = self.get_watchlist(username, local_path)
+            new = []
+            for ticker in tickers:
+                if ticker and ticker not in current and ticker not in new:
+                    new.append(ticker)
+            if not new:
+                return []
+            if not self._cloud(username):
+                self._write_local(local_path, current + new)
+                return new
+        try:
+            self.supabase.table("watchlists").insert([{"username": username, "ticker": t} for t in new]).execute()
+        finally:
+            self.cache.invalidate(("watchlist", username))
+        return new
+
+    def remove_tickers(self, username, tickers, local_path=None):
+        """
+        Removes the given tickers in one request. Returns the ones that were on the list.
+        """
+        with self._local_lock:
+            current = self.get_watchlist(username, local_path)
+            gone = [t for t in dict.fromkeys(tickers) if t in current]
+            if not gone:
+                return []
+            if not self._cloud(username):
+                self._write_local(local_path, [t for t in current if t not in gone])
+                return gone
+        try:
+            self.supabase.table("watchlists").delete().eq("username", username).in_("ticker", gone).execute()
+        finally:
+            self.cache.invalidate(("watchlist", username))
+        return gone
+
+def get_storage(use_supabase=True):
+    """
+    Process-wide Storage, so every session shares the same connections and cache.
+    """
+    with _stores_lock:
+        if use_supabase not in _stores:
+            _stores[use_supabase] = Storage(use_supabase=use_supabase)
+        return _stores[use_supabase]
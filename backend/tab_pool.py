@@ -0,0 +1,151 @@
+import os
+import time
+from portal_selectors import PDF_SELECTORS
+
+# Sets a marker on the tab's current document, then navigates. Until the new
+# document replaces it, the marker tells the PDF lookup it is still the old page.
+NAVIGATE_SCRIPT = "window.__gsTabPending = true; window.location.href = arguments[0];"
+PENDING_GUARD = "window.__gsTabPending"
+
+class ReportTabPool:
+    """
+    Downloads reports through up to `size` reusable tabs of one logged-in browser.
+    Report pages load in parallel in background tabs; a round-robin loop switches only
+    to tabs that are still waiting for their PDF control and clicks it. Each click is
+    held until its file shows up in the staging folder (DownloadTracker hands files to
+    tickets in click order), after which the downloads run concurrently.
+    """
+    def __init__(self, downloader, size=3, poll_interval=0.1, start_timeout=30, finish_timeout=300):
+        self.downloader = downloader
+        self.size = size
+        self.poll_interval = poll_interval
+        self.start_timeout = start_timeout
+        self.finish_timeout = finish_timeout
+
+    def log(self, message):
+        self.downloader.log(message)
+
+    def run(self, entries, on_done):
+        """
+        entries: list of (report, target_dir). on_done(report, path) is called once per
+        entry, with path None if the download failed.
+        """
+        queue = list(entries)
+        if not queue:
+            return
+        downloader = self.downloader
+        try:
+            downloader.supervisor.before_report()
+        except Exception as e:
+            self.log(f"Browser health check failed: {e}")
+        driver = downloader.driver
+        page_timeout = downloader.waits.timeouts.get("report_page", 10)
+        original_window = driver.current_window_handle
+        tabs = []
+        try:
+            for _ in range(min(self.size, len(queue))):
+                driver.switch_to.new_window("tab")
+                downloader.crawl_profile.apply(driver)
+                tabs.append({"handle": driver.current_window_handle, "state": "idle"})
+            self.log(f"Downloading {len(queue)} reports through {len(tabs)} browser tabs...")
+
+            while queue or any(tab["state"] != "idle" for tab in tabs):
+                progressed = False
+                for tab in tabs:
+                    if tab["state"] == "idle":
+                        if queue:
+                            self._load(tab, queue.pop(0), on_done)
+                            progressed = True
+                    elif tab["state"] == "loading":
+                        progressed |= self._try_click(tab, page_timeout, on_done)
+                    elif tab["state"] == "downloading":
+                        progressed |= self._try_finish(tab, on_done)
+                if not progressed:
+                    time.sleep(self.poll_interval)
+        finally:
+            for tab in tabs:
+                if tab["state"] != "idle":
+                    # Only reached if the loop itself failed
+                    if tab.get("ticket"):
+                        tab["ticket"].cancel()
+                    on_done(tab["report"], None)
+                try:
+                    driver.switch_to.window(tab["handle"])
+                    driver.close()
+                except Exception:
+                    pass
+            try:
+                driver.switch_to.window(original_window)
+            except Exception:
+                pass
+
+    def _load(self, tab, entry, on_done):
+        report, target_dir = entry
+        tab.update(report=report, target_dir=target_dir, ticket=None, started_at=time.perf_counter())
+        try:
+            self.downloader.driver.switch_to.window(tab["handle"])
+            self.downloader.driver.execute_script(NAVIGATE_SCRIPT, report["url"])
+            tab["state"] = "loading"
+        except Exception as e:
+            self.log(f"Error accessing report page: {e}")
+            self._done(tab, None, on_done)
+
+    def _try_click(self, tab, page_timeout, on_done):
+        """
+        Clicks the PDF control once the tab's report page shows one. Returns True if the tab moved on.
+        """
+        driver = self.downloader.driver
+        report = tab["report"]
+        try:
+            driver.switch_to.window(tab["handle"])
+        except Exception as e:
+            self.log(f"Error accessing report page: {e}")
+            self._done(tab, None, on_done)
+            return True
+        # One round trip per poll; nothing while the previous report is still showing
+        found = self.downloader.selectors.find(driver, "pdf_link", "report_page", PDF_SELECTORS, guard=PENDING_GUARD)
+        if not found:
+            if time.perf_counter() - tab["started_at"] > page_timeout:
+                self.log(f"No PDF link found for report: {report['title']}")
+                self._done(tab, None, on_done)
+                return True
+            return False
+
+        ticket = self.downloader.downloads.expect()
+        try:
+            found[0].click()
+        except Exception as e:
+            ticket.cancel()
+            self.log(f"Failed to download via click: {e}")
+            self._done(tab, None, on_done)
+            return True
+        # Next click waits until this file exists, so the tracker cannot mix them up
+        if not ticket.started.wait(self.start_timeout):
+            ticket.cancel()
+            self.log("Timeout: No new file detected.")
+            self._done(tab, None, on_done)
+            return True
+        tab.update(state="downloading", ticket=ticket, clicked_at=time.perf_counter())
+        return True
+
+    def _try_finish(self, tab, on_done):
+        ticket = tab["ticket"]
+        if ticket.finished.is_set():
+            prefix = self.downloader._report_filename(tab["report"]["prefix"], tab["report"]["title"])
+            path = self.downloader.wait_and_organize_download(ticket, tab["target_dir"], prefix)
+            self._done(tab, path, on_done)
+            return True
+        if time.perf_counter() - tab["clicked_at"] > self.finish_timeout:
+            ticket.cancel()
+            self.log("Timeout: Download did not finish.")
+            self._done(tab, None, on_done)
+            return True
+        return False
+
+    def _done(self, tab, path, on_done):
+        report = tab["report"]
+        self.downloader.metrics.observe("report_tab", time.perf_counter() - tab["started_at"], error=not path)
+        tab.update(state="idle", ticket=None)
+        if path:
+            self.log(f"Downloaded in tab: {os.path.basename(path)}")
+        on_done(report, path)
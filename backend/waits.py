@@ -0,0 +1,178 @@
+import time
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+
+# Upper bound (seconds) for each waiting step. Every step returns as soon as its
+# condition holds, so these only matter when the page is slow or never gets there.
+DEFAULT_TIMEOUTS = {
+    "search_dropdown": 2,     # suggestions after typing into the search box
+    "search_navigation": 10,  # company page / results after pressing Enter
+    "result_navigation": 10,  # company page after clicking a search result
+    "cached_page": 10,        # company page opened straight from the resolution cache
+    "view_more": 10,          # results page after clicking "View More"
+    "next_page": 15,          # new results after clicking "Next"
+    "primary_tab": 5,         # report list after switching to "Primary"
+    "report_page": 10,        # PDF link on a freshly opened report tab
+    "login_check": 5,         # search box visible when the restored session is still logged in
+}
+
+# The fixed time.sleep() each step used to cost. Only used for the savings report.
+LEGACY_SLEEPS = {
+    "search_dropdown": 2,
+    "search_navigation": 5,
+    "result_navigation": 5,
+    "cached_page": 7, # replaces the 2s + 5s search
+    "view_more": 5,
+    "next_page": 6, # 1s after scrolling + 5s render buffer
+    "primary_tab": 3,
+    "report_page": 3,
+    "login_check": 0, # used to be a manual login
+}
+
+class NetworkIdle:
+    """
+    Condition that holds once the page has stopped fetching resources for `quiet` seconds.
+    Uses the Resource Timing API, so it also sees XHR/fetch calls made by the front end.
+    """
+    SCRIPT = """
+        if (!window.__gsBufferRaised) {
+            performance.setResourceTimingBufferSize(100000);
+            window.__gsBufferRaised = true;
+        }
+        return [document.readyState, performance.getEntriesByType('resource').length];
+    """
+
+    def __init__(self, quiet=0.5):
+        self.quiet = quiet
+        self.last_count = None
+        self.changed_at = time.time()
+
+    def __call__(self, driver):
+        ready_state, count = driver.execute_script(self.SCRIPT)
+        if ready_state != "complete":
+            self.last_count = None
+            return False
+        if count != self.last_count:
+            self.last_count = count
+            self.changed_at = time.time()
+            return False
+        return time.time() - self.changed_at >= self.quiet
+
+class SmartWaiter:
+    """
+    Event-driven replacement for fixed sleeps: each step polls its condition and
+    returns the moment the DOM, URL or network is ready.
+    Keeps per-step statistics so we can report the time saved against the old sleeps.
+    """
+    def __init__(self, driver, timeouts=None, poll_frequency=0.1, metrics=None):
+        self.driver = driver
+        self.metrics = metrics # optional metrics.Metrics; wait time is added to "wait_seconds"
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.poll_frequency = poll_frequency
+        self.stats = {} # step -> {"count", "waited", "timeouts"}
+
+    def until(self, step, condition, timeout=None):
+        """
+        Waits for condition(driver) to be truthy. Returns the condition's value,
+        or False if the step timed out.
+        """
+        if timeout is None:
+            timeout = self.timeouts.get(step, 10)
+        start = time.time()
+        result = False
+        timed_out = False
+        try:
+            result = WebDriverWait(self.driver, timeout, poll_frequency=self.poll_frequency).until(condition)
+        except TimeoutException:
+            timed_out = True
+        finally:
+            self._record(step, time.time() - start, timed_out)
+        return result
+
+    def _record(self, step, elapsed, timed_out):
+        entry = self.stats.setdefault(step, {"count": 0, "waited": 0.0, "timeouts": 0})
+        entry["count"] += 1
+        entry["waited"] += elapsed
+        if timed_out:
+            entry["timeouts"] += 1
+        if self.metrics:
+            self.metrics.incr("wait_seconds", elapsed, step=step)
+            if timed_out:
+                self.metrics.incr("wait_timeouts", step=step)
+
+    # --- Conditions ---
+
+    @staticmethod
+    def document_ready(driver):
+        return driver.execute_script("return document.readyState") == "complete"
+
+    @staticmethod
+    def url_changed(old_url):
+        return lambda d: d.current_url != old_url
+
+    @staticmethod
+    def any_present(*locators):
+        """
+        Holds when any of the (By, selector) locators matches at least one element.
+        """
+        def _condition(driver):
+            for by, selector in locators:
+                if driver.find_elements(by, selector):
+                    return True
+            return False
+        return _condition
+
+    @staticmethod
+    def any_of(*conditions):
+        def _condition(driver):
+            for condition in conditions:
+                if condition(driver):
+                    return True
+            return False
+        return _condition
+
+    @staticmethod
+    def all_of(*conditions):
+        def _condition(driver):
+            return all(condition(driver) for condition in conditions)
+        return _condition
+
+    @staticmethod
+    def network_idle(quiet=0.5):
+        return NetworkIdle(quiet)
+
+    @staticmethod
+    def results_present(driver):
+        return len(driver.find_elements(By.CSS_SELECTOR, "div[data-testid='search-item-content']")) > 0 or \
+               len(driver.find_elements(By.CLASS_NAME, "SearchResults__colCopy")) > 0
+
+    # --- Reporting ---
+
+    def time_saved(self):
+        """
+        Returns (seconds actually waited, seconds the fixed sleeps would have cost).
+        """
+        waited = sum(s["waited"] for s in self.stats.values())
+        legacy = sum(LEGACY_SLEEPS.get(step, 0) * s["count"] for step, s in self.stats.items())
+        return waited, legacy
+
+    def report(self):
+        """
+        Human-readable summary of time spent waiting vs. the old fixed sleeps.
+        """
+        if not self.stats:
+            return "Wait report: no waits recorded."
+
+        lines = ["Wait report (step: calls, waited, old fixed sleeps, timeouts):"]
+        for step, s in sorted(self.stats.items()):
+            legacy = LEGACY_SLEEPS.get(step, 0) * s["count"]
+            lines.append(f"  {step}: {s['count']}x, {s['waited']:.1f}s vs {legacy:.1f}s, {s['timeouts']} timeouts")
+        waited, legacy = self.time_saved()
+        lines.append(f"  Total: waited {waited:.1f}s vs {legacy:.1f}s with fixed sleeps (saved {legacy - waited:.1f}s)")
+        return "\n".join(lines)
+
+    def reset(self):
+        self.stats = {}
@@ -1,98 +1,120 @@
 import json
 import os
-from supabase_client import SupabaseHelper
+from datetime import datetime
+from storage import get_storage
 
 class WatchlistManager:
-    def __init__(self, username=None, use_supabase=True):
+    def __init__(self, username=None, use_supabase=True, download_dir="downloads"):
         self.username = username
-        self.use_supabase = use_supabase
-        self.supabase = None
+        # Shared process-wide: one connection and one watchlist cache for all sessions
+        self.storage = get_storage(use_supabase)
+        self.use_supabase = self.storage.use_supabase
+        self.supabase = self.storage.supabase
         self.watchlist = []
-
-        if self.use_supabase:
-            try:
-                self.supabase = SupabaseHelper.get_client()
-            except Exception:
-                self.use_supabase = False
         
         # Determine filepath for local fallback
         if self.username:
             safe_username = "".join([c for c in self.username if c.isalnum() or c in "-_"])
+            # Local watchlist file (used when Supabase is not configured)
             self.filepath = f"watchlist_{safe_username}.json"
+            self.marks_filename = f"watchlist_marks_{safe_username}.json"
         else:
             self.filepath = "watchlist.json"
+            self.marks_filename = "watchlist_marks.json"
+        self.owner = self.username or ""
             
         self.load_watchlist()
+        self.set_download_dir(download_dir)
 
-    def load_watchlist(self):
-        if self.use_supabase and self.username:
-            try:
-                # Query 'watchlists' table for this user
-                response = self.supabase.table("watchlists").select("ticker").eq("username", self.username).execute()
-                if response.data:
-                    self.watchlist = [item['ticker'] for item in response.data]
-                else:
-                    self.watchlist = []
-            except Exception as e:
-                print(f"Supabase watchlist load error: {e}")
-                self.watchlist = [] # Fallback to empty list or local?
-        else:
-            # Local JSON Fallback
-            if not os.path.exists(self.filepath):
-                self.watchlist = []
-            else:
-                try:
-                    with open(self.filepath, 'r', encoding='utf-8') as f:
-                        self.watchlist = json.load(f)
-                except Exception:
-                    self.watchlist = []
+    def load_watchlist(self, refresh=False):
+        """Loads the watchlist (served from the shared cache unless refresh=True)."""
+        if refresh:
+            self.storage.invalidate(self.owner)
+        try:
+            self.watchlist = self.storage.get_watchlist(self.owner, local_path=self.filepath)
+        except Exception as e:
+            print(f"{'Supabase' if self.use_supabase and self.username else 'Local'} watchlist load error: {e}")
+            self.watchlist = []
         return self.watchlist
 
     def add_ticker(self, ticker):
-        ticker = ticker.strip().upper()
-        if not ticker:
-            return False
-            
-        if ticker in self.watchlist:
-            return False
-
-        if self.use_supabase and self.username:
-            try:
-                self.supabase.table("watchlists").insert({"username": self.username, "ticker": ticker}).execute()
-                self.watchlist.append(ticker)
-                return True
-            except Exception as e:
-                print(f"Supabase add ticker error: {e}")
-                return False
-        else:
-            self.watchlist.append(ticker)
-            self.save_local_watchlist()
-            return True
+        return bool(self.add_tickers([ticker]))
 
     def remove_ticker(self, ticker):
-        ticker = ticker.strip().upper()
-        if ticker not in self.watchlist:
-            return False
+        return bool(self.remove_tickers([ticker]))
 
-        if self.use_supabase and self.username:
-            try:
-                self.supabase.table("watchlists").delete().eq("username", self.username).eq("ticker", ticker).execute()
-                self.watchlist.remove(ticker)
-                return True
-            except Exception as e:
-                print(f"Supabase remove ticker error: {e}")
-                return False
-        else:
-            self.watchlist.remove(ticker)
-            self.save_local_watchlist()
-            return True
+    def add_tickers(self, tickers):
+        """Adds many tickers in one request. Returns the tickers that were new."""
+        tickers = [t.strip().upper() for t in tickers if t and t.strip()]
+        if not tickers:
+            return []
+        try:
+            added = self.storage.add_tickers(self.owner, tickers, local_path=self.filepath)
+        except Exception as e:
+            print(f"{'Supabase' if self.use_supabase and self.username else 'Local'} add ticker error: {e}")
+            added = []
+        self.load_watchlist()
+        return added
 
-    def save_local_watchlist(self):
+    def remove_tickers(self, tickers):
+        """Removes many tickers in one request. Returns the tickers that were removed."""
+        tickers = [t.strip().upper() for t in tickers if t and t.strip()]
+        if not tickers:
+            return []
         try:
-            with open(self.filepath, 'w', encoding='utf-8') as f:
-                json.dump(self.watchlist, f, indent=4)
+            removed = self.storage.remove_tickers(self.owner, tickers, local_path=self.filepath)
         except Exception as e:
-            print(f"Error saving watchlist: {e}")
+            print(f"{'Supabase' if self.use_supabase and self.username else 'Local'} remove ticker error: {e}")
+            removed = []
+        self.load_watchlist()
+        return removed
 
     def get_watchlist(self):
         return self.watchlist
+
+    def set_download_dir(self, download_dir):
+        """
+        High-water marks describe what is in a download folder, so they are stored inside it.
+        Switching folders loads that folder's marks.
+        """
+        marks_filepath = os.path.join(download_dir, self.marks_filename)
+        if getattr(self, "marks_filepath", None) != marks_filepath:
+            self.marks_filepath = marks_filepath
+            self.marks = self.load_marks()
+
+    def load_marks(self):
+        """Loads per-ticker high-water marks: {ticker: {"date": iso string, "report_id": str}}."""
+        if not os.path.exists(self.marks_filepath):
+            return {}
+        try:
+            with open(self.marks_filepath, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def get_high_water(self, ticker):
+        """Returns {"date": datetime or None, "report_id": str} for the newest report seen, or None."""
+        mark = self.marks.get(ticker.strip().upper())
+        if not mark:
+            return None
+        date = datetime.fromisoformat(mark["date"]) if mark.get("date") else None
+        return {"date": date, "report_id": mark.get("report_id")}
+
+    def set_high_water(self, ticker, date, report_id):
+        """Stores the newest report seen for a ticker. Never moves the mark backwards or drops its date."""
+        ticker = ticker.strip().upper()
+        current = self.get_high_water(ticker)
+        if current and current["date"] and (not date or date < current["date"]):
+            return False
+        self.marks[ticker] = {
+            "date": date.isoformat() if date else None,
+            "report_id": report_id
+        }
+        try:
+            os.makedirs(os.path.dirname(self.marks_filepath) or ".", exist_ok=True)
+            with open(self.marks_filepath, 'w', encoding='utf-8') as f:
+                json.dump(self.marks, f, indent=4)
+            return True
+        except Exception as e:
+            print(f"Error saving watchlist marks: {e}")
+            return False
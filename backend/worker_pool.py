@@ -0,0 +1,148 @@
+import os
+import queue
+import threading
+from core import GSResearchDownloader
+
+class BrowserWorkerPool:
+    """
+    Spreads a batch of companies across several Chrome instances.
+    Worker 0 is the already logged-in primary downloader; the extra workers
+    reuse its session cookies so nobody has to log in again.
+    Every worker downloads into its own staging folder under <download_dir>/.staging.
+    """
+    def __init__(self, primary, num_workers=2, log_callback=None):
+        self.primary = primary
+        self.num_workers = max(1, int(num_workers))
+        self.log_callback = log_callback or primary.log_callback
+        self.workers = []
+        self.threads = []
+        self.stop_event = threading.Event()
+        self.staging_root = os.path.join(primary.download_dir, ".staging")
+        self._primary_log_callback = primary.log_callback
+        self._primary_staging_dir = primary.staging_dir
+        self._lock = threading.Lock()
+
+    def log(self, message):
+        with self._lock:
+            if self.log_callback:
+                self.log_callback(message)
+            else:
+                print(message)
+
+    def _worker_logger(self, index):
+        def _log(message):
+            self.log(f"[W{index + 1}] {message}")
+        return _log
+
+    def start_workers(self):
+        """
+        Launches the extra browsers and copies the primary session into them.
+        """
+        if self.workers:
+            return self.workers
+
+        self.log(f"Starting browser pool with {self.num_workers} workers...")
+        cookies = self.primary.get_session_cookies()
+
+        # The primary keeps its driver but moves to its own staging folder
+        self.primary.log_callback = self._worker_logger(0)
+        self.primary.set_staging_dir(os.path.join(self.staging_root, "worker_1"))
+        self.workers.append(self.primary)
+
+        for i in range(1, self.num_workers):
+            try:
+                # Same setup as the primary (timeouts, HTTP path, listing API, crawl profile...)
+                worker = GSResearchDownloader(
+                    log_callback=self._worker_logger(i),
+                    staging_dir=os.path.join(self.staging_root, f"worker_{i + 1}"),
+                    metrics=self.primary.metrics,
+                    **self.primary.settings
+                )
+                worker.load_session_cookies(cookies)
+                self.workers.append(worker)
+            except Exception as e:
+                self.log(f"Could not start worker {i + 1}: {e}")
+
+        self.log(f"Browser pool ready with {len(self.workers)} workers.")
+        return self.workers
+
+    def _worker_loop(self, worker, company_queue, task, on_company_done):
+        while not self.stop_event.is_set():
+            try:
+                company = company_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            try:
+                worker.log(f"Processing company: {company}")
+                task(worker, company)
+                worker.log(f"Finished processing {company}")
+            except Exception as e:
+                worker.log(f"Error processing {company}: {e}")
+            finally:
+                if on_company_done:
+                    on_company_done(company)
+                company_queue.task_done()
+
+        worker.log(worker.waits.report())
+
+    def start(self, companies, task, on_company_done=None):
+        """
+        Queues the companies and starts one thread per worker without blocking.
+        task: callable(worker, company) that does the actual search/download.
+        on_company_done: optional callable(company) called after each company.
+        """
+        self.start_workers()
+        self.stop_event.clear()
+
+        company_queue = queue.Queue()
+        for company in companies:
+            company_queue.put(company)
+
+        self.threads = [
+            threading.Thread(target=self._worker_loop, args=(w, company_queue, task, on_company_done), daemon=True)
+            for w in self.workers
+        ]
+        for t in self.threads:
+            t.start()
+
+    def is_running(self):
+        return any(t.is_alive() for t in self.threads)
+
+    def join(self, timeout=None):
+        for t in self.threads:
+            t.join(timeout)
+
+    def run(self, companies, task, on_company_done=None):
+        """
+        Processes all companies and blocks until the queue is drained or stop() is called.
+        """
+        self.start(companies, task, on_company_done)
+        self.join()
+
+    def stop(self):
+        """
+        Lets every worker finish its current company, then stop taking new ones.
+        """
+        self.stop_event.set()
+
+    def close(self):
+        """
+        Quits the extra browsers and hands the primary back in its original state.
+        """
+        self.stop()
+        for worker in self.workers:
+            if worker is self.primary:
+                continue
+            try:
+                worker.close()
+            except Exception:
+                pass
+        self.workers = []
+
+        self.primary.log_callback = self._primary_log_callback
+        try:
+            if self.primary.driver:
+                self.primary.set_staging_dir(self._primary_staging_dir)
+        except Exception:
+            pass
@@ -6,19 +6,42 @@ function App() {
   const [companies, setCompanies] = useState('')
   const [loading, setLoading] = useState(false)
 
-  // Poll status and logs
+  // Load the current state once, then follow the event stream
   useEffect(() => {
-    const interval = setInterval(async () => {
+    let source: EventSource | null = null
+    let closed = false
+
+    const connect = async () => {
+      let since = 0
       try {
         const res = await fetch('/api/status')
         const data = await res.json()
         setStatus(data.status)
         setLogs(data.logs || [])
+        since = data.seq || 0
       } catch (err) {
         // console.error(err)
       }
-    }, 2000)
-    return () => clearInterval(interval)
+      if (closed) return
+
+      // EventSource reconnects by itself and sends the last event id, which the
+      // server prefers over the initial ?since so events are not replayed
+      source = new EventSource(`/api/events?since=${since}&types=log,status`)
+      source.addEventListener('log', (e) => {
+        const event = JSON.parse((e as MessageEvent).data)
+        setLogs((prev) => [...prev, event.message].slice(-100))
+      })
+      source.addEventListener('status', (e) => {
+        const event = JSON.parse((e as MessageEvent).data)
+        setStatus(event.status)
+      })
+    }
+
+    connect()
+    return () => {
+      closed = true
+      source?.close()
+    }
   }, [])
 
   const handleInit = async () => {